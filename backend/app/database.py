@@ -2,9 +2,11 @@
 import sqlite3
 import os
 
+from .event_stream import publish_event
+
 DATABASE_NAME = 'residents.db'
 # Tentukan path database relatif terhadap lokasi main.py
-DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), DATABASE_NAME)
+DB_PATH = os.getenv("RESIDENTS_DB_PATH") or os.path.join(os.path.dirname(os.path.abspath(__file__)), DATABASE_NAME)
 
 def get_db_connection():
     """Membuat dan mengembalikan koneksi ke database."""
@@ -57,6 +59,37 @@ def init_db():
         );
     """)
     
+    # 1d. Manifest dataset wajah (1 baris per crop tersimpan)
+    #     - file: nama JPEG, atau "faces.u8" untuk sampel di pack (pack_index terisi)
+    #     - seq: nomor urut file JPEG (<safe_name>_<seq>.jpeg), untuk alokasi nama berikutnya
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS face_samples (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            resident_key TEXT NOT NULL,
+            file TEXT NOT NULL,
+            pack_index INTEGER,
+            seq INTEGER,
+            size INTEGER,
+            hash TEXT,
+            quality REAL,
+            sharpness REAL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+    """)
+    cursor.execute(
+        "CREATE UNIQUE INDEX IF NOT EXISTS idx_face_samples_file "
+        "ON face_samples(resident_key, file, IFNULL(pack_index, -1))"
+    )
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_face_samples_seq ON face_samples(resident_key, seq)")
+
+    # 1e. Penanda folder wajah yang sudah ter-index di manifest
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS face_datasets (
+            resident_key TEXT PRIMARY KEY,
+            indexed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+    """)
+
     # 2. PERBAIKAN KRITIS: Tambahkan kolom face_count jika belum ada (MIGRASI SKEMA)
     try:
         cursor.execute("SELECT face_count FROM residents LIMIT 1")
@@ -66,7 +99,9 @@ def init_db():
         print("Database SKEMA DIPERBAIKI: Kolom 'face_count' ditambahkan.")
 
     # 3. Migrasi untuk events (jaga-jaga jika tabel events versi lama)
-    #    Saat ini tidak ada migrasi tambahan, tapi blok ini disediakan untuk perluasan.
+    #    Index snapshot_path: retensi snapshot mengosongkan referensi per shard
+    #    hari (prefix "YYYYmmdd/") lewat range query, bukan full scan.
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_events_snapshot_path ON events(snapshot_path)")
 
     conn.commit()
     conn.close()
@@ -84,7 +119,14 @@ def add_event(name: str, status: str, confidence: float | None = None, snapshot_
         )
         conn.commit()
         event_id = cursor.lastrowid
+        cursor.execute(
+            "SELECT id, timestamp, name, status, confidence, snapshot_path FROM events WHERE id = ?",
+            (event_id,),
+        )
+        row = cursor.fetchone()
         conn.close()
+        if row:
+            publish_event(dict(row))
         return event_id
     except Exception as e:
         print(f"Database Event Error: {e}")
@@ -92,6 +134,43 @@ def add_event(name: str, status: str, confidence: float | None = None, snapshot_
         return None
 
 
+def add_events(events: list) -> list:
+    """Simpan banyak event dalam 1 transaksi.
+
+    `events`: list dict {name, status, confidence, snapshot_path, timestamp (opsional,
+    default CURRENT_TIMESTAMP)}. Return list id (urutan sama), [] jika gagal.
+    """
+    if not events:
+        return []
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        ids = []
+        for e in events:
+            cursor.execute(
+                "INSERT INTO events (timestamp, name, status, confidence, snapshot_path) "
+                "VALUES (COALESCE(?, CURRENT_TIMESTAMP), ?, ?, ?, ?)",
+                (e.get("timestamp"), e["name"], e["status"], e.get("confidence"), e.get("snapshot_path")),
+            )
+            ids.append(cursor.lastrowid)
+        conn.commit()
+        placeholders = ",".join("?" for _ in ids)
+        cursor.execute(
+            f"SELECT id, timestamp, name, status, confidence, snapshot_path FROM events WHERE id IN ({placeholders}) ORDER BY id",
+            ids,
+        )
+        rows = cursor.fetchall()
+        conn.close()
+        for row in rows:
+            publish_event(dict(row))
+        return ids
+    except Exception as e:
+        print(f"Database Event Error: {e}")
+        conn.rollback()
+        conn.close()
+        return []
+
+
 def get_all_events(limit: int = 200):
     """Ambil daftar event log terbaru."""
     conn = get_db_connection()
@@ -105,6 +184,29 @@ def get_all_events(limit: int = 200):
     return events_data
 
 
+def get_events_after(last_id: int, limit: int = 500):
+    """Ambil event dengan id > last_id (urut naik), untuk resume SSE."""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    cursor.execute(
+        "SELECT id, timestamp, name, status, confidence, snapshot_path FROM events WHERE id > ? ORDER BY id ASC LIMIT ?",
+        (last_id, limit),
+    )
+    events_data = [dict(row) for row in cursor.fetchall()]
+    conn.close()
+    return events_data
+
+
+def get_latest_event_id() -> int:
+    """Id event terbaru (0 jika tabel kosong)."""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    cursor.execute("SELECT MAX(id) FROM events")
+    row = cursor.fetchone()
+    conn.close()
+    return int(row[0]) if row and row[0] is not None else 0
+
+
 def get_event_by_id(event_id: int):
     """Ambil 1 event berdasarkan id."""
     conn = get_db_connection()
@@ -117,6 +219,54 @@ def get_event_by_id(event_id: int):
     conn.close()
     return dict(row) if row else None
 
+def clear_snapshot_refs_with_prefix(prefix: str, batch_size: int = 500) -> int:
+    """Kosongkan `snapshot_path` untuk event dengan prefix tertentu (mis. "20250101/").
+
+    Dilakukan per batch (commit tiap batch) supaya lock DB tidak lama.
+    Return jumlah event yang diperbarui.
+    """
+    # Range [prefix, prefix_next) bisa memakai idx_events_snapshot_path
+    upper = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    total = 0
+    try:
+        while True:
+            cursor.execute(
+                "UPDATE events SET snapshot_path = NULL WHERE id IN ("
+                "SELECT id FROM events WHERE snapshot_path >= ? AND snapshot_path < ? LIMIT ?)",
+                (prefix, upper, batch_size),
+            )
+            conn.commit()
+            if cursor.rowcount <= 0:
+                break
+            total += cursor.rowcount
+    except Exception as e:
+        print(f"Database Event Error: {e}")
+    conn.close()
+    return total
+
+
+def clear_snapshot_paths(paths: list, batch_size: int = 500) -> int:
+    """Kosongkan `snapshot_path` untuk daftar path snapshot (format lama)."""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    total = 0
+    try:
+        for i in range(0, len(paths), batch_size):
+            chunk = paths[i : i + batch_size]
+            placeholders = ",".join("?" for _ in chunk)
+            cursor.execute(
+                f"UPDATE events SET snapshot_path = NULL WHERE snapshot_path IN ({placeholders})",
+                chunk,
+            )
+            conn.commit()
+            total += max(0, cursor.rowcount)
+    except Exception as e:
+        print(f"Database Event Error: {e}")
+    conn.close()
+    return total
+
 def add_resident(name, role, face_count):
     """Menyimpan data penghuni baru ke database."""
     conn = get_db_connection()
@@ -186,6 +336,145 @@ def delete_resident(resident_id):
     return cursor.rowcount > 0 # Mengembalikan True jika ada baris yang dihapus
 
 
+# ==========================
+# FACE SAMPLES (MANIFEST DATASET)
+# ==========================
+
+_FACE_SAMPLE_COLUMNS = ("file", "pack_index", "seq", "size", "hash", "quality", "sharpness")
+
+
+def _insert_face_samples(cursor, resident_key: str, rows: list) -> None:
+    cursor.executemany(
+        "INSERT OR REPLACE INTO face_samples (resident_key, file, pack_index, seq, size, hash, quality, sharpness) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+        [(resident_key, *(r.get(c) for c in _FACE_SAMPLE_COLUMNS)) for r in rows],
+    )
+
+
+def is_face_dataset_indexed(resident_key: str) -> bool:
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    cursor.execute("SELECT 1 FROM face_datasets WHERE resident_key = ?", (resident_key,))
+    row = cursor.fetchone()
+    conn.close()
+    return row is not None
+
+
+def replace_face_samples(resident_key: str, rows: list) -> bool:
+    """Ganti seluruh manifest 1 penghuni (backfill/reindex) dalam 1 transaksi."""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute("DELETE FROM face_samples WHERE resident_key = ?", (resident_key,))
+        _insert_face_samples(cursor, resident_key, rows)
+        cursor.execute(
+            "INSERT OR REPLACE INTO face_datasets (resident_key, indexed_at) VALUES (?, CURRENT_TIMESTAMP)",
+            (resident_key,),
+        )
+        conn.commit()
+        conn.close()
+        return True
+    except Exception as e:
+        print(f"Database Face Sample Error: {e}")
+        conn.rollback()
+        conn.close()
+        return False
+
+
+def add_face_samples(resident_key: str, rows: list) -> bool:
+    """Catat crop baru (1 transaksi untuk 1 batch upload)."""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        _insert_face_samples(cursor, resident_key, rows)
+        cursor.execute(
+            "INSERT OR IGNORE INTO face_datasets (resident_key) VALUES (?)",
+            (resident_key,),
+        )
+        conn.commit()
+        conn.close()
+        return True
+    except Exception as e:
+        print(f"Database Face Sample Error: {e}")
+        conn.rollback()
+        conn.close()
+        return False
+
+
+def get_face_samples(resident_key: str):
+    """Semua crop 1 penghuni (urut: file JPEG per seq, lalu pack per index)."""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    cursor.execute(
+        "SELECT file, pack_index, seq, size, hash, quality, sharpness, created_at FROM face_samples "
+        "WHERE resident_key = ? ORDER BY pack_index IS NOT NULL, seq, pack_index, file",
+        (resident_key,),
+    )
+    rows = [dict(row) for row in cursor.fetchall()]
+    conn.close()
+    return rows
+
+
+def count_face_samples(resident_key: str) -> int:
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    cursor.execute("SELECT COUNT(*) FROM face_samples WHERE resident_key = ?", (resident_key,))
+    row = cursor.fetchone()
+    conn.close()
+    return int(row[0]) if row else 0
+
+
+def get_face_sample_counts() -> dict:
+    """resident_key -> jumlah crop, hanya untuk folder yang sudah ter-index."""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    cursor.execute(
+        "SELECT d.resident_key AS resident_key, COUNT(s.id) AS n FROM face_datasets d "
+        "LEFT JOIN face_samples s ON s.resident_key = d.resident_key GROUP BY d.resident_key"
+    )
+    counts = {row["resident_key"]: int(row["n"]) for row in cursor.fetchall()}
+    conn.close()
+    return counts
+
+
+def next_face_seq(resident_key: str) -> int:
+    """Nomor file JPEG berikutnya untuk penghuni (MAX(seq)+1 via index)."""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    cursor.execute("SELECT MAX(seq) FROM face_samples WHERE resident_key = ?", (resident_key,))
+    row = cursor.fetchone()
+    conn.close()
+    return int(row[0] or 0) + 1
+
+
+def delete_face_samples(resident_key: str) -> int:
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    cursor.execute("DELETE FROM face_samples WHERE resident_key = ?", (resident_key,))
+    deleted = cursor.rowcount
+    cursor.execute("DELETE FROM face_datasets WHERE resident_key = ?", (resident_key,))
+    conn.commit()
+    conn.close()
+    return deleted
+
+
+def rename_face_samples(old_key: str, new_key: str) -> bool:
+    """Pindahkan manifest ke key baru (folder penghuni di-rename)."""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute("UPDATE face_samples SET resident_key = ? WHERE resident_key = ?", (new_key, old_key))
+        cursor.execute("UPDATE face_datasets SET resident_key = ? WHERE resident_key = ?", (new_key, old_key))
+        conn.commit()
+        conn.close()
+        return True
+    except Exception as e:
+        print(f"Database Face Sample Error: {e}")
+        conn.rollback()
+        conn.close()
+        return False
+
+
 # ==========================
 # USERS (AUTH)
 # ==========================
@@ -0,0 +1,145 @@
+"""Degradasi otomatis parameter deteksi wajah berdasarkan SLO latency.
+
+Deteksi Haar adalah tahap termahal per frame. Saat server kewalahan (banyak
+dashboard, CPU kecil, kamera resolusi tinggi), lebih baik deteksi sedikit lebih
+kasar daripada latency `/frame` dan worker membengkak. Controller ini:
+- mencatat durasi deteksi + prediksi per frame (tahap `detect` dan `predict`;
+  decode, load model, nama, snapshot dan tulis event tidak dihitung karena
+  tidak bisa dipercepat dengan deteksi yang lebih kasar)
+- tiap DETECT_SLO_EVAL_FRAMES observasi, bandingkan p95 jendela terakhir dengan
+  budget DETECT_SLO_MS
+- p95 > budget: turun 1 tingkat ke parameter yang lebih murah (LADDER)
+- p95 < budget x DETECT_SLO_RECOVER_RATIO: naik 1 tingkat (kualitas kembali)
+- setelah pindah tingkat jendela dikosongkan, jadi keputusan berikutnya memakai
+  latency di tingkat yang baru (tidak berayun)
+
+Tingkat 0 = parameter default `detect_faces_gray`. Tingkat lebih tinggi: sisi
+maksimum lebih kecil, scaleFactor lebih besar (piramida lebih jarang) dan
+minSize relatif lebih besar (wajah kecil/jauh diabaikan lebih dulu).
+
+Hanya dipakai jalur realtime (`/frame`, recognition worker); `/batch`, enroll
+dan recognize_offline tetap memakai parameter penuh. DETECT_SLO_MS=0 (default)
+mematikan controller. Controller terpisah per sumber (FRAME untuk `/frame`,
+WORKER untuk recognition worker) supaya latency keduanya tidak bercampur di
+1 jendela p95. State per proses (worker mode proses punya controller sendiri,
+tingkatnya dilaporkan lewat status worker).
+"""
+
+from __future__ import annotations
+
+import threading
+from collections import deque
+from dataclasses import dataclass
+from typing import Deque, Dict, Tuple
+
+from . import face_engine, metrics
+
+
+@dataclass(frozen=True)
+class DetectParams:
+    max_side: int
+    scale_factor: float
+    min_size: Tuple[int, int]
+    min_neighbors: int = 5
+
+    def kwargs(self) -> Dict[str, object]:
+        return {
+            "max_side": self.max_side,
+            "scale_factor": self.scale_factor,
+            "min_size": self.min_size,
+            "min_neighbors": self.min_neighbors,
+        }
+
+
+# minSize dalam piksel gambar yang sudah di-downscale: relatif terhadap frame
+# tetap naik (60/640 = 9% -> 48/320 = 15%)
+LADDER: Tuple[DetectParams, ...] = (
+    DetectParams(max_side=640, scale_factor=1.3, min_size=(60, 60)),
+    DetectParams(max_side=512, scale_factor=1.35, min_size=(56, 56)),
+    DetectParams(max_side=416, scale_factor=1.4, min_size=(52, 52)),
+    DetectParams(max_side=320, scale_factor=1.5, min_size=(48, 48)),
+)
+
+
+class DetectionController:
+    def __init__(self, source: str):
+        self.source = source
+        self._lock = threading.Lock()
+        self._recent: Deque[float] = deque(maxlen=max(8, face_engine.get_env_int("DETECT_SLO_WINDOW", 50)))
+        self._since_eval = 0
+        self.level = 0
+        self.last_p95 = 0.0
+
+    @staticmethod
+    def budget() -> float:
+        return max(0.0, face_engine.get_env_float("DETECT_SLO_MS", 0.0)) / 1000.0
+
+    def params(self) -> DetectParams:
+        return LADDER[self.level]
+
+    def observe(self, seconds: float) -> None:
+        budget = self.budget()
+        if budget <= 0:
+            if self.level:
+                self._set_level(0, "up")
+            return
+
+        eval_every = max(1, face_engine.get_env_int("DETECT_SLO_EVAL_FRAMES", 20))
+        recover = face_engine.get_env_float("DETECT_SLO_RECOVER_RATIO", 0.6)
+        with self._lock:
+            self._recent.append(seconds)
+            self._since_eval += 1
+            if self._since_eval < eval_every or len(self._recent) < eval_every:
+                return
+            self._since_eval = 0
+            values = sorted(self._recent)
+            p95 = values[min(len(values) - 1, int(0.95 * len(values)))]
+            self.last_p95 = p95
+            level = self.level
+
+        if p95 > budget and level < len(LADDER) - 1:
+            self._set_level(level + 1, "down")
+        elif p95 < budget * recover and level > 0:
+            self._set_level(level - 1, "up")
+
+    def _set_level(self, level: int, direction: str) -> None:
+        with self._lock:
+            if level == self.level:
+                return
+            self.level = level
+            self._recent.clear()
+            self._since_eval = 0
+        LEVEL_CHANGES_TOTAL.inc(direction=direction, source=self.source)
+        LEVEL.set(level, source=self.source)
+        p = LADDER[level]
+        print(
+            f"Detection SLO ({self.source}): tingkat {level} (max_side={p.max_side}, scale_factor={p.scale_factor}, "
+            f"min_size={p.min_size[0]}), p95 {self.last_p95 * 1000.0:.0f} ms"
+        )
+
+    def status(self) -> Dict[str, object]:
+        p = self.params()
+        return {
+            "level": self.level,
+            "max_level": len(LADDER) - 1,
+            "budget_ms": round(self.budget() * 1000.0, 1),
+            "p95_ms": round(self.last_p95 * 1000.0, 1),
+            "max_side": p.max_side,
+            "scale_factor": p.scale_factor,
+            "min_size": p.min_size[0],
+        }
+
+
+FRAME = DetectionController("frame")
+WORKER = DetectionController("worker")
+
+LEVEL_CHANGES_TOTAL: metrics.Counter = metrics.REGISTRY.register(  # type: ignore[assignment]
+    metrics.Counter(
+        "hfg_detect_level_changes_total", "Perpindahan tingkat deteksi per sumber (down = lebih murah, up = pulih)."
+    )
+)
+LEVEL: metrics.Gauge = metrics.REGISTRY.register(  # type: ignore[assignment]
+    metrics.Gauge("hfg_detect_level", "Tingkat degradasi deteksi saat ini per sumber (0 = parameter penuh).")
+)
+for _controller in (FRAME, WORKER):
+    LEVEL.set(0, source=_controller.source)
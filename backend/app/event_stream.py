@@ -0,0 +1,87 @@
+"""Broadcaster in-process untuk event log (Server-Sent Events).
+
+Tujuan:
+- `database.add_event` mem-publish setiap event baru ke sini setelah commit
+- Endpoint `GET /api/events/stream` menunggu event baru tanpa polling DB
+
+Broadcaster menyimpan ring buffer event terakhir supaya klien yang reconnect
+dengan header `Last-Event-ID` bisa melanjutkan tanpa kehilangan event.
+
+Buffer hanya berisi event dari proses ini. Event yang ditulis proses lain
+(worker gunicorn lain, child worker mode proses, script CLI) tidak lewat sini,
+jadi id di buffer bisa melompat. Buffer hanya dipakai jika id-nya berurutan
+dari `last_id + 1`; ada lompatan (atau id yang diminta sudah keluar dari
+buffer) -> pemanggil harus fallback ke query DB (`get_events_after`).
+"""
+
+from __future__ import annotations
+
+import threading
+from collections import deque
+from typing import Deque, Dict, List, Optional
+
+
+class EventBroadcaster:
+    def __init__(self, maxlen: int = 500):
+        self._cond = threading.Condition()
+        self._buffer: Deque[Dict[str, object]] = deque(maxlen=maxlen)
+        self._waiting = 0
+
+    def publish(self, event: Dict[str, object]) -> None:
+        """Tambahkan 1 event (dict dengan key `id`) dan bangunkan semua listener."""
+        with self._cond:
+            self._buffer.append(dict(event))
+            self._cond.notify_all()
+
+    def latest_id(self) -> Optional[int]:
+        """Id terbesar di buffer (publish bisa tiba tidak urut)."""
+        with self._cond:
+            return max(int(e["id"]) for e in self._buffer) if self._buffer else None
+
+    def buffered(self) -> int:
+        with self._cond:
+            return len(self._buffer)
+
+    def waiting(self) -> int:
+        """Jumlah listener (koneksi SSE) yang sedang menunggu event."""
+        with self._cond:
+            return self._waiting
+
+    def _since_locked(self, last_id: int) -> Optional[List[Dict[str, object]]]:
+        # Publish dari beberapa thread bisa tiba tidak urut -> urutkan dulu
+        items = sorted((dict(e) for e in self._buffer if int(e["id"]) > last_id), key=lambda e: int(e["id"]))
+        for expected, e in enumerate(items, start=last_id + 1):
+            if int(e["id"]) != expected:
+                # Ada gap: event sudah keluar dari buffer, atau ditulis proses lain
+                return None
+        return items
+
+    def wait_since(self, last_id: int, timeout: float) -> Optional[List[Dict[str, object]]]:
+        """Tunggu event dengan id > last_id.
+
+        Return:
+        - list event berurutan dari last_id + 1 (bisa kosong jika timeout)
+        - None jika buffer tidak mencakup semua event setelah last_id (fallback ke DB)
+        """
+        with self._cond:
+            items = self._since_locked(last_id)
+            if items is None or items:
+                return items
+            self._waiting += 1
+            try:
+                self._cond.wait(timeout=timeout)
+            finally:
+                self._waiting -= 1
+            return self._since_locked(last_id)
+
+
+# Single instance (in-process)
+broadcaster = EventBroadcaster()
+
+
+def publish_event(event: Dict[str, object]) -> None:
+    """Best-effort publish; jangan sampai gagal broadcast menggagalkan insert."""
+    try:
+        broadcaster.publish(event)
+    except Exception as e:
+        print(f"Event Stream Error: {e}")
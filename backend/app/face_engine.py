@@ -15,10 +15,12 @@ from __future__ import annotations
 
 import os
 import pickle
+import threading
 import time
+from concurrent.futures import Executor
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Dict, Iterable, List, Optional, Tuple
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
 
 import numpy as np
 
@@ -29,18 +31,28 @@ except Exception:  # pragma: no cover
 
 from werkzeug.utils import secure_filename
 
+from . import face_pack, image_quality, lbph_training, sample_index, tiled_detection
+from .process_lock import ProcessLock
+from .database import get_all_residents, next_face_seq
+
 # ---------------------------------------------------------------------
 # Paths
 # ---------------------------------------------------------------------
 
 BACKEND_DIR = Path(__file__).resolve().parent.parent  # .../backend
-DATASET_DIR = BACKEND_DIR / "dataset"
+# DATASET_DIR bisa dialihkan (mis. benchmark / test) tanpa menyentuh dataset asli
+DATASET_DIR = Path(os.getenv("DATASET_DIR") or (BACKEND_DIR / "dataset"))
 FACES_DIR = DATASET_DIR / "faces"
 MODELS_DIR = DATASET_DIR / "models"
 SNAPSHOTS_DIR = DATASET_DIR / "snapshots"
 
 MODEL_PATH = MODELS_DIR / "lbph_model.yml"
 LABELS_PATH = MODELS_DIR / "labels.pkl"
+# Lock antar proses untuk menulis model/labels (server multi-proses)
+MODEL_LOCK_PATH = MODELS_DIR / "model.lock"
+
+# Format labels.pkl: label LBPH = `residents.id` (bukan nama folder)
+LABELS_FORMAT = "resident_id"
 
 IMAGE_EXTS = {".jpg", ".jpeg", ".png"}
 
@@ -66,18 +78,20 @@ def make_safe_name(name: str) -> str:
     return safe
 
 
-_FACE_CASCADE = None
+# CascadeClassifier tidak aman dipakai bersamaan -> 1 instance per thread
+_CASCADE_LOCAL = threading.local()
 
 
 def _get_face_cascade():
-    global _FACE_CASCADE
     if cv2 is None:
         raise RuntimeError("OpenCV (cv2) belum tersedia. Install opencv-contrib-python.")
-    if _FACE_CASCADE is None:
-        _FACE_CASCADE = cv2.CascadeClassifier(
+    cascade = getattr(_CASCADE_LOCAL, "cascade", None)
+    if cascade is None:
+        cascade = cv2.CascadeClassifier(
             cv2.data.haarcascades + "haarcascade_frontalface_default.xml"
         )
-    return _FACE_CASCADE
+        _CASCADE_LOCAL.cascade = cascade
+    return cascade
 
 
 def _downscale_for_detection(
@@ -101,35 +115,57 @@ def _downscale_for_detection(
     return gray_small, inv_scale
 
 
+def _detect_boxes(
+    gray: np.ndarray,
+    scale_factor: float,
+    min_neighbors: int,
+    min_size: Tuple[int, int],
+    max_side: int,
+) -> List[Tuple[int, int, int, int]]:
+    """Kotak wajah (x, y, w, h) di koordinat `gray` (downscale biasa, atau tile jika DETECT_TILED=1)."""
+
+    def run(img: np.ndarray, size: Tuple[int, int]):
+        # Cascade per thread: aman dipanggil dari thread pool tile
+        return _get_face_cascade().detectMultiScale(
+            img,
+            scaleFactor=scale_factor,
+            minNeighbors=min_neighbors,
+            minSize=size,
+        )
+
+    if tiled_detection.enabled() and max(gray.shape[:2]) > max_side:
+        return tiled_detection.detect(gray, run, max_side, min_size)
+
+    # ✅ Perbaikan: downscale sebelum detectMultiScale (menghindari timeout/OOM)
+    gray_small, inv = _downscale_for_detection(gray, max_side=max_side)
+
+    faces = run(gray_small, min_size)
+    if faces is None or len(faces) == 0:
+        return []
+
+    # Kembalikan bbox ke koordinat original
+    return [(int(x * inv), int(y * inv), int(w * inv), int(h * inv)) for (x, y, w, h) in faces]
+
+
 def detect_largest_face_gray(
     img_bgr: np.ndarray,
     scale_factor: float = 1.3,
     min_neighbors: int = 5,
+    max_side: int = 640,
+    min_size: tuple[int, int] = (60, 60),
 ) -> Optional[Tuple[np.ndarray, Tuple[int, int, int, int]]]:
     """Deteksi wajah terbesar, return face_gray (200x200) dan bbox."""
     if cv2 is None:
         raise RuntimeError("OpenCV (cv2) belum tersedia. Install opencv-contrib-python.")
 
-    cascade = _get_face_cascade()
     gray = cv2.cvtColor(img_bgr, cv2.COLOR_BGR2GRAY)
 
-    # ✅ Perbaikan: downscale sebelum detectMultiScale (menghindari timeout/OOM)
-    gray_small, inv = _downscale_for_detection(gray, max_side=640)
-
-    faces = cascade.detectMultiScale(
-        gray_small,
-        scaleFactor=scale_factor,
-        minNeighbors=min_neighbors,
-        minSize=(60, 60),
-    )
-    if faces is None or len(faces) == 0:
+    faces = _detect_boxes(gray, scale_factor, min_neighbors, min_size, max_side)
+    if not faces:
         return None
 
-    # Pilih wajah terbesar (di koordinat gray_small)
-    x, y, w, h = max(faces, key=lambda f: int(f[2]) * int(f[3]))
-
-    # Kembalikan bbox ke koordinat original
-    x, y, w, h = int(x * inv), int(y * inv), int(w * inv), int(h * inv)
+    # Pilih wajah terbesar
+    x, y, w, h = max(faces, key=lambda f: f[2] * f[3])
 
     face = gray[y : y + h, x : x + w]
     if face.size == 0:
@@ -150,6 +186,7 @@ def detect_faces_gray(
     scale_factor: float = 1.3,
     min_neighbors: int = 5,
     min_size: tuple[int, int] = (60, 60),
+    max_side: int = 640,
 ) -> List[Tuple[np.ndarray, Tuple[int, int, int, int]]]:
     """Deteksi semua wajah, return list (face_gray_200, bbox).
 
@@ -161,26 +198,10 @@ def detect_faces_gray(
     if cv2 is None:
         raise RuntimeError("OpenCV (cv2) belum tersedia. Install opencv-contrib-python.")
 
-    cascade = _get_face_cascade()
     gray = cv2.cvtColor(img_bgr, cv2.COLOR_BGR2GRAY)
 
-    # ✅ Perbaikan: downscale sebelum detectMultiScale
-    gray_small, inv = _downscale_for_detection(gray, max_side=640)
-
-    faces = cascade.detectMultiScale(
-        gray_small,
-        scaleFactor=scale_factor,
-        minNeighbors=min_neighbors,
-        minSize=min_size,
-    )
-    if faces is None or len(faces) == 0:
-        return []
-
     out: List[Tuple[np.ndarray, Tuple[int, int, int, int]]] = []
-    for (x, y, w, h) in faces:
-        # Kembalikan bbox ke koordinat original
-        x, y, w, h = int(x * inv), int(y * inv), int(w * inv), int(h * inv)
-
+    for (x, y, w, h) in _detect_boxes(gray, scale_factor, min_neighbors, min_size, max_side):
         face = gray[y : y + h, x : x + w]
         if face.size == 0:
             continue
@@ -220,15 +241,104 @@ def _sample_paths(paths: List[Path], max_n: Optional[int]) -> List[Path]:
     return out
 
 
+def list_face_files(person_dir: Path) -> List[Path]:
+    """File wajah (JPEG/PNG) di folder penghuni, urut nama."""
+    paths = [
+        p
+        for p in person_dir.iterdir()
+        if p.is_file() and p.suffix.lower() in IMAGE_EXTS
+    ]
+    paths.sort(key=lambda p: p.name)
+    return paths
+
+
+def count_faces(person_dir: Path) -> int:
+    """Jumlah sampel wajah penghuni (file JPEG + isi pack) dari manifest dataset."""
+    if not person_dir.is_dir():
+        return 0
+    return sample_index.count(person_dir)
+
+
+def _enroll_filter_enabled() -> bool:
+    return os.getenv("ENROLL_FILTER", "1").strip().lower() not in {"0", "false", "no"}
+
+
+def _detect_face_crop(image_bytes: bytes) -> Optional[np.ndarray]:
+    arr = np.frombuffer(image_bytes, dtype=np.uint8)
+    img = cv2.imdecode(arr, cv2.IMREAD_COLOR)
+    if img is None:
+        return None
+    detected = detect_largest_face_gray(img)
+    if detected is None:
+        return None
+    return detected[0]
+
+
 def save_processed_faces(
     resident_name: str,
     image_bytes_iter: Iterable[bytes],
 ) -> Dict[str, object]:
-    """Simpan wajah hasil crop ke dataset/faces/<safe_name>/.
+    """Deteksi wajah (Haar) pada tiap gambar upload, lalu simpan crop-nya (`save_face_crops`)."""
+    if cv2 is None:
+        raise RuntimeError("OpenCV (cv2) belum tersedia. Install opencv-contrib-python.")
+
+    return save_face_crops(resident_name, (_detect_face_crop(b) for b in image_bytes_iter))
+
+
+def check_face_crop(face: Optional[np.ndarray]) -> Optional[np.ndarray]:
+    """Sanity check murah untuk crop dari klien: 200x200 grayscale uint8, tidak polos.
+
+    Return crop (contiguous) atau None jika ditolak.
+    """
+    if face is None:
+        return None
+    face = np.asarray(face)
+    if face.dtype != np.uint8 or face.shape != face_pack.FACE_SHAPE:
+        return None
+    # Frame hitam/putih/polos (kamera tertutup, encode gagal) tidak berguna untuk training
+    if float(face.std()) < get_env_float("CROPPED_MIN_STD", 8.0):
+        return None
+    return np.ascontiguousarray(face)
+
+
+def decode_face_crop(image_bytes: bytes) -> Optional[np.ndarray]:
+    """Decode 1 file crop (PNG/JPEG grayscale 200x200) tanpa deteksi wajah."""
+    arr = np.frombuffer(image_bytes, dtype=np.uint8)
+    img = cv2.imdecode(arr, cv2.IMREAD_GRAYSCALE)
+    return check_face_crop(img)
+
+
+def iter_packed_crops(payload: bytes) -> Iterator[Optional[np.ndarray]]:
+    """Pecah payload biner N x 200 x 200 byte (grayscale mentah) menjadi crop."""
+    if len(payload) % face_pack.FACE_BYTES != 0:
+        raise ValueError(
+            f"Ukuran payload harus kelipatan {face_pack.FACE_BYTES} byte (N x 200 x 200)."
+        )
+    block = np.frombuffer(payload, dtype=np.uint8).reshape((-1,) + face_pack.FACE_SHAPE)
+    for face in block:
+        yield check_face_crop(face)
+
+
+def save_face_crops(
+    resident_name: str,
+    faces_iter: Iterable[Optional[np.ndarray]],
+) -> Dict[str, object]:
+    """Simpan wajah hasil crop (grayscale 200x200) ke dataset/faces/<safe_name>/.
+
+    Item None dihitung sebagai skipped (decode gagal / wajah tidak terdeteksi).
+
+    Format simpan mengikuti FACE_STORAGE: "files" (1 JPEG per sampel) atau
+    "packed" (append ke `faces.u8` + `pack.json`, lihat `face_pack`).
+
+    Filter enrollment (ENROLL_FILTER=1, default):
+    - crop blur (variance of Laplacian < ENROLL_MIN_SHARPNESS) dibuang
+    - crop yang hampir sama (dHash, jarak <= ENROLL_DEDUP_MAX_DISTANCE) dengan
+      crop penghuni yang sudah ada / yang baru disimpan di batch ini dibuang
 
     Mengembalikan:
     - saved: jumlah file yang benar-benar tersimpan (face terdeteksi)
     - skipped: jumlah file yang dilewati (decode gagal / face tidak terdeteksi)
+    - filtered_blurry / filtered_duplicate: crop yang dibuang oleh filter enrollment
     - total: total file wajah yang ada di folder setelah proses (bukan jumlah upload)
     """
     if cv2 is None:
@@ -240,40 +350,66 @@ def save_processed_faces(
     resident_dir = FACES_DIR / safe_name
     resident_dir.mkdir(parents=True, exist_ok=True)
 
-    existing = len(
-        [
-            p
-            for p in resident_dir.iterdir()
-            if p.is_file() and p.suffix.lower() in IMAGE_EXTS
-        ]
-    )
+    packed = face_pack.storage_mode() == "packed"
+
+    # Manifest dataset (SQLite): jumlah, hash untuk dedup, nomor file berikutnya
+    rows = sample_index.get_rows(resident_dir)
+    existing = len(rows)
+    next_seq = next_face_seq(safe_name)
+
+    use_filter = _enroll_filter_enabled()
+    min_sharpness = get_env_float("ENROLL_MIN_SHARPNESS", 30.0)
+    max_distance = get_env_int("ENROLL_DEDUP_MAX_DISTANCE", 4)
+
+    known_hashes: List[int] = [int(str(r["hash"]), 16) for r in rows if r.get("hash")]
+    new_rows: List[Dict[str, object]] = []
+    pack_faces: List[np.ndarray] = []
+    pack_entries: List[Dict[str, object]] = []
 
     saved = 0
     skipped = 0
+    filtered_blurry = 0
+    filtered_duplicate = 0
 
-    for b in image_bytes_iter:
-        arr = np.frombuffer(b, dtype=np.uint8)
-        img = cv2.imdecode(arr, cv2.IMREAD_COLOR)
-        if img is None:
-            skipped += 1
-            continue
-
-        detected = detect_largest_face_gray(img)
-        if detected is None:
+    for face_gray in faces_iter:
+        if face_gray is None:
             skipped += 1
             continue
 
-        face_gray, _bbox = detected
+        entry = sample_index.score_face(face_gray)
+        face_hash = int(str(entry["hash"]), 16)
+        if use_filter:
+            if float(entry["sharpness"]) < min_sharpness:
+                filtered_blurry += 1
+                continue
+            if image_quality.is_near_duplicate(face_hash, known_hashes, max_distance):
+                filtered_duplicate += 1
+                continue
 
-        idx = existing + saved + 1
-        file_path = resident_dir / f"{safe_name}_{idx}.jpeg"
+        if packed:
+            pack_faces.append(face_gray)
+            pack_entries.append(entry)
+        else:
+            file_path = resident_dir / f"{safe_name}_{next_seq}.jpeg"
 
-        ok = cv2.imwrite(str(file_path), face_gray)
-        if not ok:
-            skipped += 1
-            continue
+            ok = cv2.imwrite(str(file_path), face_gray)
+            if not ok:
+                skipped += 1
+                continue
+            next_seq += 1
+            new_rows.append(sample_index.make_file_row(file_path, entry))
 
         saved += 1
+        known_hashes.append(face_hash)
+
+    if pack_faces:
+        # 1 write sekuensial untuk seluruh batch upload
+        new_count = face_pack.append_faces(resident_dir, pack_faces, pack_entries)
+        start = new_count - len(pack_faces)
+        new_rows.extend(sample_index.make_pack_row(start + i, e) for i, e in enumerate(pack_entries))
+
+    # 1 transaksi manifest untuk seluruh batch
+    sample_index.record_samples(safe_name, new_rows)
 
     total = existing + saved
 
@@ -283,7 +419,93 @@ def save_processed_faces(
         "resident_dir": str(resident_dir),
         "saved": saved,
         "skipped": skipped,
+        "filtered_blurry": filtered_blurry,
+        "filtered_duplicate": filtered_duplicate,
         "total": total,
+        "storage": "packed" if packed else "files",
+    }
+
+
+def _train_strategy(strategy: Optional[str] = None) -> str:
+    return (strategy or os.getenv("TRAIN_SAMPLE_STRATEGY", "quality")).strip().lower()
+
+
+def _select_keys(
+    keys: List[str],
+    samples: Dict[str, Dict[str, object]],
+    max_n: Optional[int],
+    strategy: Optional[str] = None,
+) -> List[str]:
+    if _train_strategy(strategy) == "stride" or not max_n or max_n <= 0 or len(keys) <= max_n:
+        return _sample_paths(keys, max_n)  # type: ignore[arg-type]
+    weight = get_env_float("TRAIN_DIVERSITY_WEIGHT", 1.0)
+    return sample_index.select_keys(keys, samples, max_n, diversity_weight=weight)
+
+
+def select_training_paths(
+    person_dir: Path,
+    img_paths: List[Path],
+    max_n: Optional[int],
+    strategy: Optional[str] = None,
+) -> List[Path]:
+    """Pilih sampel training (file JPEG) untuk 1 penghuni.
+
+    strategy (default env TRAIN_SAMPLE_STRATEGY, "quality"):
+    - "quality": sampel paling tajam & beragam berdasarkan manifest dataset
+    - "stride": sampling merata berdasarkan urutan nama file (perilaku lama)
+    """
+    if _train_strategy(strategy) == "stride" or not max_n or max_n <= 0 or len(img_paths) <= max_n:
+        return _sample_paths(img_paths, max_n)
+
+    samples = sample_index.rows_to_samples(sample_index.get_rows(person_dir))
+    weight = get_env_float("TRAIN_DIVERSITY_WEIGHT", 1.0)
+    return sample_index.select_samples(img_paths, samples, max_n, diversity_weight=weight)
+
+
+def iter_person_faces(
+    person_dir: Path,
+    max_n: Optional[int],
+    chunk_size: int = 64,
+) -> Iterator[List[np.ndarray]]:
+    """Baca sampel training terpilih (200x200 uint8) per chunk, dari file JPEG dan/atau pack.
+
+    Daftar sampel berasal dari manifest dataset (bukan listing folder). File &
+    isi pack dipilih dalam 1 langkah (key pack: "#<index>"). Paling banyak
+    `chunk_size` wajah dimuat sekaligus.
+    """
+    rows = sample_index.get_rows(person_dir)
+    samples = sample_index.rows_to_samples(rows)
+    chosen = _select_keys(list(samples.keys()), samples, max_n)
+
+    chosen_files = [k for k in chosen if not k.startswith("#")]
+    pack_idx = sorted(int(k[1:]) for k in chosen if k.startswith("#"))
+    chunk_size = max(1, int(chunk_size))
+
+    batch: List[np.ndarray] = []
+    for name in chosen_files:
+        img = cv2.imread(str(person_dir / name), cv2.IMREAD_GRAYSCALE)
+        if img is None:
+            continue
+        batch.append(cv2.resize(img, (200, 200)))
+        if len(batch) >= chunk_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+    # Pack: pass sekuensial via memmap, per chunk
+    for i in range(0, len(pack_idx), chunk_size):
+        faces = face_pack.read_faces(person_dir, pack_idx[i : i + chunk_size])
+        if len(faces):
+            yield list(faces)
+
+
+def resident_ids_by_folder() -> Dict[str, int]:
+    """Map safe_name folder dataset -> `residents.id`."""
+    return {
+        make_safe_name(r["name"]): int(r["id"])
+        for r in get_all_residents()
+        if r.get("name")
     }
 
 
@@ -292,6 +514,12 @@ def train_lbph_model(max_images_per_person: int = 200) -> Dict[str, object]:
 
     Parameter:
     - max_images_per_person: batasi jumlah gambar per folder agar training tidak terlalu berat.
+      Sampel dipilih per penghuni oleh `iter_person_faces` (`_select_keys`, default:
+      kualitas + keberagaman), dari file JPEG maupun pack (`face_pack`), lalu
+      di-stream per chunk ke `lbph_training.train_to_file`.
+
+    Label model = id penghuni di DB (stabil), sehingga rename penghuni cukup
+    update metadata tanpa retrain. Folder tanpa penghuni terdaftar dilewati.
 
     Return dict berisi path model & ringkasan jumlah data.
     """
@@ -306,75 +534,281 @@ def train_lbph_model(max_images_per_person: int = 200) -> Dict[str, object]:
             "cv2.face tidak ditemukan. Gunakan 'opencv-contrib-python', bukan 'opencv-python'."
         )
 
-    recognizer = cv2.face.LBPHFaceRecognizer_create()
-
-    current_id = 0
+    resident_ids = resident_ids_by_folder()
     label_ids: Dict[str, int] = {}
-    x_train: List[np.ndarray] = []
-    y_labels: List[int] = []
+    skipped_dirs: List[str] = []
+    jobs: List[Tuple[str, int]] = []
+    weights: List[int] = []
 
     # Folder per orang = 1 kelas
     person_dirs = [p for p in FACES_DIR.iterdir() if p.is_dir()]
     person_dirs.sort(key=lambda p: p.name.lower())
 
     for person_dir in person_dirs:
-        label = person_dir.name
-        if label not in label_ids:
-            label_ids[label] = current_id
-            current_id += 1
-        id_ = label_ids[label]
-
-        img_paths = [
-            p
-            for p in person_dir.iterdir()
-            if p.is_file() and p.suffix.lower() in IMAGE_EXTS
-        ]
-        img_paths.sort(key=lambda p: p.name)
-        img_paths = _sample_paths(img_paths, max_images_per_person)
-
-        for img_path in img_paths:
-            img = cv2.imread(str(img_path), cv2.IMREAD_GRAYSCALE)
-            if img is None:
-                continue
-            img = cv2.resize(img, (200, 200))
-            x_train.append(img)
-            y_labels.append(id_)
-
-    if not x_train:
-        raise ValueError(
-            "Dataset kosong: tidak ada wajah yang bisa dipakai training. "
-            "Pastikan upload sudah berhasil dan wajah terdeteksi."
-        )
-
-    x_arr = np.array(x_train, dtype="uint8")
-    y_arr = np.array(y_labels, dtype=np.int32)
-
-    started = time.time()
-    recognizer.train(x_arr, y_arr)
-    train_seconds = time.time() - started
+        id_ = resident_ids.get(person_dir.name)
+        if id_ is None:
+            # Dataset belum/tidak terhubung ke penghuni di DB
+            skipped_dirs.append(person_dir.name)
+            continue
+        label_ids[person_dir.name] = id_
+        jobs.append((str(person_dir), id_))
+        weights.append(count_faces(person_dir))
 
+    # Histogram dihitung per penghuni di process pool dan langsung di-stream ke
+    # file model (tanpa menampung seluruh gambar/histogram di memori)
     MODELS_DIR.mkdir(parents=True, exist_ok=True)
-    recognizer.write(str(MODEL_PATH))
-
-    with open(LABELS_PATH, "wb") as f:
-        pickle.dump(label_ids, f)
+    # 1 training dalam 1 waktu, juga antar proses (file .tmp model sama)
+    with ProcessLock(MODEL_LOCK_PATH):
+        started = time.time()
+        result = lbph_training.train_to_file(
+            jobs, max_images_per_person, MODEL_PATH, weights=weights
+        )
+        train_seconds = time.time() - started
+
+        if not result["num_samples"]:
+            raise ValueError(
+                "Dataset kosong: tidak ada wajah yang bisa dipakai training. "
+                "Pastikan upload sudah berhasil dan wajah terdeteksi."
+            )
+
+        # Nama folder hanya info (saat training); nama tampilan diambil dari DB.
+        # Training penuh = model baru yang sudah compact (tanpa label yang di-mask).
+        _save_labels(
+            {
+                "format": LABELS_FORMAT,
+                "labels": {id_: safe_name for safe_name, id_ in label_ids.items()},
+                "removed": [],
+            }
+        )
 
     return {
         "model_path": str(MODEL_PATH),
         "labels_path": str(LABELS_PATH),
         "num_classes": len(label_ids),
-        "num_samples": len(x_train),
+        "num_samples": int(result["num_samples"]),
         "max_images_per_person": max_images_per_person,
         "train_seconds": round(train_seconds, 3),
+        "train_workers": result["workers"],
+        "peak_memory_mb": result["peak_memory_mb"],
         "label_ids": label_ids,
+        "skipped_dirs": skipped_dirs,
     }
 
 
+def _load_labels() -> Dict[object, object]:
+    with open(LABELS_PATH, "rb") as f:
+        return pickle.load(f)
+
+
+def _save_labels(labels: Dict[object, object]) -> None:
+    """Tulis labels.pkl secara atomik (reader tidak pernah melihat file setengah jadi)."""
+    MODELS_DIR.mkdir(parents=True, exist_ok=True)
+    tmp_path = LABELS_PATH.with_name(LABELS_PATH.name + ".tmp")
+    with open(tmp_path, "wb") as f:
+        pickle.dump(labels, f)
+    os.replace(tmp_path, LABELS_PATH)
+
+
+def model_signature() -> Tuple[float, float]:
+    """Versi model yang sedang dipublish (mtime model + labels), untuk invalidasi cache."""
+    model_mtime = MODEL_PATH.stat().st_mtime if MODEL_PATH.exists() else 0.0
+    labels_mtime = LABELS_PATH.stat().st_mtime if LABELS_PATH.exists() else 0.0
+    return model_mtime, labels_mtime
+
+
+def remove_resident_from_model(resident_id: int) -> bool:
+    """Keluarkan 1 penghuni dari model tanpa retrain (hanya update labels.pkl).
+
+    Label penghuni ditandai "removed"; histogramnya tetap ada di file model
+    tetapi diabaikan saat prediksi, sampai di-compact (`compact_model`, dijadwalkan
+    di background oleh endpoint hapus) atau training penuh berikutnya. Waktu
+    eksekusi tidak bergantung ukuran galeri.
+
+    Return False jika model memakai format label lama (perlu retrain penuh).
+    """
+    if not MODEL_PATH.exists() or not LABELS_PATH.exists():
+        return True
+
+    # Read-modify-write labels.pkl: jangan sampai bertabrakan dengan training/hapus lain
+    with ProcessLock(MODEL_LOCK_PATH):
+        labels = _load_labels()
+        if labels.get("format") != LABELS_FORMAT:
+            return False
+
+        resident_id = int(resident_id)
+        known = {int(k) for k in dict(labels.get("labels") or {})}
+        removed = {int(x) for x in labels.get("removed") or []}
+        if resident_id not in known or resident_id in removed:
+            return True
+
+        removed.add(resident_id)
+        labels["removed"] = sorted(removed)
+        _save_labels(labels)
+    return True
+
+
+def masked_label_count() -> int:
+    """Jumlah penghuni yang di-mask di model (hilang setelah compact / training penuh)."""
+    try:
+        return len(_load_labels().get("removed") or [])
+    except Exception:
+        return 0
+
+
+def _rewrite_model(relabel: Dict[int, int]) -> int:
+    """Tulis ulang file model: hanya sampel berlabel di `relabel`, dengan label barunya.
+
+    Dipanggil dengan MODEL_LOCK_PATH dipegang. Return jumlah sampel yang ditulis;
+    0 = file model lama dibiarkan (model kosong tidak bisa dipakai predict).
+    """
+    recognizer = cv2.face.LBPHFaceRecognizer_create()
+    recognizer.read(str(MODEL_PATH))
+    params = {
+        "radius": int(recognizer.getRadius()),
+        "neighbors": int(recognizer.getNeighbors()),
+        "grid_x": int(recognizer.getGridX()),
+        "grid_y": int(recognizer.getGridY()),
+    }
+    sample_labels = np.asarray(recognizer.getLabels()).ravel()
+    keep = np.flatnonzero(np.isin(sample_labels, list(relabel)))
+    if not keep.size:
+        return 0
+
+    histograms = recognizer.getHistograms()
+    writer = lbph_training.LBPHModelWriter(MODEL_PATH, params)
+    try:
+        for i in keep:
+            writer.write(relabel[int(sample_labels[i])], histograms[i])
+    except BaseException:
+        writer.abort()
+        raise
+    writer.close()
+    return writer.count
+
+
+def compact_model() -> bool:
+    """Tulis ulang file model tanpa histogram label yang di-mask.
+
+    Selama ada label di-mask, prediksi harus menelusuri semua sampel di Python
+    (`_predict_unmasked`), bukan `predict` native. Compact mengembalikan jalur
+    cepat dengan biaya 1x baca + tulis ulang seluruh model (sebanding ukuran
+    galeri), karena itu dijalankan di background, bukan di request hapus.
+
+    Return True jika model di-compact.
+    """
+    if cv2 is None or not MODEL_PATH.exists() or not LABELS_PATH.exists():
+        return False
+
+    with ProcessLock(MODEL_LOCK_PATH):
+        labels = _load_labels()
+        removed = {int(x) for x in labels.get("removed") or []}
+        if labels.get("format") != LABELS_FORMAT or not removed:
+            return False
+
+        kept = {int(k) for k in dict(labels.get("labels") or {})} - removed
+        # Semua penghuni dihapus: biarkan di-mask
+        if not _rewrite_model({k: k for k in kept}):
+            return False
+
+        # Model dulu baru labels: reader yang melihat model baru + labels lama
+        # hanya me-mask label yang sudah tidak punya sampel
+        labels["labels"] = {k: v for k, v in dict(labels.get("labels") or {}).items() if int(k) not in removed}
+        labels["removed"] = []
+        _save_labels(labels)
+    return True
+
+
+def migrate_legacy_labels() -> bool:
+    """Ubah model berlabel format lama ({safe_name: label}) ke label = id penghuni.
+
+    Model format lama mencocokkan label ke penghuni lewat nama folder, jadi
+    rename penghuni membuatnya jadi Unknown. Panggil sebelum nama di DB berubah
+    (nama lama masih cocok). Label tanpa penghuni terdaftar dibuang (memang
+    selalu Unknown).
+
+    Return True jika model (sekarang) memakai label id penghuni atau belum ada
+    model; False jika tidak bisa dimigrasi (pemanggil perlu retrain penuh).
+    """
+    if not MODEL_PATH.exists() or not LABELS_PATH.exists():
+        return True
+    if cv2 is None:
+        return False
+
+    with ProcessLock(MODEL_LOCK_PATH):
+        labels = _load_labels()
+        if labels.get("format") == LABELS_FORMAT:
+            return True
+
+        resident_ids = resident_ids_by_folder()
+        relabel = {
+            int(label): resident_ids[str(safe_name)]
+            for safe_name, label in labels.items()
+            if str(safe_name) in resident_ids
+        }
+        if not relabel or not _rewrite_model(relabel):
+            return False
+        _save_labels(
+            {
+                "format": LABELS_FORMAT,
+                "labels": {id_: str(safe_name) for safe_name, id_ in resident_ids.items() if id_ in relabel.values()},
+                "removed": [],
+            }
+        )
+    return True
+
+
+_COMPACT_LOCK = threading.Lock()
+_compact_thread: Optional[threading.Thread] = None
+_compact_pending = False
+
+
+def schedule_model_compaction() -> None:
+    """Jalankan `compact_model` di thread background; hapus beruntun digabung."""
+    global _compact_thread, _compact_pending
+    with _COMPACT_LOCK:
+        _compact_pending = True
+        if _compact_thread is None:
+            _compact_thread = threading.Thread(target=_compact_loop, name="model-compact", daemon=True)
+            _compact_thread.start()
+
+
+def _compact_loop() -> None:
+    global _compact_thread, _compact_pending
+    while True:
+        with _COMPACT_LOCK:
+            if not _compact_pending:
+                _compact_thread = None
+                return
+            _compact_pending = False
+        try:
+            compact_model()
+        except Exception as e:
+            print(f"Gagal compact model: {e}")
+
+
 @dataclass
 class LoadedLBPHModel:
     recognizer: object
-    id_to_label: Dict[int, str]
+    # label model -> id penghuni
+    id_to_label: Dict[int, int]
     threshold: float
+    # label model yang di-mask (penghuni dihapus, belum di-compact)
+    removed: frozenset = frozenset()
+
+
+def _label_to_resident_id(labels: Dict[object, object]) -> Dict[int, int]:
+    """Baca isi labels.pkl (format baru / lama) -> map label model -> id penghuni."""
+    if labels.get("format") == LABELS_FORMAT:
+        removed = {int(x) for x in labels.get("removed") or []}
+        return {int(k): int(k) for k in dict(labels.get("labels") or {}) if int(k) not in removed}
+
+    # Format lama: {safe_name: label} -> cocokkan ke penghuni lewat nama folder
+    resident_ids = resident_ids_by_folder()
+    return {
+        int(label): resident_ids[str(safe_name)]
+        for safe_name, label in labels.items()
+        if str(safe_name) in resident_ids
+    }
 
 
 def load_lbph_model(threshold: float = 60.0) -> LoadedLBPHModel:
@@ -395,50 +829,97 @@ def load_lbph_model(threshold: float = 60.0) -> LoadedLBPHModel:
     recognizer = cv2.face.LBPHFaceRecognizer_create()
     recognizer.read(str(MODEL_PATH))
 
-    with open(LABELS_PATH, "rb") as f:
-        label_ids: Dict[str, int] = pickle.load(f)
+    labels = _load_labels()
+    id_to_label = _label_to_resident_id(labels)
+    removed = frozenset(int(x) for x in labels.get("removed") or [])
 
-    id_to_label = {v: k for k, v in label_ids.items()}
+    return LoadedLBPHModel(
+        recognizer=recognizer,
+        id_to_label=id_to_label,
+        threshold=float(threshold),
+        removed=removed,
+    )
 
-    return LoadedLBPHModel(recognizer=recognizer, id_to_label=id_to_label, threshold=float(threshold))
+
+def _predict_unmasked(face_gray_200: np.ndarray, model: LoadedLBPHModel) -> Tuple[int, float]:
+    """Nearest neighbour yang labelnya tidak di-mask.
+
+    Dengan label di-mask, semua jarak dikumpulkan lalu disaring di Python (O(sampel)
+    per wajah); hanya sementara sampai `compact_model` selesai.
+    """
+    if not model.removed:
+        return model.recognizer.predict(face_gray_200)
+
+    collector = cv2.face.StandardCollector_create()
+    model.recognizer.predict_collect(face_gray_200, collector)
+    for label, dist in collector.getResults(True):
+        if int(label) not in model.removed:
+            return int(label), float(dist)
+    return -1, float("inf")
 
 
 def predict_face(
     face_gray_200: np.ndarray,
     model: LoadedLBPHModel,
-) -> Tuple[str, float, bool]:
+) -> Tuple[Optional[int], float, bool]:
     """Prediksi 1 wajah (sudah grayscale 200x200).
 
     Return:
-    - label: folder name (safe_name) atau 'Unknown'
+    - resident_id: id penghuni (nama tampilan di-resolve pemanggil dari DB) atau None
     - confidence: nilai LBPH (semakin kecil semakin yakin)
     - is_unknown: True jika melewati threshold
     """
-    pred_id, confidence = model.recognizer.predict(face_gray_200)
+    pred_id, confidence = _predict_unmasked(face_gray_200, model)
     confidence_f = float(confidence)
 
     if confidence_f >= model.threshold:
-        return "Unknown", confidence_f, True
+        return None, confidence_f, True
 
-    label = model.id_to_label.get(int(pred_id), "Unknown")
-    if label == "Unknown":
-        return "Unknown", confidence_f, True
+    resident_id = model.id_to_label.get(int(pred_id))
+    if resident_id is None:
+        return None, confidence_f, True
 
-    return label, confidence_f, False
+    return resident_id, confidence_f, False
 
 
-def save_snapshot(frame_bgr: np.ndarray, label: str) -> str:
-    """Simpan snapshot untuk event log."""
-    if cv2 is None:
-        raise RuntimeError("OpenCV (cv2) belum tersedia. Install opencv-contrib-python.")
+def predict_faces(
+    faces: Sequence[np.ndarray],
+    model: LoadedLBPHModel,
+    executor: Optional[Executor] = None,
+) -> List[Tuple[Optional[int], float, bool]]:
+    """Prediksi banyak wajah sekaligus (micro-batch), hasil berurutan sesuai input.
 
-    ensure_dirs()
-    ts = time.strftime("%Y%m%d_%H%M%S")
-    safe_label = make_safe_name(label) if label else "event"
-    filename = f"{ts}_{safe_label}.jpg"
-    out_path = SNAPSHOTS_DIR / filename
-    cv2.imwrite(str(out_path), frame_bgr)
-    return str(out_path)
+    `predict` LBPH melepas GIL dan tidak mengubah state recognizer, jadi dengan
+    `executor` (thread pool) 1 batch diproses paralel di semua core.
+    """
+    if executor is None or len(faces) <= 1:
+        return [predict_face(f, model) for f in faces]
+    return list(executor.map(lambda f: predict_face(f, model), faces))
+
+
+def resident_display_names() -> Dict[int, str]:
+    """Map id penghuni -> nama tampilan (selalu nama terbaru di DB)."""
+    return {int(r["id"]): r["name"] for r in get_all_residents() if r.get("name")}
+
+
+def save_snapshot(
+    frame_bgr: np.ndarray,
+    label: str,
+    bbox: Optional[Tuple[int, int, int, int]] = None,
+    face_gray: Optional[np.ndarray] = None,
+    ts: Optional[float] = None,
+) -> str:
+    """Simpan snapshot untuk event log.
+
+    Referensi relatif `<YYYYmmdd>/<file>.jpg` dikembalikan langsung (bisa ditulis
+    ke event), sedangkan encoding JPEG berjalan di background (lihat
+    `snapshot_store`). `bbox` dipakai jika SNAPSHOT_FACE_ONLY aktif; `face_gray`
+    dipakai untuk menekan snapshot yang hampir sama (dHash). `ts` = waktu frame
+    (default: sekarang), menentukan shard hari.
+    """
+    from . import snapshot_store
+
+    return snapshot_store.submit_snapshot(frame_bgr, label, bbox=bbox, face_gray=face_gray, ts=ts)
 
 
 def get_env_int(name: str, default: int) -> int:
@@ -0,0 +1,137 @@
+"""Format dataset wajah "packed" (opsional) per penghuni.
+
+Alih-alih ribuan JPEG kecil di `dataset/faces/<safe_name>/`, wajah disimpan
+sebagai array uint8 append-only:
+- `faces.u8`  : N x 200 x 200 byte mentah (grayscale), berurutan
+- `pack.json` : manifest kecil {"version", "shape", "count", "samples": [entri index]}
+
+`count` di manifest adalah sumber kebenaran: data ditulis dulu, manifest
+di-replace atomik setelahnya, jadi sisa byte akibat crash di tengah append
+diabaikan (dan ditimpa pada append berikutnya).
+
+Training membaca pack via `np.memmap` dalam satu pass sekuensial.
+Aktifkan untuk upload baru dengan FACE_STORAGE=packed; folder lama bisa
+dikonversi memakai `python migrate_faces_to_pack.py`.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+PACK_DATA_FILENAME = "faces.u8"
+PACK_MANIFEST_FILENAME = "pack.json"
+PACK_VERSION = 1
+FACE_SHAPE = (200, 200)
+FACE_BYTES = FACE_SHAPE[0] * FACE_SHAPE[1]
+
+_LOCK = threading.Lock()
+
+
+def storage_mode() -> str:
+    """"files" (default, 1 JPEG per sampel) atau "packed"."""
+    mode = os.getenv("FACE_STORAGE", "files").strip().lower()
+    return "packed" if mode == "packed" else "files"
+
+
+def _empty_manifest() -> Dict[str, object]:
+    return {"version": PACK_VERSION, "shape": list(FACE_SHAPE), "count": 0, "samples": []}
+
+
+def load_manifest(resident_dir: Path) -> Dict[str, object]:
+    path = resident_dir / PACK_MANIFEST_FILENAME
+    if not path.exists():
+        return _empty_manifest()
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if int(data.get("version", 0)) != PACK_VERSION or list(data.get("shape") or []) != list(FACE_SHAPE):
+            print(f"Face Pack Error ({path}): versi/shape tidak dikenal")
+            return _empty_manifest()
+        return data
+    except Exception as e:
+        print(f"Face Pack Error ({path}): {e}")
+        return _empty_manifest()
+
+
+def _save_manifest(resident_dir: Path, manifest: Dict[str, object]) -> None:
+    path = resident_dir / PACK_MANIFEST_FILENAME
+    tmp_path = path.with_name(path.name + ".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+    os.replace(tmp_path, path)
+
+
+def pack_count(resident_dir: Path) -> int:
+    return int(load_manifest(resident_dir).get("count", 0))
+
+
+def append_faces(
+    resident_dir: Path,
+    faces: Sequence[np.ndarray],
+    entries: Sequence[Dict[str, object]],
+) -> int:
+    """Tambahkan wajah 200x200 ke pack (1 write sekuensial).
+
+    Return count baru; index wajah pertama yang ditambahkan = count - len(faces).
+    """
+    if not faces:
+        return pack_count(resident_dir)
+
+    block = np.ascontiguousarray(np.stack([np.asarray(f, dtype=np.uint8) for f in faces]))
+    if block.shape[1:] != FACE_SHAPE:
+        raise ValueError(f"Shape wajah harus {FACE_SHAPE}, dapat {block.shape[1:]}")
+
+    resident_dir.mkdir(parents=True, exist_ok=True)
+    data_path = resident_dir / PACK_DATA_FILENAME
+
+    with _LOCK:
+        manifest = load_manifest(resident_dir)
+        count = int(manifest.get("count", 0))
+
+        mode = "r+b" if data_path.exists() else "wb"
+        with open(data_path, mode) as f:
+            f.seek(count * FACE_BYTES)
+            f.write(block.tobytes())
+            f.truncate()
+            f.flush()
+            os.fsync(f.fileno())
+
+        samples = list(manifest.get("samples") or [])
+        samples.extend(dict(e) for e in entries)
+        # Jaga panjang list samples = count (entri kosong jika tidak diberikan)
+        while len(samples) < count + len(block):
+            samples.append({})
+        manifest["samples"] = samples[: count + len(block)]
+        manifest["count"] = count + len(block)
+        _save_manifest(resident_dir, manifest)
+        return int(manifest["count"])
+
+
+def open_pack(resident_dir: Path) -> Optional[np.ndarray]:
+    """Memmap read-only (count, 200, 200), atau None jika belum ada pack."""
+    count = pack_count(resident_dir)
+    data_path = resident_dir / PACK_DATA_FILENAME
+    if count <= 0 or not data_path.exists():
+        return None
+    available = data_path.stat().st_size // FACE_BYTES
+    count = min(count, int(available))
+    if count <= 0:
+        return None
+    return np.memmap(data_path, dtype=np.uint8, mode="r", shape=(count,) + FACE_SHAPE)
+
+
+def read_faces(resident_dir: Path, indices: Optional[List[int]] = None) -> np.ndarray:
+    """Baca wajah dari pack (indices diurutkan supaya akses disk sekuensial)."""
+    mm = open_pack(resident_dir)
+    if mm is None:
+        return np.empty((0,) + FACE_SHAPE, dtype=np.uint8)
+    if indices is None:
+        return np.array(mm)
+    idx = sorted(i for i in set(indices) if 0 <= i < mm.shape[0])
+    return np.array(mm[idx])
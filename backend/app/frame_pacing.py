@@ -0,0 +1,126 @@
+"""Negosiasi laju frame antara server dan dashboard (`/api/recognition/frame`).
+
+Tanpa ini tiap dashboard mengirim frame dengan interval tetap, berapa pun
+beban server. Sekarang tiap response /frame membawa saran `pacing`:
+- `next_interval_ms`: jeda sebelum klien ini mengirim frame berikutnya
+- `target_width`: lebar frame yang sebaiknya dikirim
+
+Perhitungan (per proses):
+- waktu layanan: rata-rata bergerak (EWMA) durasi total request /frame
+- klien aktif: id klien (header `X-Client-Id`, fallback IP) yang mengirim frame
+  dalam FRAME_CLIENT_WINDOW_SECONDS terakhir
+- kapasitas: FRAME_CAPACITY request paralel (default jumlah core)
+
+Supaya utilisasi tetap di bawah FRAME_TARGET_UTILIZATION, tiap klien diberi
+interval `klien_aktif x waktu_layanan / (kapasitas x utilisasi)`, dibatasi
+FRAME_MIN_INTERVAL_MS..FRAME_MAX_INTERVAL_MS. Jika request yang sedang diproses
+melebihi kapasitas (antrean menumpuk), interval dikali rasio antreannya.
+Makin besar tekanan (interval / interval minimum), makin kecil `target_width`
+(FRAME_WIDTHS, default 640,480,320, dan tidak lebih dari `max_side` deteksi
+yang sedang dipakai) sehingga upload, decode dan deteksi per frame juga lebih
+murah. Saat beban turun, saran kembali ke interval minimum dan lebar penuh.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+from typing import Dict, List, Optional
+
+from . import detection_slo, face_engine, metrics
+
+EWMA_ALPHA = 0.2
+
+
+def _widths() -> List[int]:
+    raw = os.getenv("FRAME_WIDTHS", "640,480,320")
+    try:
+        widths = sorted({int(x) for x in raw.split(",") if x.strip()}, reverse=True)
+    except ValueError:
+        widths = []
+    return [w for w in widths if w > 0] or [640]
+
+
+def _capacity() -> int:
+    n = face_engine.get_env_int("FRAME_CAPACITY", 0)
+    return n if n > 0 else (os.cpu_count() or 1)
+
+
+class FramePacer:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._clients: Dict[str, float] = {}
+        self._inflight = 0
+        self._service: Optional[float] = None
+        self._last_interval = 0.0
+
+    def begin(self, client: str) -> None:
+        now = time.time()
+        window = face_engine.get_env_float("FRAME_CLIENT_WINDOW_SECONDS", 10.0)
+        with self._lock:
+            self._inflight += 1
+            self._clients[client] = now
+            if len(self._clients) > 1 and min(self._clients.values()) < now - window:
+                self._clients = {c: ts for c, ts in self._clients.items() if ts >= now - window}
+
+    def end(self, seconds: float) -> None:
+        with self._lock:
+            self._inflight = max(0, self._inflight - 1)
+            if self._service is None:
+                self._service = seconds
+            else:
+                self._service = (1.0 - EWMA_ALPHA) * self._service + EWMA_ALPHA * seconds
+
+    def hints(self) -> Dict[str, int]:
+        min_ms = max(1.0, face_engine.get_env_float("FRAME_MIN_INTERVAL_MS", 1000.0))
+        max_ms = max(min_ms, face_engine.get_env_float("FRAME_MAX_INTERVAL_MS", 5000.0))
+        utilization = min(1.0, max(0.05, face_engine.get_env_float("FRAME_TARGET_UTILIZATION", 0.7)))
+        capacity = _capacity()
+
+        with self._lock:
+            clients = max(1, len(self._clients))
+            inflight = self._inflight
+            service = self._service or 0.0
+
+        interval_ms = clients * service * 1000.0 / (capacity * utilization)
+        if inflight > capacity:
+            interval_ms *= inflight / float(capacity)
+        interval_ms = min(max_ms, max(min_ms, interval_ms))
+
+        # Tekanan 1 = tanpa antrean; tiap kelipatan turun 1 tingkat lebar frame
+        widths = _widths()
+        pressure = interval_ms / min_ms
+        level = min(len(widths) - 1, max(0, int(pressure + 0.5) - 1))
+
+        # Deteksi sedang diturunkan (detection_slo)? frame lebih lebar dari itu percuma dikirim
+        width = min(widths[level], detection_slo.FRAME.params().max_side)
+
+        with self._lock:
+            self._last_interval = interval_ms / 1000.0
+        return {"next_interval_ms": int(round(interval_ms)), "target_width": width}
+
+    def inflight(self) -> int:
+        with self._lock:
+            return self._inflight
+
+    def active_clients(self) -> int:
+        window = face_engine.get_env_float("FRAME_CLIENT_WINDOW_SECONDS", 10.0)
+        cutoff = time.time() - window
+        with self._lock:
+            return sum(1 for ts in self._clients.values() if ts >= cutoff)
+
+    def last_interval(self) -> float:
+        with self._lock:
+            return self._last_interval
+
+
+PACER = FramePacer()
+
+metrics.register_gauge("hfg_frame_inflight", "Request /frame yang sedang diproses.", PACER.inflight)
+metrics.register_gauge(
+    "hfg_frame_clients", "Klien /frame aktif (FRAME_CLIENT_WINDOW_SECONDS terakhir).", PACER.active_clients
+)
+metrics.register_gauge(
+    "hfg_frame_suggested_interval_seconds", "Interval frame terakhir yang disarankan ke klien.", PACER.last_interval
+)
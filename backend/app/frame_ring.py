@@ -0,0 +1,142 @@
+"""Ring buffer frame di shared memory (tanpa pickle antar proses).
+
+Dipakai recognition worker mode proses (WORKER_MODE=process): proses kamera
+menulis frame BGR hasil decode ke ring, proses lain (recognition di proses
+yang sama, atau proses API untuk preview) membaca frame terbaru langsung dari
+memori bersama.
+
+Layout:
+- header global: [uint64 seq terakhir][uint32 jumlah slot][uint32 byte per slot]
+- per slot:      [uint64 seq][uint32 h][uint32 w][uint32 c][data frame]
+
+1 penulis, banyak pembaca. Penulis menandai slot (seq=0) sebelum menulis dan
+mengisi seq setelah selesai; pembaca mengecek seq sebelum & sesudah menyalin,
+jadi frame yang sedang ditimpa tidak pernah dikembalikan.
+"""
+
+from __future__ import annotations
+
+import struct
+from multiprocessing import shared_memory
+from typing import Optional, Tuple
+
+import numpy as np
+
+try:
+    import cv2
+except Exception:  # pragma: no cover
+    cv2 = None  # type: ignore
+
+_HEADER = struct.Struct("<QII")
+_SLOT = struct.Struct("<QIII")
+
+
+def _attach(name: str, untrack: bool) -> shared_memory.SharedMemory:
+    """Attach ke shared memory milik proses lain tanpa ikut menghapusnya saat exit."""
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)  # Python 3.13+
+    except TypeError:
+        shm = shared_memory.SharedMemory(name=name)
+        if not untrack:
+            return shm
+        try:
+            from multiprocessing import resource_tracker
+
+            # Python < 3.13: resource tracker akan unlink segmen milik pembuat saat proses ini exit
+            resource_tracker.unregister(shm._name, "shared_memory")  # type: ignore[attr-defined]
+        except Exception:
+            pass
+        return shm
+
+
+class FrameRing:
+    def __init__(self, shm: shared_memory.SharedMemory, owner: bool):
+        self._shm = shm
+        self._owner = owner
+        self._warned_resize = False
+        _seq, self.slots, self.slot_bytes = _HEADER.unpack_from(shm.buf, 0)
+
+    @property
+    def name(self) -> str:
+        return self._shm.name
+
+    @classmethod
+    def create(cls, slots: int, slot_bytes: int) -> "FrameRing":
+        size = _HEADER.size + slots * (_SLOT.size + slot_bytes)
+        shm = shared_memory.SharedMemory(create=True, size=size)
+        _HEADER.pack_into(shm.buf, 0, 0, slots, slot_bytes)
+        for i in range(slots):
+            _SLOT.pack_into(shm.buf, cls._slot_offset(i, slot_bytes), 0, 0, 0, 0)
+        return cls(shm, owner=True)
+
+    @classmethod
+    def attach(cls, name: str, untrack: bool = True) -> "FrameRing":
+        """Attach ke ring yang sudah ada.
+
+        `untrack=False` untuk child hasil spawn pembuat ring: resource tracker-nya
+        dipakai bersama, jadi unregister di child ikut menghapus catatan milik pembuat.
+        """
+        return cls(_attach(name, untrack), owner=False)
+
+    @staticmethod
+    def _slot_offset(index: int, slot_bytes: int) -> int:
+        return _HEADER.size + index * (_SLOT.size + slot_bytes)
+
+    def latest_seq(self) -> int:
+        return _HEADER.unpack_from(self._shm.buf, 0)[0]
+
+    def _fit(self, frame: np.ndarray) -> np.ndarray:
+        if frame.nbytes <= self.slot_bytes:
+            return frame
+        # Frame lebih besar dari slot: perkecil (rasio dipertahankan)
+        scale = (self.slot_bytes / float(frame.nbytes)) ** 0.5
+        h, w = frame.shape[:2]
+        size = (max(1, int(w * scale)), max(1, int(h * scale)))
+        if not self._warned_resize:
+            self._warned_resize = True
+            print(f"Frame Ring: frame {w}x{h} lebih besar dari slot ({self.slot_bytes} byte), diperkecil ke {size[0]}x{size[1]}")
+        return cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+
+    def write(self, frame: np.ndarray) -> int:
+        """Tulis 1 frame (uint8 HxW atau HxWxC) ke slot berikutnya; return seq-nya."""
+        frame = np.ascontiguousarray(self._fit(frame), dtype=np.uint8)
+        h, w = frame.shape[:2]
+        c = frame.shape[2] if frame.ndim == 3 else 1
+        buf = self._shm.buf
+        seq = self.latest_seq() + 1
+        offset = self._slot_offset(seq % self.slots, self.slot_bytes)
+
+        _SLOT.pack_into(buf, offset, 0, h, w, c)  # sedang ditulis
+        data_start = offset + _SLOT.size
+        buf[data_start : data_start + frame.nbytes] = frame.reshape(-1).data
+        _SLOT.pack_into(buf, offset, seq, h, w, c)
+        _HEADER.pack_into(buf, 0, seq, self.slots, self.slot_bytes)
+        return seq
+
+    def latest(self, after: int = 0) -> Optional[Tuple[int, np.ndarray]]:
+        """Salinan frame terbaru dengan seq > `after`, atau None jika belum ada / sedang ditimpa."""
+        seq = self.latest_seq()
+        if seq <= after:
+            return None
+        buf = self._shm.buf
+        offset = self._slot_offset(seq % self.slots, self.slot_bytes)
+        slot_seq, h, w, c = _SLOT.unpack_from(buf, offset)
+        if slot_seq != seq:
+            return None
+        n = h * w * c
+        data_start = offset + _SLOT.size
+        frame = np.frombuffer(buf[data_start : data_start + n], dtype=np.uint8).copy()
+        if _SLOT.unpack_from(buf, offset)[0] != seq:
+            return None  # ditimpa saat disalin
+        return seq, frame.reshape((h, w, c) if c > 1 else (h, w))
+
+    def close(self) -> None:
+        try:
+            self._shm.close()
+        except BufferError:
+            pass
+        if self._owner:
+            try:
+                self._shm.unlink()
+            except FileNotFoundError:
+                pass
@@ -0,0 +1,44 @@
+"""Utilitas kualitas & kemiripan gambar (ringan, berbasis OpenCV/NumPy).
+
+- `dhash`: difference hash 64-bit untuk deteksi gambar yang hampir sama
+- `hamming`: jarak antar hash (jumlah bit berbeda)
+- `sharpness`: variance of Laplacian (semakin kecil semakin blur)
+"""
+
+from __future__ import annotations
+
+import numpy as np
+
+try:
+    import cv2
+except Exception:  # pragma: no cover
+    cv2 = None  # type: ignore
+
+
+def dhash(gray: np.ndarray, hash_size: int = 8) -> int:
+    """Difference hash: bandingkan piksel bertetangga pada gambar (hash_size+1)xhash_size."""
+    if cv2 is None:
+        raise RuntimeError("OpenCV (cv2) belum tersedia. Install opencv-contrib-python.")
+    if gray.ndim == 3:
+        gray = cv2.cvtColor(gray, cv2.COLOR_BGR2GRAY)
+    small = cv2.resize(gray, (hash_size + 1, hash_size), interpolation=cv2.INTER_AREA)
+    diff = small[:, 1:] > small[:, :-1]
+    value = 0
+    for bit in diff.flatten():
+        value = (value << 1) | int(bit)
+    return value
+
+
+def hamming(a: int, b: int) -> int:
+    return bin(int(a) ^ int(b)).count("1")
+
+
+def sharpness(gray: np.ndarray) -> float:
+    """Variance of Laplacian; frame motion-blur/out-of-focus punya nilai kecil."""
+    if cv2 is None:
+        raise RuntimeError("OpenCV (cv2) belum tersedia. Install opencv-contrib-python.")
+    return float(cv2.Laplacian(gray, cv2.CV_64F).var())
+
+
+def is_near_duplicate(value: int, hashes: "list[int]", max_distance: int) -> bool:
+    return any(hamming(value, h) <= max_distance for h in hashes)
@@ -0,0 +1,366 @@
+"""Inference service: proses terpisah untuk prediksi LBPH dengan micro-batching.
+
+Tanpa service, prediksi berjalan inline di thread request `/frame` (dan di
+thread recognition worker), berebut GIL dengan API. Dengan service:
+- 1 proses memegang model dan menerima crop wajah 200x200 dari semua request
+  `/frame`, `/batch` dan recognition worker lewat Unix socket
+- crop dari banyak koneksi dikumpulkan ke antrean lalu dieksekusi per batch
+  (`face_engine.predict_faces`, thread pool INFERENCE_THREADS): batch dikirim
+  saat penuh (INFERENCE_MAX_BATCH) atau saat crop tertua sudah menunggu
+  INFERENCE_MAX_WAIT_MS. Saat beban rendah latency hanya bertambah max wait;
+  saat beban tinggi batch membesar dan throughput naik.
+- model di-reload otomatis jika `model_signature()` berubah (retrain / hapus)
+
+Klien (`predict_remote`) dipakai otomatis oleh `recognition_pipeline` jika
+INFERENCE_SOCKET di-set. INFERENCE_TIMEOUT_MS adalah budget total prediksi,
+termasuk fallback: klien hanya menunggu service selama budget dikurangi
+perkiraan biaya prediksi inline crop tsb (rata-rata bergerak dari fallback
+sebelumnya, minimal REMOTE_MIN_SHARE dari budget). Jika service tidak menjawab
+dalam waktu itu atau mati, prediksi jatuh kembali ke inline di proses
+pemanggil, jadi total tetap sekitar budget (bukan budget + inline).
+
+Crop yang budget klien-nya sudah habis sebelum sempat dieksekusi dibuang
+(tidak dihitung), supaya antrean tidak menumpuk pekerjaan yang sudah
+ditinggal klien saat overload.
+
+Protokol (per koneksi, request berurutan):
+- request:  [uint32 BE n][uint32 BE budget ms][n x 40000 byte crop uint8 200x200]
+- response: [uint32 BE n][n x (int32 BE resident_id, -1 = tidak ada; float64 BE jarak)]
+Threshold Unknown diterapkan di sisi klien (LBPH_THRESHOLD proses pemanggil).
+
+Menjalankan (dari folder backend/, Linux/macOS):
+    INFERENCE_SOCKET=/tmp/hfg-infer.sock python -m app.inference_service
+lalu jalankan server API dengan INFERENCE_SOCKET yang sama.
+"""
+
+from __future__ import annotations
+
+import os
+import queue
+import signal
+import socket
+import socketserver
+import struct
+import sys
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from . import face_engine, face_pack, metrics
+
+CROP_BYTES = face_pack.FACE_BYTES
+_COUNT = struct.Struct(">I")
+_HEADER = struct.Struct(">II")
+_RESULT = struct.Struct(">id")
+# Batas crop per request (mis. 1 frame penuh wajah atau 1 batch /batch)
+MAX_FACES_PER_REQUEST = 1024
+MODEL_CHECK_SECONDS = 1.0
+# Bagian budget yang selalu diberikan ke service, berapa pun perkiraan biaya inline
+REMOTE_MIN_SHARE = 0.25
+# Bobot rata-rata bergerak biaya prediksi inline per crop
+INLINE_SMOOTHING = 0.2
+
+INFERENCE_FALLBACK_TOTAL = metrics.REGISTRY.register(
+    metrics.Counter("hfg_inference_fallback_total", "Prediksi inline karena inference service gagal/timeout.")
+)
+
+
+class BudgetExceeded(Exception):
+    pass
+
+
+def socket_path() -> Optional[str]:
+    return os.getenv("INFERENCE_SOCKET") or None
+
+
+def _recv_exact(sock: socket.socket, n: int, deadline: Optional[float] = None) -> bytes:
+    """Baca tepat n byte. `deadline` (perf_counter) membatasi total waktu, bukan per recv."""
+    buf = bytearray(n)
+    view = memoryview(buf)
+    got = 0
+    while got < n:
+        if deadline is not None:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                raise socket.timeout("timed out")
+            sock.settimeout(remaining)
+        k = sock.recv_into(view[got:], n - got)
+        if k == 0:
+            raise ConnectionError("Koneksi ditutup")
+        got += k
+    return bytes(buf)
+
+
+# ---------------------------------------------------------------------
+# Server
+# ---------------------------------------------------------------------
+
+
+class MicroBatcher:
+    """Antrean crop lintas koneksi -> dieksekusi per micro-batch di 1 thread dispatcher."""
+
+    def __init__(self, max_batch: int, max_wait_ms: float, threads: int):
+        self.max_batch = max(1, max_batch)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+        # (crop, future, waktu masuk, deadline)
+        self._queue: "queue.Queue[Tuple[np.ndarray, Future, float, float]]" = queue.Queue()
+        self._pool = ThreadPoolExecutor(max_workers=max(1, threads)) if threads > 1 else None
+        self._model = None
+        self._signature: Tuple[float, float] = (0.0, 0.0)
+        self._model_checked = 0.0
+
+        self.batches = 0
+        self.faces = 0
+        self.expired = 0
+
+    def submit(self, face: np.ndarray, deadline: float) -> Future:
+        fut: Future = Future()
+        self._queue.put((face, fut, time.perf_counter(), deadline))
+        return fut
+
+    def model(self):
+        now = time.time()
+        if self._model is None or (now - self._model_checked) >= MODEL_CHECK_SECONDS:
+            self._model_checked = now
+            signature = face_engine.model_signature()
+            if self._model is None or signature != self._signature:
+                # Threshold diterapkan klien: service mengembalikan jarak mentah
+                self._model = face_engine.load_lbph_model(threshold=float("inf"))
+                self._signature = signature
+                print(f"Inference service: model dimuat (versi {signature[0]:.0f})")
+        return self._model
+
+    def _collect(self) -> List[Tuple[np.ndarray, Future, float, float]]:
+        batch = [self._queue.get()]
+        deadline = batch[0][2] + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            try:
+                # Crop yang sudah antre diambil tanpa menunggu; sisanya sampai deadline
+                item = self._queue.get_nowait() if remaining <= 0 else self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            batch.append(item)
+        return batch
+
+    def run_forever(self) -> None:
+        while True:
+            batch = self._collect()
+            now = time.perf_counter()
+            live = []
+            for item in batch:
+                if item[3] <= now:
+                    # Klien sudah fallback inline; jangan buang CPU untuk hasil yang tidak dibaca
+                    item[1].set_exception(BudgetExceeded())
+                    self.expired += 1
+                else:
+                    live.append(item)
+            if not live:
+                continue
+            try:
+                model = self.model()
+                with metrics.stage("predict_batch"):
+                    preds = face_engine.predict_faces([b[0] for b in live], model, self._pool)
+            except Exception as e:
+                for item in live:
+                    item[1].set_exception(e)
+                continue
+            for item, pred in zip(live, preds):
+                item[1].set_result(pred)
+            self.batches += 1
+            self.faces += len(live)
+
+
+class _Handler(socketserver.BaseRequestHandler):
+    def handle(self) -> None:
+        batcher: MicroBatcher = self.server.batcher  # type: ignore[attr-defined]
+        sock: socket.socket = self.request
+        while True:
+            try:
+                n, budget_ms = _HEADER.unpack(_recv_exact(sock, _HEADER.size))
+                if n > MAX_FACES_PER_REQUEST:
+                    return
+                payload = _recv_exact(sock, n * CROP_BYTES)
+            except (ConnectionError, OSError):
+                return
+
+            deadline = time.perf_counter() + budget_ms / 1000.0
+            faces = np.frombuffer(payload, dtype=np.uint8).reshape((n,) + face_pack.FACE_SHAPE)
+            futures = [batcher.submit(face, deadline) for face in faces]
+            out = [_COUNT.pack(n)]
+            try:
+                for fut in futures:
+                    resident_id, dist, _unknown = fut.result()
+                    out.append(_RESULT.pack(-1 if resident_id is None else int(resident_id), float(dist)))
+            except BudgetExceeded:
+                return
+            except Exception as e:
+                # Model belum ada / rusak: tutup koneksi, klien fallback inline
+                print(f"Inference service error: {e}")
+                return
+            try:
+                sock.sendall(b"".join(out))
+            except OSError:
+                return
+
+
+class _Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def serve(path: str) -> None:
+    batcher = MicroBatcher(
+        max_batch=face_engine.get_env_int("INFERENCE_MAX_BATCH", 32),
+        max_wait_ms=face_engine.get_env_float("INFERENCE_MAX_WAIT_MS", 5.0),
+        threads=face_engine.get_env_int("INFERENCE_THREADS", 0) or (os.cpu_count() or 1),
+    )
+    try:
+        # Muat model sebelum menerima koneksi supaya request pertama tidak lewat budget
+        batcher.model()
+    except Exception as e:
+        print(f"WARNING: Model belum bisa dimuat ({e}); dicoba lagi saat ada request.")
+    if os.path.exists(path):
+        os.unlink(path)  # socket sisa proses sebelumnya
+    server = _Server(path, _Handler)
+    server.batcher = batcher  # type: ignore[attr-defined]
+    threading.Thread(target=batcher.run_forever, daemon=True).start()
+    print(
+        f"Inference service di {path} (max_batch={batcher.max_batch}, "
+        f"max_wait={batcher.max_wait * 1000.0:.1f} ms)"
+    )
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if os.path.exists(path):
+            os.unlink(path)
+        print(
+            f"Inference service berhenti: {batcher.faces} wajah dalam {batcher.batches} batch, "
+            f"{batcher.expired} lewat budget"
+        )
+
+
+# ---------------------------------------------------------------------
+# Klien
+# ---------------------------------------------------------------------
+
+_LOCAL = threading.local()
+# Setelah gagal konek, jangan coba lagi tiap request (hindari latency tambahan)
+_RETRY_SECONDS = 5.0
+_down_until = 0.0
+# Perkiraan biaya prediksi inline per crop (detik), diukur saat fallback
+_inline_per_face = 0.0
+
+
+def _connection(path: str, timeout: float) -> socket.socket:
+    sock = getattr(_LOCAL, "sock", None)
+    if sock is None:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(timeout)
+        sock.connect(path)
+        _LOCAL.sock = sock
+    sock.settimeout(timeout)
+    return sock
+
+
+def _drop_connection() -> None:
+    sock = getattr(_LOCAL, "sock", None)
+    _LOCAL.sock = None
+    if sock is not None:
+        try:
+            sock.close()
+        except OSError:
+            pass
+
+
+def record_inline(seconds: float, n: int) -> None:
+    """Catat durasi prediksi inline (fallback) untuk menyisakan waktunya di budget berikutnya."""
+    global _inline_per_face
+    if n <= 0:
+        return
+    per_face = seconds / n
+    if _inline_per_face <= 0:
+        _inline_per_face = per_face
+    else:
+        _inline_per_face = (1.0 - INLINE_SMOOTHING) * _inline_per_face + INLINE_SMOOTHING * per_face
+
+
+def remote_budget_ms(n: int) -> float:
+    """Waktu tunggu service untuk n crop: budget total dikurangi perkiraan fallback inline."""
+    budget_ms = max(1.0, face_engine.get_env_float("INFERENCE_TIMEOUT_MS", 200.0))
+    reserve_ms = _inline_per_face * n * 1000.0
+    return max(budget_ms * REMOTE_MIN_SHARE, budget_ms - reserve_ms)
+
+
+def predict_remote(
+    faces: Sequence[np.ndarray],
+    threshold: float,
+    path: Optional[str] = None,
+) -> Optional[List[Tuple[Optional[int], float, bool]]]:
+    """Prediksi lewat inference service; None jika service tidak tersedia / lewat budget.
+
+    Format hasil sama dengan `face_engine.predict_face`.
+    """
+    global _down_until
+
+    path = path or socket_path()
+    if not path or not faces or not hasattr(socket, "AF_UNIX") or time.time() < _down_until:
+        return None
+
+    budget_ms = remote_budget_ms(len(faces))
+    timeout = budget_ms / 1000.0
+    deadline = time.perf_counter() + timeout
+    payload = b"".join(np.ascontiguousarray(f, dtype=np.uint8).tobytes() for f in faces)
+    if len(payload) != len(faces) * CROP_BYTES:
+        return None
+
+    try:
+        sock = _connection(path, timeout)
+        sock.sendall(_HEADER.pack(len(faces), max(1, int(budget_ms))) + payload)
+        (n,) = _COUNT.unpack(_recv_exact(sock, _COUNT.size, deadline))
+        raw = _recv_exact(sock, n * _RESULT.size, deadline)
+    except (FileNotFoundError, ConnectionRefusedError):
+        _drop_connection()
+        _down_until = time.time() + _RETRY_SECONDS
+        INFERENCE_FALLBACK_TOTAL.inc(reason="unavailable")
+        return None
+    except (OSError, ConnectionError, struct.error) as e:
+        # Timeout / koneksi putus: state koneksi tidak jelas, buat ulang di request berikutnya
+        _drop_connection()
+        INFERENCE_FALLBACK_TOTAL.inc(reason="timeout" if isinstance(e, socket.timeout) else "error")
+        return None
+
+    out: List[Tuple[Optional[int], float, bool]] = []
+    for resident_id, dist in _RESULT.iter_unpack(raw):
+        if resident_id < 0 or dist >= threshold:
+            out.append((None, float(dist), True))
+        else:
+            out.append((int(resident_id), float(dist), False))
+    return out
+
+
+def _raise_interrupt(signum, frame) -> None:
+    raise KeyboardInterrupt
+
+
+def main() -> int:
+    path = socket_path()
+    if not path:
+        print("Set INFERENCE_SOCKET (path Unix socket), mis. /tmp/hfg-infer.sock")
+        return 1
+    if not hasattr(socket, "AF_UNIX"):
+        print("Unix socket tidak tersedia di OS ini.")
+        return 1
+    # systemd / kill: berhenti rapi (hapus file socket)
+    signal.signal(signal.SIGTERM, _raise_interrupt)
+    serve(path)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
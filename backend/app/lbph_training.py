@@ -0,0 +1,295 @@
+"""Training LBPH paralel (per penghuni) + streaming merge histogram.
+
+`recognizer.train` OpenCV menghitung histogram LBP semua sampel di 1 thread,
+setelah seluruh dataset dimuat sebagai 1 array. Di sini:
+- tiap penghuni = 1 task di process pool (terbesar dulu supaya beban rata):
+  wajah dibaca per chunk (TRAIN_CHUNK_SIZE), histogram LBPH dihitung dengan
+  recognizer sementara, lalu dikembalikan bersama labelnya
+- parent langsung menulis histogram tiap penghuni ke file model (format sama
+  persis dengan `LBPHFaceRecognizer.write`) lalu membuangnya; jumlah task
+  yang hasilnya belum ditulis dibatasi (2 x jumlah proses)
+
+Jadi gambar mentah maupun histogram seluruh dataset tidak pernah berada di
+memori sekaligus: puncak memori ~ beberapa penghuni, bukan ukuran galeri.
+
+Karena LBPH tidak punya tahap "fitting" global (model = daftar histogram per
+sampel + label), hasil merge identik dengan training 1 proses.
+
+Jumlah proses: TRAIN_WORKERS (default 0 = jumlah core, dibatasi memori yang
+tersedia / TRAIN_WORKER_MEMORY_MB per proses). Puncak memori dilaporkan dari
+sampling RSS (/proc, Linux) proses ini + worker pool selama training berjalan.
+"""
+
+from __future__ import annotations
+
+import multiprocessing
+import os
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Deque, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+try:
+    import cv2
+except Exception:  # pragma: no cover
+    cv2 = None  # type: ignore
+
+# (path folder penghuni, label model)
+Job = Tuple[str, int]
+
+
+def _available_memory_mb() -> Optional[float]:
+    """MemAvailable (Linux); None jika tidak diketahui."""
+    try:
+        with open("/proc/meminfo") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) / 1024.0
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+
+def train_workers() -> int:
+    try:
+        n = int(os.getenv("TRAIN_WORKERS", "0"))
+    except ValueError:
+        n = 0
+    if n > 0:
+        return n
+    n = os.cpu_count() or 1
+    # Tiap worker = proses spawn + cv2 + chunk wajah: jangan melebihi memori yang tersedia
+    available = _available_memory_mb()
+    if available is not None:
+        try:
+            per_worker = max(1.0, float(os.getenv("TRAIN_WORKER_MEMORY_MB", "256")))
+        except ValueError:
+            per_worker = 256.0
+        n = min(n, int(available // per_worker))
+    return max(1, n)
+
+
+def train_chunk_size() -> int:
+    try:
+        return max(1, int(os.getenv("TRAIN_CHUNK_SIZE", "64")))
+    except ValueError:
+        return 64
+
+
+def lbph_params() -> Dict[str, int]:
+    """Parameter LBPH default OpenCV (radius, neighbors, grid)."""
+    r = cv2.face.LBPHFaceRecognizer_create()
+    return {
+        "radius": int(r.getRadius()),
+        "neighbors": int(r.getNeighbors()),
+        "grid_x": int(r.getGridX()),
+        "grid_y": int(r.getGridY()),
+    }
+
+
+def _person_histograms(job: Job, max_n: Optional[int], chunk_size: int) -> Tuple[int, Optional[np.ndarray]]:
+    """Histogram 1 penghuni (dipanggil di proses worker)."""
+    from .face_engine import iter_person_faces
+
+    person_dir, label = job
+    parts: List[np.ndarray] = []
+    for faces in iter_person_faces(Path(person_dir), max_n, chunk_size):
+        recognizer = cv2.face.LBPHFaceRecognizer_create()
+        recognizer.train(faces, np.full(len(faces), int(label), dtype=np.int32))
+        parts.append(np.vstack(recognizer.getHistograms()).astype(np.float32, copy=False))
+        del faces, recognizer
+
+    if not parts:
+        return int(label), None
+    return int(label), (parts[0] if len(parts) == 1 else np.vstack(parts))
+
+
+class LBPHModelWriter:
+    """Tulis model dengan format `LBPHFaceRecognizer.write`, histogram di-stream per batch.
+
+    File ditulis ke .tmp lalu di-replace atomik saat `close()`.
+    """
+
+    def __init__(self, path: Path, params: Dict[str, int]):
+        self.path = path
+        # FileStorage memilih format dari ekstensi, jadi .tmp diletakkan sebelum .yml
+        self.tmp_path = path.with_name(path.stem + ".tmp" + path.suffix)
+        self.labels: List[np.ndarray] = []
+        self.count = 0
+
+        self._fs = cv2.FileStorage(str(self.tmp_path), cv2.FILE_STORAGE_WRITE)
+        self._fs.startWriteStruct("opencv_lbphfaces", cv2.FileNode_MAP)
+        self._fs.write("threshold", float(np.finfo(np.float64).max))
+        self._fs.write("radius", int(params["radius"]))
+        self._fs.write("neighbors", int(params["neighbors"]))
+        self._fs.write("grid_x", int(params["grid_x"]))
+        self._fs.write("grid_y", int(params["grid_y"]))
+        self._fs.startWriteStruct("histograms", cv2.FileNode_SEQ)
+
+    def write(self, label: int, histograms: np.ndarray) -> None:
+        for row in histograms:
+            self._fs.write("", row.reshape(1, -1))
+        self.labels.append(np.full(histograms.shape[0], int(label), dtype=np.int32))
+        self.count += int(histograms.shape[0])
+
+    def close(self) -> None:
+        fs = self._fs
+        fs.endWriteStruct()
+        labels = np.concatenate(self.labels) if self.labels else np.empty(0, dtype=np.int32)
+        fs.write("labels", labels.reshape(-1, 1))
+        fs.startWriteStruct("labelsInfo", cv2.FileNode_SEQ)
+        fs.endWriteStruct()
+        fs.endWriteStruct()
+        fs.release()
+        os.replace(self.tmp_path, self.path)
+
+    def abort(self) -> None:
+        try:
+            self._fs.release()
+        finally:
+            if self.tmp_path.exists():
+                self.tmp_path.unlink()
+
+
+def _iter_results(
+    jobs: Sequence[Job],
+    max_n: Optional[int],
+    chunk_size: int,
+    workers: int,
+    peak: Optional[_PeakRss] = None,
+) -> Iterator[Tuple[int, Optional[np.ndarray]]]:
+    if workers <= 1:
+        for job in jobs:
+            yield _person_histograms(job, max_n, chunk_size)
+        return
+
+    # spawn: aman dipanggil dari server multi-thread (tanpa fork state lock/koneksi)
+    ctx = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=ctx) as pool:
+        if peak is not None:
+            peak.pool = pool
+        pending: Deque = deque()
+        it = iter(jobs)
+        for job in it:
+            pending.append(pool.submit(_person_histograms, job, max_n, chunk_size))
+            # Batasi hasil yang menunggu ditulis (memori parent tetap kecil)
+            if len(pending) >= workers * 2:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def _rss_bytes(pid: int) -> Optional[int]:
+    """RSS 1 proses saat ini dari /proc (Linux); None jika tidak tersedia / proses sudah exit."""
+    try:
+        with open(f"/proc/{pid}/statm") as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class _PeakRss:
+    """Sampling RSS proses ini + worker pool selama 1 training (bukan puncak seumur proses)."""
+
+    def __init__(self, interval: float = 0.1):
+        self.interval = interval
+        self.pool: Optional[ProcessPoolExecutor] = None
+        self.process = 0
+        self.workers = 0
+        self.total = 0
+        self._supported = _rss_bytes(os.getpid()) is not None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="train-rss", daemon=True)
+
+    def __enter__(self) -> "_PeakRss":
+        if self._supported:
+            self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        if self._supported:
+            self._stop.set()
+            self._thread.join()
+
+    def _sample(self) -> None:
+        own = _rss_bytes(os.getpid()) or 0
+        pids = list(getattr(self.pool, "_processes", None) or {})
+        workers = sum(_rss_bytes(pid) or 0 for pid in pids)
+        self.process = max(self.process, own)
+        self.workers = max(self.workers, workers)
+        self.total = max(self.total, own + workers)
+
+    def _run(self) -> None:
+        while True:
+            self._sample()
+            if self._stop.wait(self.interval):
+                self._sample()
+                return
+
+    def summary(self, workers: int) -> Dict[str, Optional[float]]:
+        def mb(n: int) -> Optional[float]:
+            return round(n / (1024.0 * 1024.0), 1) if self._supported else None
+
+        return {
+            "process_rss": mb(self.process),
+            "workers_rss": mb(self.workers) if workers > 1 else None,
+            "total_rss": mb(self.total),
+        }
+
+
+def train_to_file(
+    jobs: Sequence[Job],
+    max_n: Optional[int],
+    path: Path,
+    weights: Optional[Sequence[int]] = None,
+    workers: Optional[int] = None,
+) -> Dict[str, object]:
+    """Hitung histogram semua penghuni dan stream ke file model.
+
+    Return ringkasan: num_samples, labels (label yang punya sampel), workers, peak_memory_mb.
+    File model hanya di-replace jika ada minimal 1 sampel.
+    """
+    workers = max(1, min(workers or train_workers(), len(jobs) or 1))
+    chunk_size = train_chunk_size()
+
+    order = list(range(len(jobs)))
+    if weights is not None:
+        # Penghuni terbesar dulu supaya proses terakhir tidak menunggu 1 task besar
+        order.sort(key=lambda i: -min(int(weights[i]), max_n or int(weights[i])))
+    ordered = [jobs[i] for i in order]
+
+    # Tanpa tracemalloc: dipanggil dari proses server, dan tracing memperlambat
+    # semua alokasi proses (request API ikut) serta me-reset peak tracer lain
+    writer = LBPHModelWriter(path, lbph_params())
+    trained_labels: List[int] = []
+    with _PeakRss() as peak:
+        try:
+            for label, hist in _iter_results(ordered, max_n, chunk_size, workers, peak):
+                if hist is None or not hist.shape[0]:
+                    continue
+                writer.write(label, hist)
+                trained_labels.append(label)
+                del hist
+        except BaseException:
+            writer.abort()
+            raise
+
+    if writer.count == 0:
+        writer.abort()
+    else:
+        writer.close()
+
+    return {
+        "num_samples": writer.count,
+        "labels": trained_labels,
+        "workers": workers,
+        "chunk_size": chunk_size,
+        # Puncak RSS selama training ini (None jika /proc tidak tersedia)
+        "peak_memory_mb": peak.summary(workers),
+    }
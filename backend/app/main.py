@@ -14,6 +14,7 @@ from .routes.events import events_bp
 from .routes.model import model_bp
 from .routes.recognition import recognition_bp
 from .routes.auth import auth_bp
+from .routes.metrics import metrics_bp
 
 
 def create_app():
@@ -44,6 +45,7 @@ def create_app():
     app.register_blueprint(model_bp, url_prefix="/api")
     app.register_blueprint(recognition_bp, url_prefix="/api")
     app.register_blueprint(auth_bp, url_prefix="/api")
+    app.register_blueprint(metrics_bp, url_prefix="/api")
 
     @app.route("/")
     def index():
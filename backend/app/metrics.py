@@ -0,0 +1,294 @@
+"""Metrics in-process (format teks Prometheus) untuk hot path recognition.
+
+Isi:
+- `hfg_stage_seconds{stage=...}`: durasi per tahap (decode, detect, model_load,
+  names, predict, add_event, snapshot, total) sebagai summary p50/p95/p99.
+  Quantile dihitung dari jendela observasi terakhir (METRICS_WINDOW, default
+  1024) per tahap; `_sum` dan `_count` kumulatif sejak proses start.
+- counter frame / wajah / Unknown / event / frame yang dilewati (per alasan)
+- gauge worker FPS, antrean (buffer SSE, frame batch yang sedang diproses)
+  dan versi model (mtime file model)
+
+Sengaja tanpa dependency `prometheus_client`: cukup dict + lock, dan nilai
+gauge yang mahal (mis. stat file model) baru dihitung saat di-scrape.
+
+Catatan: metrics per proses. Dengan gunicorn multi-worker, tiap scrape hanya
+melihat worker yang menjawab request tersebut.
+"""
+
+from __future__ import annotations
+
+import abc
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Callable, Deque, Dict, Iterator, List, Optional, Tuple
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+QUANTILES = (0.5, 0.95, 0.99)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _window_size() -> int:
+    try:
+        return max(16, int(os.getenv("METRICS_WINDOW", "1024")))
+    except ValueError:
+        return 1024
+
+
+def _label_key(labels: Dict[str, object]) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _format_labels(key: LabelKey, extra: Optional[Tuple[str, str]] = None) -> str:
+    items = list(key) + ([extra] if extra else [])
+    if not items:
+        return ""
+    escaped = (
+        (k, v.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')) for k, v in items
+    )
+    return "{" + ",".join(f'{k}="{v}"' for k, v in escaped) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value != value:  # NaN
+        return "NaN"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric(abc.ABC):
+    kind = "untyped"
+
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help = help_text
+        self._lock = threading.Lock()
+
+    @abc.abstractmethod
+    def samples(self) -> List[Tuple[str, LabelKey, Optional[Tuple[str, str]], float]]:
+        """Baris metric: (nama, label, label tambahan mis. quantile, nilai)."""
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for name, key, extra, value in self.samples():
+            lines.append(f"{name}{_format_labels(key, extra)} {_format_value(value)}")
+        return lines
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str):
+        super().__init__(name, help_text)
+        self._values: Dict[LabelKey, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: object) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: object) -> float:
+        with self._lock:
+            return self._values.get(_label_key(labels), 0.0)
+
+    def samples(self):
+        with self._lock:
+            return [(self.name, k, None, v) for k, v in sorted(self._values.items())]
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, name: str, help_text: str, func: Optional[Callable[[], Optional[float]]] = None):
+        super().__init__(name, help_text)
+        self._values: Dict[LabelKey, float] = {}
+        self._func = func
+
+    def set(self, value: float, **labels: object) -> None:
+        with self._lock:
+            self._values[_label_key(labels)] = float(value)
+
+    def inc(self, amount: float = 1.0, **labels: object) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels: object) -> None:
+        self.inc(-amount, **labels)
+
+    def samples(self):
+        if self._func is not None:
+            try:
+                value = self._func()
+            except Exception as e:
+                print(f"Metrics Error ({self.name}): {e}")
+                value = None
+            return [] if value is None else [(self.name, (), None, float(value))]
+        with self._lock:
+            return [(self.name, k, None, v) for k, v in sorted(self._values.items())]
+
+
+class Summary(_Metric):
+    """Summary dengan quantile dari jendela observasi terakhir."""
+
+    kind = "summary"
+
+    def __init__(self, name: str, help_text: str, window: Optional[int] = None):
+        super().__init__(name, help_text)
+        self._window = window or _window_size()
+        self._recent: Dict[LabelKey, Deque[float]] = {}
+        self._sum: Dict[LabelKey, float] = {}
+        self._count: Dict[LabelKey, int] = {}
+
+    def observe(self, value: float, **labels: object) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            recent = self._recent.get(key)
+            if recent is None:
+                recent = self._recent[key] = deque(maxlen=self._window)
+            recent.append(float(value))
+            self._sum[key] = self._sum.get(key, 0.0) + float(value)
+            self._count[key] = self._count.get(key, 0) + 1
+
+    def quantiles(self, **labels: object) -> Dict[float, float]:
+        with self._lock:
+            recent = list(self._recent.get(_label_key(labels), ()))
+        return _quantiles(recent)
+
+    def samples(self):
+        with self._lock:
+            snapshot = [(k, list(v), self._sum[k], self._count[k]) for k, v in sorted(self._recent.items())]
+        out = []
+        for key, recent, total, count in snapshot:
+            for q, v in _quantiles(recent).items():
+                out.append((self.name, key, ("quantile", str(q)), v))
+            out.append((self.name + "_sum", key, None, total))
+            out.append((self.name + "_count", key, None, float(count)))
+        return out
+
+
+def _quantiles(values: List[float]) -> Dict[float, float]:
+    if not values:
+        return {q: float("nan") for q in QUANTILES}
+    values.sort()
+    n = len(values)
+    return {q: values[min(n - 1, int(q * n))] for q in QUANTILES}
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics)
+        lines: List[str] = []
+        for m in metrics:
+            lines.extend(m.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+STAGE_SECONDS: Summary = REGISTRY.register(  # type: ignore[assignment]
+    Summary("hfg_stage_seconds", "Durasi per tahap recognition (detik).")
+)
+FRAMES_TOTAL: Counter = REGISTRY.register(  # type: ignore[assignment]
+    Counter("hfg_frames_total", "Frame yang diproses, per sumber (frame/batch/worker).")
+)
+FACES_TOTAL: Counter = REGISTRY.register(  # type: ignore[assignment]
+    Counter("hfg_faces_total", "Wajah terdeteksi, per sumber.")
+)
+UNKNOWN_TOTAL: Counter = REGISTRY.register(  # type: ignore[assignment]
+    Counter("hfg_unknown_total", "Wajah yang dikenali sebagai Unknown, per sumber.")
+)
+SKIPPED_TOTAL: Counter = REGISTRY.register(  # type: ignore[assignment]
+    Counter("hfg_skipped_total", "Frame tanpa event, per alasan (decode_error/no_face/debounce).")
+)
+EVENTS_TOTAL: Counter = REGISTRY.register(  # type: ignore[assignment]
+    Counter("hfg_events_total", "Event log yang ditulis, per sumber.")
+)
+WORKER_FPS: Gauge = REGISTRY.register(  # type: ignore[assignment]
+    Gauge("hfg_worker_fps", "Frame/detik recognition worker (rata-rata bergerak).")
+)
+WORKER_FPS.set(0.0)
+BATCH_INFLIGHT: Gauge = REGISTRY.register(  # type: ignore[assignment]
+    Gauge("hfg_batch_inflight_frames", "Frame /batch yang sedang diproses.")
+)
+
+
+def register_gauge(name: str, help_text: str, func: Callable[[], Optional[float]]) -> Gauge:
+    """Gauge yang nilainya dihitung saat scrape (mis. ukuran buffer, versi model)."""
+    return REGISTRY.register(Gauge(name, help_text, func=func))  # type: ignore[return-value]
+
+
+def render() -> str:
+    return REGISTRY.render()
+
+
+def record_result(result, source: str) -> None:
+    """Catat counter frame/wajah/Unknown dari 1 `FrameResult`."""
+    FRAMES_TOTAL.inc(source=source)
+    if not result.ok:
+        SKIPPED_TOTAL.inc(reason="decode_error")
+        return
+    if not result.detected:
+        SKIPPED_TOTAL.inc(reason="no_face")
+        return
+    FACES_TOTAL.inc(len(result.faces), source=source)
+    unknown = sum(1 for f in result.faces if not f.get("known"))
+    if unknown:
+        UNKNOWN_TOTAL.inc(unknown, source=source)
+
+
+class StageTimer:
+    """Kumpulan durasi tahap untuk 1 request (header `Server-Timing`)."""
+
+    def __init__(self):
+        self._started = time.perf_counter()
+        self._stages: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def add(self, name: str, seconds: float) -> None:
+        # Tahap yang sama bisa terjadi berkali-kali (mis. predict per wajah): dijumlah
+        with self._lock:
+            self._stages[name] = self._stages.get(name, 0.0) + seconds
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self._started
+
+    def total(self, *names: str) -> float:
+        """Jumlah durasi tahap-tahap tertentu (tahap yang tidak terjadi = 0)."""
+        with self._lock:
+            return sum(self._stages.get(name, 0.0) for name in names)
+
+    def server_timing(self, total: bool = True) -> str:
+        with self._lock:
+            parts = [f"{name};dur={s * 1000.0:.1f}" for name, s in self._stages.items()]
+        if total:
+            parts.append(f"total;dur={self.elapsed() * 1000.0:.1f}")
+        return ", ".join(parts)
+
+
+@contextmanager
+def stage(name: str, timer: Optional[StageTimer] = None) -> Iterator[None]:
+    """Ukur 1 tahap: masuk ke `hfg_stage_seconds` dan (jika ada) ke `timer`."""
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        dt = time.perf_counter() - t0
+        STAGE_SECONDS.observe(dt, stage=name)
+        if timer is not None:
+            timer.add(name, dt)
@@ -0,0 +1,97 @@
+"""Lock antar proses berbasis file (`fcntl.flock`).
+
+Dipakai saat backend dijalankan multi-proses (gunicorn pre-fork, lihat
+`gunicorn.conf.py`):
+- recognition worker (kamera) hanya boleh berjalan di 1 proses
+- training / update labels tidak boleh jalan bersamaan di 2 proses
+
+Lock dilepas otomatis oleh OS jika proses pemegangnya mati. Tiap `acquire`
+membuka file descriptor baru, jadi thread lain di proses yang sama juga
+ikut tertahan.
+
+Di OS tanpa `fcntl` (Windows) lock hanya berlaku di dalam 1 proses — cukup
+karena di sana backend dijalankan 1 proses (`run.py`).
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+from pathlib import Path
+from typing import Dict, Optional
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover (Windows)
+    fcntl = None  # type: ignore
+
+_LOCAL_LOCKS: Dict[str, threading.Lock] = {}
+_LOCAL_GUARD = threading.Lock()
+
+
+def _local_lock(path: Path) -> threading.Lock:
+    with _LOCAL_GUARD:
+        return _LOCAL_LOCKS.setdefault(str(path), threading.Lock())
+
+
+class ProcessLock:
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._fd: Optional[int] = None
+        self._local: Optional[threading.Lock] = None
+
+    @property
+    def held(self) -> bool:
+        """True jika lock dipegang objek ini."""
+        return self._fd is not None or self._local is not None
+
+    def acquire(self, blocking: bool = True) -> bool:
+        if self.held:
+            return True
+        if fcntl is None:
+            lock = _local_lock(self.path)
+            if not lock.acquire(blocking):
+                return False
+            self._local = lock
+            return True
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd = os.open(str(self.path), os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+        except BlockingIOError:
+            os.close(fd)
+            return False
+        except BaseException:
+            os.close(fd)
+            raise
+        self._fd = fd
+        return True
+
+    def release(self) -> None:
+        if self._fd is not None:
+            fd, self._fd = self._fd, None
+            try:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+            finally:
+                os.close(fd)
+        if self._local is not None:
+            lock, self._local = self._local, None
+            lock.release()
+
+    def locked_elsewhere(self) -> bool:
+        """True jika lock sedang dipegang proses/objek lain (cek tanpa menunggu)."""
+        if self.held:
+            return False
+        probe = ProcessLock(self.path)
+        if probe.acquire(blocking=False):
+            probe.release()
+            return False
+        return True
+
+    def __enter__(self) -> "ProcessLock":
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.release()
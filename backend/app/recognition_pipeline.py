@@ -0,0 +1,184 @@
+"""Pipeline recognition 1 frame: decode -> deteksi -> prediksi.
+
+Dipakai bersama oleh `/api/recognition/frame`, `/api/recognition/batch` dan
+tool offline, supaya aturan "primary face" (wajah terbesar) dan resolusi nama
+(id penghuni -> nama di DB) sama di semua jalur.
+
+Banyak frame diproses paralel dengan thread pool (`recognize_many`): decode,
+Haar cascade dan LBPH di OpenCV melepas GIL, jadi thread cukup tanpa biaya
+serialisasi antar proses.
+
+Jika INFERENCE_SOCKET di-set, prediksi dikirim ke inference service
+(`app.inference_service`, micro-batching lintas request) dengan fallback
+inline saat service tidak tersedia atau melewati budget latency.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+try:
+    import cv2
+except Exception:  # pragma: no cover
+    cv2 = None  # type: ignore
+
+from . import face_engine, inference_service, metrics
+
+# Thread pool bersama untuk semua request /batch (dibuat saat pertama dipakai)
+_EXECUTOR: Optional[ThreadPoolExecutor] = None
+_LOCK = threading.Lock()
+
+
+@dataclass
+class FrameResult:
+    ok: bool
+    image_size: Optional[Dict[str, int]] = None
+    faces: List[Dict[str, object]] = field(default_factory=list)
+    name: str = "Unknown"
+    status: str = "DITOLAK"
+    confidence: float = 9999.0
+    # Untuk snapshot Unknown (tidak ikut di JSON)
+    primary_face: Optional[np.ndarray] = None
+    primary_bbox: Optional[Tuple[int, int, int, int]] = None
+    error: Optional[str] = None
+
+    @property
+    def detected(self) -> bool:
+        return bool(self.faces)
+
+    @property
+    def is_unknown(self) -> bool:
+        return (str(self.name).strip().lower() == "unknown") or (self.status == "DITOLAK")
+
+    def to_dict(self) -> Dict[str, object]:
+        if not self.ok:
+            return {"detected": False, "faces": [], "error": self.error}
+        out: Dict[str, object] = {
+            "detected": self.detected,
+            "faces": self.faces,
+            "image_size": self.image_size,
+        }
+        if self.detected:
+            out.update({"name": self.name, "status": self.status, "confidence": float(self.confidence)})
+        return out
+
+
+def batch_workers() -> int:
+    try:
+        n = int(os.getenv("BATCH_WORKERS", "0"))
+    except ValueError:
+        n = 0
+    return n if n > 0 else min(4, os.cpu_count() or 1)
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _EXECUTOR
+    with _LOCK:
+        if _EXECUTOR is None:
+            _EXECUTOR = ThreadPoolExecutor(max_workers=batch_workers(), thread_name_prefix="recognize")
+        return _EXECUTOR
+
+
+def decode_frame(image_bytes: bytes, timer: Optional[metrics.StageTimer] = None) -> Optional[np.ndarray]:
+    with metrics.stage("decode", timer):
+        arr = np.frombuffer(image_bytes, dtype=np.uint8)
+        return cv2.imdecode(arr, cv2.IMREAD_COLOR)
+
+
+def predict_faces(
+    faces: Sequence[np.ndarray],
+    model: face_engine.LoadedLBPHModel,
+) -> List[Tuple[Optional[int], float, bool]]:
+    """Prediksi semua wajah 1 frame: lewat inference service jika aktif, selain itu inline."""
+    preds = inference_service.predict_remote(faces, model.threshold)
+    if preds is None:
+        started = time.perf_counter()
+        preds = face_engine.predict_faces(faces, model)
+        if inference_service.socket_path():
+            inference_service.record_inline(time.perf_counter() - started, len(faces))
+    return preds
+
+
+def recognize_frame(
+    frame: np.ndarray,
+    model: face_engine.LoadedLBPHModel,
+    id_to_name: Dict[int, str],
+    faces: Optional[List[Tuple[np.ndarray, Tuple[int, int, int, int]]]] = None,
+    timer: Optional[metrics.StageTimer] = None,
+) -> FrameResult:
+    """Deteksi semua wajah (kecuali `faces` sudah diberikan) + prediksi; primary = wajah terbesar."""
+    result = FrameResult(ok=True, image_size={"w": int(frame.shape[1]), "h": int(frame.shape[0])})
+
+    if faces is None:
+        with metrics.stage("detect", timer):
+            faces = face_engine.detect_faces_gray(frame)
+    if not faces:
+        return result
+
+    primary_idx = max(range(len(faces)), key=lambda i: faces[i][1][2] * faces[i][1][3])
+    result.primary_face, result.primary_bbox = faces[primary_idx]
+
+    with metrics.stage("predict", timer):
+        preds = predict_faces([f for f, _bbox in faces], model)
+
+    for i, ((face_gray, bbox), (resident_id, conf, is_unknown)) in enumerate(zip(faces, preds)):
+        if is_unknown or resident_id not in id_to_name:
+            # Id yang sudah dihapus dari DB juga dianggap Unknown
+            display_name = "Unknown"
+            status = "DITOLAK"
+            known = False
+        else:
+            display_name = id_to_name[resident_id]
+            status = "MASUK"
+            known = True
+
+        result.faces.append(
+            {
+                "bbox": {"x": int(bbox[0]), "y": int(bbox[1]), "w": int(bbox[2]), "h": int(bbox[3])},
+                "name": display_name,
+                "status": status,
+                "confidence": float(conf),
+                "known": bool(known),
+            }
+        )
+
+        if i == primary_idx:
+            result.name = display_name
+            result.status = status
+            result.confidence = float(conf)
+
+    return result
+
+
+def recognize_bytes(
+    image_bytes: bytes,
+    model: face_engine.LoadedLBPHModel,
+    id_to_name: Dict[int, str],
+) -> Tuple[FrameResult, Optional[np.ndarray]]:
+    """Decode + recognize. Return (hasil, frame BGR) — frame dipakai untuk snapshot."""
+    frame = decode_frame(image_bytes) if image_bytes else None
+    if frame is None:
+        return FrameResult(ok=False, error="Gagal decode gambar"), None
+    return recognize_frame(frame, model, id_to_name), frame
+
+
+def recognize_many(
+    images: Sequence[bytes],
+    model: face_engine.LoadedLBPHModel,
+    id_to_name: Dict[int, str],
+) -> List[Tuple[FrameResult, Optional[np.ndarray]]]:
+    """Recognize banyak frame paralel; hasil berurutan sesuai input.
+
+    Pool `BATCH_WORKERS` thread dipakai bersama semua request (tidak dibuat per
+    request), sehingga request /batch yang bersamaan juga dibatasi jumlah thread yang sama.
+    """
+    if len(images) <= 1 or batch_workers() == 1:
+        return [recognize_bytes(b, model, id_to_name) for b in images]
+    return list(_get_executor().map(lambda b: recognize_bytes(b, model, id_to_name), images))
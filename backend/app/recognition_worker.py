@@ -9,21 +9,88 @@ Worker ini optional: Anda bisa menyalakan/mematikan via endpoint:
 - POST /api/recognition/start
 - POST /api/recognition/stop
 - GET /api/recognition/status
+
+Server multi-proses (gunicorn): kamera hanya dibuka oleh 1 proses, yaitu
+proses yang memegang lock `dataset/run/recognition_worker.lock`. Proses lain
+membaca status dari `recognition_worker.json` (ditulis pemilik tiap detik) dan
+meminta stop lewat file yang sama, jadi request start/stop/status boleh
+mendarat di worker HTTP mana pun.
+
+Mode (WORKER_MODE):
+- "thread" (default): capture + recognition di thread dalam proses Flask
+- "process": capture + recognition di child process terpisah, sehingga
+  overhead OpenCV/NumPy-nya tidak berebut GIL dengan request API dan crash di
+  pipeline kamera tidak menjatuhkan API. Frame hasil decode ditulis ke ring
+  buffer shared memory (`frame_ring`); recognition membaca frame terbaru dari
+  ring (frame lama dilewati jika recognition lebih lambat dari kamera), dan
+  proses API bisa mengambil preview (`latest_frame`) tanpa pickle frame.
+  Slot ring seukuran frame pertama kamera (child melapor ukurannya, supervisor
+  membuat ring lalu mengirim namanya), jadi resolusi penuh sampai ke detektor
+  (DETECT_TILED); WORKER_RING_SLOT_BYTES hanya untuk membatasi memori.
+  Thread di proses induk hanya mengawasi child (status, stop, exit code).
+  Counter recognition (RELAYED_COUNTERS) dan id event terakhir child disalin ke
+  shared memory; supervisor meneruskan selisih counter ke metrics proses API dan
+  mem-publish event tsb ke broadcaster SSE (listener bangun lalu membaca dari DB).
+  Durasi per tahap (`hfg_stage_seconds`) child tidak diteruskan.
 """
 
 from __future__ import annotations
 
+import json
+import multiprocessing
+import os
 import threading
 import time
-from typing import Any, Optional, Union
+from typing import Any, Dict, Optional, Tuple, Union
+
+import numpy as np
 
 try:
     import cv2
 except Exception:  # pragma: no cover
     cv2 = None  # type: ignore
 
-from . import face_engine
-from .database import add_event, get_all_residents
+from . import detection_slo, face_engine, metrics, recognition_pipeline
+from .database import add_event, get_event_by_id
+from .event_stream import publish_event
+from .frame_ring import FrameRing
+from .process_lock import ProcessLock
+
+# Interval refresh nama penghuni & versi model (rename/hapus langsung terlihat tanpa restart)
+NAMES_REFRESH_SECONDS = 5.0
+
+# Bobot rata-rata bergerak FPS worker (gauge hfg_worker_fps)
+FPS_SMOOTHING = 0.1
+
+# Lock + file status/kontrol bersama antar proses
+RUN_DIR = face_engine.DATASET_DIR / "run"
+STATE_SYNC_SECONDS = 1.0
+STOP_TIMEOUT_SECONDS = 3.0
+# Batas tunggu thread worker saat stop lokal: lebih lama dari teardown mode proses
+# (join child STOP_TIMEOUT_SECONDS + terminate 1 detik + 1 putaran supervisor)
+STOP_JOIN_SECONDS = STOP_TIMEOUT_SECONDS + 2.0
+
+# Hasil stop(): berhenti / permintaan terkirim tapi pemilik belum selesai / memang tidak jalan
+STOPPED = "stopped"
+STOPPING = "stopping"
+NOT_RUNNING = "not_running"
+
+# Counter yang dinaikkan _FrameRecognizer; di mode proses diteruskan dari child
+RELAYED_COUNTERS: Tuple[Tuple[metrics.Counter, Dict[str, str]], ...] = (
+    (metrics.FRAMES_TOTAL, {"source": "worker"}),
+    (metrics.FACES_TOTAL, {"source": "worker"}),
+    (metrics.UNKNOWN_TOTAL, {"source": "worker"}),
+    (metrics.EVENTS_TOTAL, {"source": "worker"}),
+    (metrics.SKIPPED_TOTAL, {"reason": "no_face"}),
+    (metrics.SKIPPED_TOTAL, {"reason": "debounce"}),
+    (detection_slo.LEVEL_CHANGES_TOTAL, {"direction": "down", "source": "worker"}),
+    (detection_slo.LEVEL_CHANGES_TOTAL, {"direction": "up", "source": "worker"}),
+)
+
+
+def worker_mode() -> str:
+    mode = os.getenv("WORKER_MODE", "thread").strip().lower()
+    return mode if mode in {"thread", "process"} else "thread"
 
 
 def _parse_source(value: Any) -> Union[int, str]:
@@ -56,8 +123,26 @@ class RecognitionWorker:
         self._last_label: Optional[str] = None
         self._last_log_ts: float = 0.0
 
+        self.fps: float = 0.0
+        # Tingkat degradasi deteksi (detection_slo) di proses yang menjalankan recognition
+        self.detect_level: int = 0
+
+        self._lock = ProcessLock(RUN_DIR / "recognition_worker.lock")
+        self._state_path = RUN_DIR / "recognition_worker.json"
+
+        self.mode: str = worker_mode()
+        # Ring frame (mode proses): milik proses ini, atau attach ke milik proses lain
+        self._ring: Optional[FrameRing] = None
+        self._ring_lock = threading.Lock()
+        self._attached: Optional[Tuple[str, FrameRing]] = None
+
     def start(self, source: Any = None) -> bool:
-        if self.running:
+        if self.running or (self._thread is not None and self._thread.is_alive()):
+            # Thread lama (mis. masih teardown setelah stop) masih memegang lock/ring
+            return False
+        self.mode = worker_mode()
+        # Hanya 1 proses yang boleh membuka kamera
+        if not self._lock.acquire(blocking=False):
             return False
 
         self.last_error = None
@@ -65,33 +150,139 @@ class RecognitionWorker:
             self.source = _parse_source(source)
 
         self._stop_event.clear()
+        self.running = True
+        self._write_state()
         self._thread = threading.Thread(target=self._run, daemon=True)
         self._thread.start()
-        self.running = True
         return True
 
-    def stop(self) -> bool:
-        if not self.running:
-            return False
-        self._stop_event.set()
-        if self._thread:
-            self._thread.join(timeout=2)
-        self.running = False
-        return True
+    def stop(self) -> str:
+        """Hentikan worker; return STOPPED, STOPPING (belum selesai dalam batas waktu) atau NOT_RUNNING."""
+        if self.running:
+            self._stop_event.set()
+            thread = self._thread
+            if thread is not None:
+                thread.join(timeout=STOP_JOIN_SECONDS)
+                if thread.is_alive():
+                    # Masih teardown: `_run` yang menutup state/lock saat selesai
+                    return STOPPING
+            self.running = False
+            return STOPPED
+
+        if not self._lock.locked_elsewhere():
+            return NOT_RUNNING
+        # Worker berjalan di proses lain: minta berhenti lewat file kontrol.
+        # Ditulis ulang selama menunggu karena pemilik juga menulis status tiap detik.
+        deadline = time.time() + STOP_TIMEOUT_SECONDS
+        while self._lock.locked_elsewhere() and time.time() < deadline:
+            self._write_state({**self._read_state(), "stop_requested": True})
+            time.sleep(0.1)
+        # Pemilik belum melepas lock: kamera masih jalan, permintaan stop tetap tercatat
+        return STOPPING if self._lock.locked_elsewhere() else STOPPED
 
     def status(self):
+        if not self.running and self._lock.locked_elsewhere():
+            state = self._read_state()
+            return {
+                "running": True,
+                "source": state.get("source", self.source),
+                "last_error": state.get("last_error"),
+                "fps": state.get("fps", 0.0),
+                "detect_level": state.get("detect_level", 0),
+                "pid": state.get("pid"),
+                "mode": state.get("mode", "thread"),
+            }
         return {
             "running": self.running,
             "source": self.source,
             "last_error": self.last_error,
+            "fps": round(self.fps, 2),
+            "detect_level": self.detect_level,
+            "pid": os.getpid() if self.running else None,
+            "mode": self.mode,
         }
 
+    def _read_state(self) -> Dict[str, Any]:
+        try:
+            with open(self._state_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _write_state(self, state: Optional[Dict[str, Any]] = None) -> None:
+        if state is None:
+            state = {
+                "pid": os.getpid(),
+                "running": self.running,
+                "source": self.source,
+                "last_error": self.last_error,
+                "fps": round(self.fps, 2),
+                "detect_level": self.detect_level,
+                "stop_requested": False,
+                "updated": time.time(),
+                "mode": self.mode,
+                "ring": self._ring.name if self._ring is not None else None,
+            }
+        try:
+            RUN_DIR.mkdir(parents=True, exist_ok=True)
+            tmp_path = self._state_path.with_name(f"{self._state_path.name}.{os.getpid()}.tmp")
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(state, f)
+            os.replace(tmp_path, self._state_path)
+        except OSError as e:
+            print(f"Recognition Worker State Error: {e}")
+
+    def latest_frame(self) -> Optional[np.ndarray]:
+        """Frame kamera terbaru dari ring shared memory (hanya mode proses), atau None."""
+        with self._ring_lock:
+            if self._ring is not None:
+                got = self._ring.latest()
+                return got[1] if got else None
+
+            # Worker dimiliki proses lain (gunicorn): attach ke ring-nya lewat nama di file status
+            name = self._read_state().get("ring") if self._lock.locked_elsewhere() else None
+            if self._attached is not None and self._attached[0] != name:
+                self._attached[1].close()
+                self._attached = None
+            if not name:
+                return None
+            if self._attached is None:
+                try:
+                    self._attached = (name, FrameRing.attach(name))
+                except (FileNotFoundError, OSError):
+                    return None
+            got = self._attached[1].latest()
+            return got[1] if got else None
+
     def _run(self):
+        try:
+            if self.mode == "process":
+                self._supervise_process()
+            else:
+                self._capture_loop()
+        finally:
+            # Hanya thread worker yang aktif yang boleh menutup state bersama
+            if threading.current_thread() is self._thread:
+                self.running = False
+                self.fps = 0.0
+                metrics.WORKER_FPS.set(0.0)
+                self._write_state()
+                self._lock.release()
+
+    def _sync_state(self) -> bool:
+        """Tulis status bersama; return True jika stop diminta dari proses lain."""
+        if self._read_state().get("stop_requested"):
+            return True
+        self._write_state()
+        return False
+
+    def _capture_loop(self):
         if cv2 is None:
             self.last_error = "OpenCV belum tersedia. Install opencv-contrib-python."
             self.running = False
             return
 
+        self.fps = 0.0
         cap = None
         try:
             cap = cv2.VideoCapture(self.source)
@@ -100,75 +291,336 @@ class RecognitionWorker:
                 self.running = False
                 return
 
-            # Pastikan model tersedia
-            try:
-                threshold = face_engine.get_env_float("LBPH_THRESHOLD", 65.0)
-                model = face_engine.load_lbph_model(threshold=threshold)
-            except FileNotFoundError:
-                # Coba training sekali jika model belum ada
-                max_imgs = face_engine.get_env_int("MAX_TRAIN_IMAGES_PER_PERSON", 200)
-                face_engine.train_lbph_model(max_images_per_person=max_imgs)
-                threshold = face_engine.get_env_float("LBPH_THRESHOLD", 65.0)
-                model = face_engine.load_lbph_model(threshold=threshold)
-
-            # Map safe_name -> nama asli dari DB, supaya UI tampil rapi
-            residents = get_all_residents()
-            safe_to_display = {
-                face_engine.make_safe_name(r["name"]): r["name"] for r in residents if r.get("name")
-            }
-
-            min_interval = face_engine.get_env_float("MIN_LOG_INTERVAL_SECONDS", 3.0)
+            recognizer = _FrameRecognizer()
+            frame_ts = time.time()
+            state_ts = 0.0
 
             while not self._stop_event.is_set():
+                if (time.time() - state_ts) >= STATE_SYNC_SECONDS:
+                    state_ts = time.time()
+                    # Stop diminta dari proses lain?
+                    if self._sync_state():
+                        break
+
                 ret, frame = cap.read()
                 if not ret:
                     time.sleep(0.1)
                     continue
 
-                detected = face_engine.detect_largest_face_gray(frame)
-                if detected is None:
-                    continue
+                tick = time.time()
+                dt = tick - frame_ts
+                frame_ts = tick
+                if dt > 0:
+                    self.fps = (1.0 - FPS_SMOOTHING) * self.fps + FPS_SMOOTHING * (1.0 / dt)
+                    metrics.WORKER_FPS.set(self.fps)
+
+                detected = recognizer.process(frame)
+                self.detect_level = detection_slo.WORKER.level
+                if detected:
+                    # kecilkan CPU usage
+                    time.sleep(0.05)
+
+        except Exception as e:
+            self.last_error = str(e)
+        finally:
+            try:
+                if cap is not None:
+                    cap.release()
+            except Exception:
+                pass
+
+    def _supervise_process(self):
+        """Mode proses: jalankan capture + recognition di child, pantau sampai selesai."""
+        slots = max(2, face_engine.get_env_int("WORKER_RING_SLOTS", 4))
+        # 0 = ukuran frame pertama kamera (resolusi penuh sampai ke detektor, mis. DETECT_TILED)
+        slot_bytes = face_engine.get_env_int("WORKER_RING_SLOT_BYTES", 0)
+
+        # spawn: child bersih (tanpa state thread/lock Flask hasil fork)
+        ctx = multiprocessing.get_context("spawn")
+        stop = ctx.Event()
+        fps = ctx.Value("d", 0.0, lock=False)
+        level = ctx.Value("i", 0, lock=False)
+        error = ctx.Array("c", 512, lock=False)
+        counts = ctx.Array("d", len(RELAYED_COUNTERS), lock=False)
+        last_event = ctx.Value("q", 0, lock=False)
+        relayed = [0.0] * len(RELAYED_COUNTERS)
+        published = 0
+        # Handshake ring: child melapor ukuran frame pertama, supervisor membuat ring
+        # seukuran itu lalu mengirim namanya
+        frame_bytes = ctx.Value("q", 0, lock=False)
+        ring_name = ctx.Array("c", 64, lock=False)
+        ring_ready = ctx.Event()
+
+        # Ring milik supervisor ini: hanya ring ini yang ditutup di akhir
+        ring: Optional[FrameRing] = None
+        child = None
+        try:
+            child = ctx.Process(
+                target=_child_main,
+                args=(self.source, stop, fps, level, error, counts, last_event, frame_bytes, ring_name, ring_ready),
+                name="recognition-worker",
+                daemon=True,
+            )
+            child.start()
+            self._write_state()
+
+            state_ts = 0.0
+            while child.is_alive() and not self._stop_event.is_set():
+                if ring is None and frame_bytes.value:
+                    ring = FrameRing.create(slots, slot_bytes if slot_bytes > 0 else int(frame_bytes.value))
+                    with self._ring_lock:
+                        self._ring = ring
+                    ring_name.value = ring.name.encode()
+                    ring_ready.set()
+                    self._write_state()
+                self.fps = float(fps.value)
+                self.detect_level = int(level.value)
+                detection_slo.LEVEL.set(self.detect_level, source="worker")
+                metrics.WORKER_FPS.set(self.fps)
+                published = _relay_child(counts, relayed, int(last_event.value), published)
+                if (time.time() - state_ts) >= STATE_SYNC_SECONDS:
+                    state_ts = time.time()
+                    if self._sync_state():
+                        break
+                child.join(timeout=0.2)
+        except Exception as e:
+            self.last_error = str(e)
+        finally:
+            if child is not None:
+                stop.set()
+                child.join(timeout=STOP_TIMEOUT_SECONDS)
+                if child.is_alive():
+                    child.terminate()
+                    child.join(timeout=1.0)
+                _relay_child(counts, relayed, int(last_event.value), published)
+                message = error.value.decode("utf-8", "replace")
+                if message:
+                    self.last_error = message
+                elif child.exitcode not in (0, None, -15):  # -15: terminate() di atas
+                    # Crash (segfault OpenCV, OOM, ...): API tetap hidup, penyebab dicatat
+                    self.last_error = f"Proses worker berhenti (exit code {child.exitcode})"
+            with self._ring_lock:
+                if self._ring is ring:
+                    self._ring = None
+                if ring is not None:
+                    ring.close()
+
+
+class _FrameRecognizer:
+    """Deteksi -> prediksi -> event log (debounce) untuk frame kamera berturut-turut.
+
+    Menyimpan model, nama penghuni dan state debounce; nama & versi model
+    di-refresh tiap NAMES_REFRESH_SECONDS.
+    """
+
+    def __init__(self):
+        # Pastikan model tersedia
+        self.threshold = face_engine.get_env_float("LBPH_THRESHOLD", 65.0)
+        try:
+            self.model = face_engine.load_lbph_model(threshold=self.threshold)
+        except FileNotFoundError:
+            # Coba training sekali jika model belum ada
+            max_imgs = face_engine.get_env_int("MAX_TRAIN_IMAGES_PER_PERSON", 200)
+            face_engine.train_lbph_model(max_images_per_person=max_imgs)
+            self.model = face_engine.load_lbph_model(threshold=self.threshold)
+
+        # Map id penghuni (label model) -> nama terbaru dari DB
+        self.id_to_name = face_engine.resident_display_names()
+        self.names_ts = time.time()
+        self.signature = face_engine.model_signature()
+        self.min_interval = face_engine.get_env_float("MIN_LOG_INTERVAL_SECONDS", 3.0)
 
-                face_gray, _bbox = detected
-                label, conf, is_unknown = face_engine.predict_face(face_gray, model)
+        self._last_label: Optional[str] = None
+        self._last_log_ts: float = 0.0
+        self.last_event_id = 0
 
-                if is_unknown:
-                    display_name = "Unknown"
-                    status = "DITOLAK"
-                else:
-                    display_name = safe_to_display.get(label, label.replace("_", " "))
-                    status = "MASUK"
+    def process(self, frame: np.ndarray) -> bool:
+        """Proses 1 frame; return True jika ada wajah terdeteksi."""
+        timer = metrics.StageTimer()
+        try:
+            return self._process(frame, timer)
+        finally:
+            # Durasi deteksi + prediksi -> controller SLO deteksi (tingkat dipakai frame berikutnya)
+            detection_slo.WORKER.observe(timer.total("detect", "predict"))
 
-                now = time.time()
+    def _process(self, frame: np.ndarray, timer: metrics.StageTimer) -> bool:
+        metrics.FRAMES_TOTAL.inc(source="worker")
 
-                # Debounce event log
-                if (
-                    display_name != self._last_label
-                    or (now - self._last_log_ts) >= min_interval
-                ):
-                    # Simpan snapshot hanya untuk UNKNOWN agar storage lebih hemat
+        with metrics.stage("detect", timer):
+            detected = face_engine.detect_largest_face_gray(frame, **detection_slo.WORKER.params().kwargs())
+        if detected is None:
+            metrics.SKIPPED_TOTAL.inc(reason="no_face")
+            return False
+
+        face_gray, bbox = detected
+        with metrics.stage("predict", timer):
+            resident_id, conf, is_unknown = recognition_pipeline.predict_faces([face_gray], self.model)[0]
+
+        now = time.time()
+        if (now - self.names_ts) >= NAMES_REFRESH_SECONDS:
+            self.id_to_name = face_engine.resident_display_names()
+            self.names_ts = now
+            # Model dipublish ulang (retrain / penghuni dihapus)? reload
+            latest = face_engine.model_signature()
+            if latest != self.signature:
+                self.model = face_engine.load_lbph_model(threshold=self.threshold)
+                self.signature = latest
+
+        if is_unknown or resident_id not in self.id_to_name:
+            display_name = "Unknown"
+            status = "DITOLAK"
+        else:
+            display_name = self.id_to_name[resident_id]
+            status = "MASUK"
+        metrics.FACES_TOTAL.inc(source="worker")
+        if status == "DITOLAK":
+            metrics.UNKNOWN_TOTAL.inc(source="worker")
+
+        # Debounce event log
+        if (
+            display_name != self._last_label
+            or (now - self._last_log_ts) >= self.min_interval
+        ):
+            # Simpan snapshot hanya untuk UNKNOWN agar storage lebih hemat
+            snapshot_path = None
+            is_unknown = (str(display_name).strip().lower() == "unknown") or (status == "DITOLAK")
+            if is_unknown:
+                try:
+                    with metrics.stage("snapshot"):
+                        snapshot_path = face_engine.save_snapshot(
+                            frame, "Unknown", bbox=bbox, face_gray=face_gray
+                        )
+                except Exception:
                     snapshot_path = None
-                    is_unknown = (str(display_name).strip().lower() == "unknown") or (status == "DITOLAK")
-                    if is_unknown:
-                        try:
-                            snapshot_path = face_engine.save_snapshot(frame, "Unknown")
-                        except Exception:
-                            snapshot_path = None
 
-                    add_event(display_name, status, conf, snapshot_path)
+            with metrics.stage("add_event"):
+                event_id = add_event(display_name, status, conf, snapshot_path)
+            if event_id:
+                self.last_event_id = event_id
+            metrics.EVENTS_TOTAL.inc(source="worker")
+
+            self._last_label = display_name
+            self._last_log_ts = now
+        else:
+            metrics.SKIPPED_TOTAL.inc(reason="debounce")
+        return True
+
 
-                    self._last_label = display_name
-                    self._last_log_ts = now
+def _capture_into_ring(cap, ring: FrameRing, stop, failed: threading.Event, interval: float = 0.0) -> None:
+    """Thread capture di child: decode frame kamera -> ring (selalu frame terbaru).
 
+    `interval` > 0 untuk file video: kamera/stream menahan `read()` sesuai FPS-nya,
+    file tidak, jadi tanpa jeda seluruh file habis di-decode dalam sekejap.
+    """
+    misses = 0
+    next_ts = time.time()
+    while not stop.is_set():
+        if interval > 0:
+            next_ts += interval
+            time.sleep(max(0.0, next_ts - time.time()))
+        ret, frame = cap.read()
+        if not ret:
+            misses += 1
+            if misses >= 50:  # ~5 detik tanpa frame: stream habis / kamera lepas
+                failed.set()
+                return
+            time.sleep(0.1)
+            continue
+        misses = 0
+        ring.write(frame)
+
+
+def _relay_child(counts, relayed, event_id: int, published: int) -> int:
+    """Supervisor: teruskan counter & event child ke proses API; return id event yang sudah dipublish."""
+    for i, (counter, labels) in enumerate(RELAYED_COUNTERS):
+        delta = counts[i] - relayed[i]
+        if delta > 0:
+            counter.inc(delta, **labels)
+            relayed[i] = counts[i]
+
+    if event_id and event_id != published:
+        # Cukup event terakhir: jika ada yang terlewat, id di buffer melompat
+        # dan listener SSE fallback ke DB (event_stream)
+        event = get_event_by_id(event_id)
+        if event:
+            publish_event(event)
+    return event_id or published
+
+
+def _child_main(source, stop, fps, level, error, counts, last_event, frame_bytes, ring_name, ring_ready) -> None:
+    """Entry point child process (WORKER_MODE=process)."""
+
+    def fail(message: str) -> None:
+        error.value = message.encode("utf-8", "replace")[: len(error) - 1]
+
+    if cv2 is None:
+        fail("OpenCV belum tersedia. Install opencv-contrib-python.")
+        return
+
+    ring = None
+    cap = None
+    try:
+        cap = cv2.VideoCapture(source)
+        if not cap.isOpened():
+            fail(f"Gagal membuka kamera/stream: {source}")
+            return
+
+        interval = 0.0
+        if isinstance(source, str) and os.path.isfile(source):
+            interval = 1.0 / (cap.get(cv2.CAP_PROP_FPS) or 25.0)
+
+        ret, first = cap.read()
+        if not ret:
+            fail(f"Gagal membaca frame dari kamera/stream: {source}")
+            return
+        frame_bytes.value = int(first.nbytes)
+        while not ring_ready.wait(timeout=0.1):
+            if stop.is_set():
+                return
+        ring = FrameRing.attach(ring_name.value.decode(), untrack=False)
+        ring.write(first)
+        del first
+
+        recognizer = _FrameRecognizer()
+        failed = threading.Event()
+        capture = threading.Thread(target=_capture_into_ring, args=(cap, ring, stop, failed, interval), daemon=True)
+        capture.start()
+
+        last_seq = 0
+        rate = 0.0
+        frame_ts = time.time()
+        while not stop.is_set() and not failed.is_set():
+            got = ring.latest(after=last_seq)
+            if got is None:
+                time.sleep(0.005)
+                continue
+            last_seq, frame = got
+
+            tick = time.time()
+            dt = tick - frame_ts
+            frame_ts = tick
+            if dt > 0:
+                rate = (1.0 - FPS_SMOOTHING) * rate + FPS_SMOOTHING * (1.0 / dt)
+                fps.value = rate
+
+            detected = recognizer.process(frame)
+            level.value = detection_slo.WORKER.level
+            for i, (counter, labels) in enumerate(RELAYED_COUNTERS):
+                counts[i] = counter.value(**labels)
+            last_event.value = recognizer.last_event_id
+            if detected:
                 # kecilkan CPU usage
                 time.sleep(0.05)
 
-        except Exception as e:
-            self.last_error = str(e)
-        finally:
-            try:
-                if cap is not None:
-                    cap.release()
-            except Exception:
-                pass
-            self.running = False
+        stop.set()
+        capture.join(timeout=2.0)
+    except Exception as e:
+        fail(str(e))
+    finally:
+        try:
+            if cap is not None:
+                cap.release()
+        except Exception:
+            pass
+        if ring is not None:
+            ring.close()
@@ -2,24 +2,27 @@
 
 from __future__ import annotations
 
-from pathlib import Path
+import json
 
-from flask import Blueprint, abort, jsonify, request, send_from_directory
+from flask import Blueprint, Response, abort, jsonify, request, send_from_directory, stream_with_context
+from werkzeug.security import safe_join
 
-from .. import face_engine
-from ..database import get_all_events, get_event_by_id
+from .. import face_engine, snapshot_store
+from ..database import get_all_events, get_event_by_id, get_events_after, get_latest_event_id
+from ..event_stream import broadcaster
 
 events_bp = Blueprint("events", __name__)
 
 
-def _make_snapshot_url(snapshot_path: str | None) -> str | None:
+def _make_snapshot_url(snapshot_path: str | None, base: str | None = None) -> str | None:
     """Ubah path lokal snapshot menjadi URL yang bisa diakses UI."""
     if not snapshot_path:
         return None
     try:
-        filename = Path(snapshot_path).name
-        base = request.host_url.rstrip("/")
-        return f"{base}/api/snapshots/{filename}"
+        url_path = snapshot_store.snapshot_url_path(snapshot_path)
+        if base is None:
+            base = request.host_url.rstrip("/")
+        return f"{base}/api/snapshots/{url_path}"
     except Exception:
         return None
 
@@ -32,6 +35,22 @@ def _make_category(name: str | None, status: str | None) -> str:
     return "UNKNOWN"
 
 
+def _serialize_event(e: dict, base: str | None = None) -> dict:
+    """Tambahkan `category` & `snapshot_url` ke row event."""
+    item = dict(e)
+
+    # snapshot_url untuk UNKNOWN saja (PENGHUNI hemat storage)
+    category = _make_category(item.get("name"), item.get("status"))
+    item["category"] = category
+    if category == "UNKNOWN":
+        item["snapshot_url"] = _make_snapshot_url(item.get("snapshot_path"), base)
+    else:
+        item["snapshot_url"] = None
+    item["thumbnail_url"] = f"{item['snapshot_url']}?size=thumb" if item["snapshot_url"] else None
+
+    return item
+
+
 @events_bp.route("/logs", methods=["GET"])
 def get_logs():
     """Endpoint: GET /api/logs
@@ -47,21 +66,57 @@ def get_logs():
 
     events = get_all_events(limit=limit)
 
-    out = []
-    for e in events:
-        item = dict(e)
+    base = request.host_url.rstrip("/")
+    out = [_serialize_event(e, base) for e in events]
 
-        # snapshot_url untuk UNKNOWN saja (PENGHUNI hemat storage)
-        category = _make_category(item.get("name"), item.get("status"))
-        item["category"] = category
-        if category == "UNKNOWN":
-            item["snapshot_url"] = _make_snapshot_url(item.get("snapshot_path"))
-        else:
-            item["snapshot_url"] = None
+    return jsonify(out), 200
 
-        out.append(item)
 
-    return jsonify(out), 200
+@events_bp.route("/events/stream", methods=["GET"])
+def stream_events():
+    """Endpoint: GET /api/events/stream (Server-Sent Events)
+
+    - Tiap event dikirim sebagai `id: <event_id>` + `data: <json>` (format sama dengan /logs)
+    - Resume: header `Last-Event-ID` (otomatis dari EventSource) atau query `?last_id=`
+    - Tanpa resume, stream mulai dari event terbaru (tidak replay riwayat)
+    """
+    raw_last = request.headers.get("Last-Event-ID") or request.args.get("last_id")
+    try:
+        last_id = int(raw_last) if raw_last is not None else None
+    except ValueError:
+        last_id = None
+    if last_id is None:
+        last_id = get_latest_event_id()
+
+    heartbeat = face_engine.get_env_float("SSE_HEARTBEAT_SECONDS", 15.0)
+    base = request.host_url.rstrip("/")
+
+    def generate():
+        cursor = int(last_id)
+        yield "retry: 3000\n\n"
+        while True:
+            items = broadcaster.wait_since(cursor, timeout=heartbeat)
+            if not items:
+                # Gap di buffer, atau timeout: cek DB untuk event yang ditulis
+                # di luar broadcaster (proses lain / script CLI).
+                newest = broadcaster.latest_id()
+                items = get_events_after(cursor)
+                if not items and newest is not None and newest > cursor:
+                    # Event di buffer sudah tidak ada di DB (dihapus): lewati, supaya
+                    # gap yang sama tidak membuat loop ini berputar tanpa menunggu.
+                    # `newest` diambil sebelum query -> event baru tidak ikut terlewati.
+                    cursor = newest
+                    continue
+            if not items:
+                yield ": ping\n\n"
+                continue
+            for e in items:
+                cursor = max(cursor, int(e["id"]))
+                payload = json.dumps(_serialize_event(e, base), default=str)
+                yield f"id: {e['id']}\ndata: {payload}\n\n"
+
+    headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    return Response(stream_with_context(generate()), mimetype="text/event-stream", headers=headers)
 
 
 @events_bp.route("/events/<int:event_id>", methods=["GET"])
@@ -71,24 +126,41 @@ def get_event_detail(event_id: int):
     if not e:
         return jsonify({"message": "Event tidak ditemukan"}), 404
 
-    item = dict(e)
-
-    category = _make_category(item.get("name"), item.get("status"))
-    item["category"] = category
-    if category == "UNKNOWN":
-        item["snapshot_url"] = _make_snapshot_url(item.get("snapshot_path"))
-    else:
-        item["snapshot_url"] = None
-
-    return jsonify(item), 200
+    return jsonify(_serialize_event(e)), 200
 
 
 @events_bp.route("/snapshots/<path:filename>", methods=["GET"])
 def serve_snapshot(filename: str):
-    """Serve file snapshot dari dataset/snapshots."""
+    """Serve file snapshot dari dataset/snapshots (`<YYYYmmdd>/<file>.jpg` atau flat lama).
+
+    Query params:
+    - size=thumb (optional): thumbnail kecil untuk list log
+
+    Response memakai ETag/Last-Modified + Range (send_file conditional). Snapshot
+    ber-shard punya nama unik, jadi di-cache `immutable` selama 1 tahun.
+    """
     face_engine.ensure_dirs()
     snapshots_dir = face_engine.SNAPSHOTS_DIR
-    fpath = snapshots_dir / filename
-    if not fpath.exists() or not fpath.is_file():
+    # Validasi ref sebelum menyentuh filesystem (wait/thumbnail memakai path ini
+    # langsung): tolak path absolut dan `..` keluar dari folder snapshots
+    if safe_join(str(snapshots_dir), filename) is None:
         abort(404)
-    return send_from_directory(str(snapshots_dir), filename)
+
+    # Snapshot baru mungkin masih di-encode di background
+    if not snapshot_store.wait_for_snapshot(filename):
+        abort(404)
+
+    target = filename
+    if request.args.get("size") == "thumb":
+        try:
+            target = snapshot_store.ensure_thumbnail(filename) or filename
+        except Exception as e:
+            print(f"Snapshot Thumbnail Error: {e}")
+
+    immutable = snapshot_store.is_immutable_ref(filename)
+    max_age = 31536000 if immutable else 3600
+    response = send_from_directory(str(snapshots_dir), target, conditional=True, etag=True, max_age=max_age)
+    response.cache_control.public = True
+    if immutable:
+        response.cache_control.immutable = True
+    return response
@@ -0,0 +1,41 @@
+"""Endpoint metrics untuk Prometheus.
+
+- GET /api/metrics -> format teks Prometheus (lihat `app.metrics`)
+
+Contoh scrape config:
+  - job_name: home-face-guard
+    metrics_path: /api/metrics
+    static_configs: [{targets: ["localhost:5000"]}]
+"""
+
+from __future__ import annotations
+
+import os
+
+from flask import Blueprint, Response
+
+from .. import face_engine
+from .. import metrics
+from ..event_stream import broadcaster
+
+metrics_bp = Blueprint("metrics", __name__)
+
+
+def _model_version() -> float:
+    """mtime file model (berubah tiap retrain); 0 jika model belum ada."""
+    path = face_engine.MODEL_PATH
+    return os.path.getmtime(path) if path.exists() else 0.0
+
+
+metrics.register_gauge("hfg_model_version", "mtime file model LBPH (detik epoch).", _model_version)
+metrics.register_gauge(
+    "hfg_model_masked_labels", "Label penghuni terhapus yang dimask (belum di-compact).", face_engine.masked_label_count
+)
+metrics.register_gauge("hfg_event_buffer_size", "Event di ring buffer SSE.", broadcaster.buffered)
+metrics.register_gauge("hfg_event_stream_waiting", "Koneksi SSE yang sedang menunggu event.", broadcaster.waiting)
+
+
+@metrics_bp.route("/metrics", methods=["GET"])
+def prometheus_metrics():
+    """GET /api/metrics"""
+    return Response(metrics.render(), status=200, content_type=metrics.CONTENT_TYPE)
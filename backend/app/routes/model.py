@@ -43,6 +43,7 @@ def model_status():
         info["model_mtime"] = int(os.path.getmtime(face_engine.MODEL_PATH))
     if labels_exists:
         info["labels_mtime"] = int(os.path.getmtime(face_engine.LABELS_PATH))
+        info["masked_labels"] = face_engine.masked_label_count()
 
     return jsonify(info), 200
 
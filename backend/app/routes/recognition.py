@@ -5,9 +5,11 @@ Ada dua mode:
    - GET  /api/recognition/status
    - POST /api/recognition/start
    - POST /api/recognition/stop
+   - GET  /api/recognition/latest.jpg (frame kamera terbaru, WORKER_MODE=process)
 
 2) Browser frame (client capture via WebRTC, kirim frame ke backend)
    - POST /api/recognition/frame
+   - POST /api/recognition/batch (banyak frame per request)
 
 Mode (2) sengaja disediakan karena webcam sering tidak bisa dipakai bersamaan oleh
 browser dan OpenCV worker. Dengan endpoint /frame, dashboard bisa tetap menampilkan
@@ -26,13 +28,20 @@ from __future__ import annotations
 
 import base64
 import re
+import struct
 import time
-from typing import Optional
+from datetime import datetime, timezone
+from typing import List, Optional
 
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, Response, jsonify, request
 
+from .. import detection_slo
 from .. import face_engine
-from ..database import add_event, get_all_residents
+from .. import frame_pacing
+from .. import metrics
+from .. import recognition_pipeline
+from .. import recognition_worker
+from ..database import add_event, add_events
 from ..recognition_worker import RecognitionWorker
 
 recognition_bp = Blueprint("recognition", __name__)
@@ -42,38 +51,62 @@ _worker = RecognitionWorker()
 
 # Cache model supaya tidak reload setiap request /frame
 _cached_model = None
-_cached_mtime: float = 0.0
+_cached_signature: tuple = (0.0, 0.0)
 _cached_threshold: float = -1.0
 
 # Debounce event log untuk /frame (server-wide)
 _last_label: Optional[str] = None
 _last_log_ts: float = 0.0
 
+metrics.register_gauge(
+    "hfg_worker_running", "1 jika recognition worker berjalan.", lambda: 1.0 if _worker.running else 0.0
+)
+metrics.register_gauge(
+    "hfg_model_loaded_version",
+    "mtime model yang sedang di-cache /frame (0 = belum dimuat).",
+    lambda: _cached_signature[0] if _cached_model is not None else 0.0,
+)
+
 
 def _get_or_load_model():
-    """Load LBPH model dengan cache sederhana (mtime + threshold)."""
-    global _cached_model, _cached_mtime, _cached_threshold
+    """Load LBPH model dengan cache sederhana (versi model/labels + threshold)."""
+    global _cached_model, _cached_signature, _cached_threshold
 
     threshold = face_engine.get_env_float("LBPH_THRESHOLD", 60.0)
     model_path = face_engine.MODEL_PATH
-    mtime = model_path.stat().st_mtime if model_path.exists() else 0.0
+    signature = face_engine.model_signature()
 
-    if _cached_model is not None and _cached_mtime == mtime and _cached_threshold == threshold:
+    if _cached_model is not None and _cached_signature == signature and _cached_threshold == threshold:
         return _cached_model, threshold
 
     # Model belum ada? coba train sekali.
     if not model_path.exists():
         max_imgs = face_engine.get_env_int("MAX_TRAIN_IMAGES_PER_PERSON", 200)
         face_engine.train_lbph_model(max_images_per_person=max_imgs)
-        mtime = model_path.stat().st_mtime if model_path.exists() else 0.0
+        signature = face_engine.model_signature()
 
     model = face_engine.load_lbph_model(threshold=threshold)
     _cached_model = model
-    _cached_mtime = mtime
+    _cached_signature = signature
     _cached_threshold = threshold
     return model, threshold
 
 
+def warm_model_cache() -> bool:
+    """Muat model ke cache sebelum melayani request (dipanggil master gunicorn sebelum fork).
+
+    Tidak men-trigger training: jika model belum ada, worker akan memuat/train saat request pertama.
+    """
+    if not face_engine.MODEL_PATH.exists():
+        return False
+    try:
+        _get_or_load_model()
+        return True
+    except Exception as e:
+        print(f"WARNING: Gagal preload model: {e}")
+        return False
+
+
 def _decode_frame_bytes() -> Optional[bytes]:
     """Ambil bytes frame dari JSON dataURL atau multipart."""
     # Multipart
@@ -100,7 +133,8 @@ def _decode_frame_bytes() -> Optional[bytes]:
 
 @recognition_bp.route("/recognition/status", methods=["GET"])
 def recognition_status():
-    return jsonify(_worker.status()), 200
+    detection = {"frame": detection_slo.FRAME.status(), "worker": detection_slo.WORKER.status()}
+    return jsonify({**_worker.status(), "detection": detection}), 200
 
 
 @recognition_bp.route("/recognition/start", methods=["POST"])
@@ -117,13 +151,35 @@ def recognition_start():
 
 @recognition_bp.route("/recognition/stop", methods=["POST"])
 def recognition_stop():
-    stopped = _worker.stop()
-    if not stopped:
+    result = _worker.stop()
+    if result == recognition_worker.NOT_RUNNING:
         return jsonify({"message": "Worker belum berjalan", **_worker.status()}), 409
+    if result == recognition_worker.STOPPING:
+        # Permintaan diterima, tapi worker (di proses lain) belum berhenti: cek lagi via /status
+        return jsonify({"message": "Worker sedang dihentikan", **_worker.status()}), 202
 
     return jsonify({"message": "Worker dihentikan", **_worker.status()}), 200
 
 
+@recognition_bp.route("/recognition/latest.jpg", methods=["GET"])
+def recognition_latest_frame():
+    """Preview frame kamera terbaru, dibaca langsung dari ring shared memory worker."""
+    frame = _worker.latest_frame()
+    if frame is None:
+        return jsonify({"message": "Belum ada frame (worker mode proses belum berjalan)"}), 404
+
+    try:
+        import cv2
+    except Exception as e:
+        return jsonify({"message": f"OpenCV belum tersedia: {e}"}), 500
+
+    quality = face_engine.get_env_int("SNAPSHOT_JPEG_QUALITY", 85)
+    ok, buf = cv2.imencode(".jpg", frame, [int(cv2.IMWRITE_JPEG_QUALITY), quality])
+    if not ok:
+        return jsonify({"message": "Gagal encode frame"}), 500
+    return Response(buf.tobytes(), status=200, mimetype="image/jpeg", headers={"Cache-Control": "no-store"})
+
+
 @recognition_bp.route("/recognition/frame", methods=["POST"])
 def recognition_frame():
     """Realtime recognition dari frame yang dikirim browser.
@@ -133,8 +189,24 @@ def recognition_frame():
       - name: display_name (atau "Unknown")
       - status: "MASUK" / "DITOLAK"
       - confidence: float
+
+      - pacing: {next_interval_ms, target_width} saran laju & lebar frame
+        berikutnya berdasarkan beban server (lihat `frame_pacing`)
+
+    Header `Server-Timing` berisi durasi per tahap (decode, detect, model_load,
+    names, predict, snapshot, add_event, total) — terlihat di DevTools browser.
+    Header opsional `X-Client-Id` membedakan dashboard di balik IP yang sama.
     """
 
+    timer = metrics.StageTimer()
+    frame_pacing.PACER.begin(request.headers.get("X-Client-Id") or request.remote_addr or "-")
+    try:
+        return _recognize_frame(timer)
+    finally:
+        frame_pacing.PACER.end(timer.elapsed())
+
+
+def _recognize_frame(timer: metrics.StageTimer):
     if request.content_length is not None and request.content_length > 10 * 1024 * 1024:
         return jsonify({"message": "Frame terlalu besar", "error": "PayloadTooLarge"}), 413
 
@@ -143,87 +215,229 @@ def recognition_frame():
         return jsonify({"message": "Frame tidak ditemukan. Kirim field 'image' (dataURL) atau file 'frame'."}), 400
 
     try:
-        import numpy as np
-        import cv2
+        import numpy as np  # noqa: F401
+        import cv2  # noqa: F401
     except Exception as e:
         return jsonify({"message": f"OpenCV/Numpy belum tersedia: {e}"}), 500
 
-    arr = np.frombuffer(b, dtype=np.uint8)
-    frame = cv2.imdecode(arr, cv2.IMREAD_COLOR)
+    frame = recognition_pipeline.decode_frame(b, timer)
     if frame is None:
-        return jsonify({"message": "Gagal decode gambar"}), 400
+        metrics.record_result(recognition_pipeline.FrameResult(ok=False), "frame")
+        return _timed({"message": "Gagal decode gambar"}, 400, timer)
 
-    faces = face_engine.detect_faces_gray(frame)
+    # Parameter deteksi mengikuti tingkat degradasi SLO (lihat `detection_slo`)
+    with metrics.stage("detect", timer):
+        faces = face_engine.detect_faces_gray(frame, **detection_slo.FRAME.params().kwargs())
     if not faces:
-        return jsonify({"detected": False, "faces": [], "image_size": {"w": int(frame.shape[1]), "h": int(frame.shape[0])}}), 200
+        result = recognition_pipeline.FrameResult(ok=True, image_size={"w": int(frame.shape[1]), "h": int(frame.shape[0])})
+        metrics.record_result(result, "frame")
+        return _timed(result.to_dict(), 200, timer)
 
     # Model + prediksi
     try:
-        model, _thr = _get_or_load_model()
+        with metrics.stage("model_load", timer):
+            model, _thr = _get_or_load_model()
     except Exception as e:
-        return jsonify({"message": f"Model belum siap: {e}"}), 500
+        return _timed({"message": f"Model belum siap: {e}"}, 500, timer)
 
-    residents = get_all_residents()
-    safe_to_display = {
-        face_engine.make_safe_name(r["name"]): r["name"]
-        for r in residents
-        if r.get("name")
-    }
-
-    face_results = []
-    # Tentukan "primary" face untuk status summary + logging (pakai wajah terbesar)
-    primary_idx = max(range(len(faces)), key=lambda i: faces[i][1][2] * faces[i][1][3])
-    primary_name = "Unknown"
-    primary_status = "DITOLAK"
-    primary_conf = 9999.0
-
-    for i, (face_gray, bbox) in enumerate(faces):
-        label, conf, is_unknown = face_engine.predict_face(face_gray, model)
-
-        if is_unknown:
-            display_name = "Unknown"
-            status = "DITOLAK"
-            known = False
-        else:
-            display_name = safe_to_display.get(label, label.replace("_", " "))
-            status = "MASUK"
-            known = True
-
-        item = {
-            "bbox": {"x": int(bbox[0]), "y": int(bbox[1]), "w": int(bbox[2]), "h": int(bbox[3])},
-            "name": display_name,
-            "status": status,
-            "confidence": float(conf),
-            "known": bool(known),
-        }
-        face_results.append(item)
-
-        if i == primary_idx:
-            primary_name = display_name
-            primary_status = status
-            primary_conf = float(conf)
+    # Label model = id penghuni; nama tampilan selalu dari DB (rename tanpa retrain)
+    with metrics.stage("names", timer):
+        id_to_name = face_engine.resident_display_names()
+    result = recognition_pipeline.recognize_frame(frame, model, id_to_name, faces=faces, timer=timer)
+    metrics.record_result(result, "frame")
 
     # Simpan event log (debounce)
+    event = _debounced_event(result, frame, time.time(), timer)
+    if event is not None:
+        with metrics.stage("add_event", timer):
+            add_event(event["name"], event["status"], event["confidence"], event["snapshot_path"])
+        metrics.EVENTS_TOTAL.inc(source="frame")
+
+    return _timed(result.to_dict(), 200, timer)
+
+
+def _timed(payload: dict, status: int, timer: metrics.StageTimer):
+    """Response /frame: saran pacing + header Server-Timing (durasi per tahap) + catat total request."""
+    response = jsonify({**payload, "pacing": frame_pacing.PACER.hints()})
+    metrics.STAGE_SECONDS.observe(timer.elapsed(), stage="total")
+    if status == 200:
+        # Hanya tahap yang dipengaruhi parameter deteksi (bukan decode/model_load/DB)
+        detection_slo.FRAME.observe(timer.total("detect", "predict"))
+    response.headers["Server-Timing"] = timer.server_timing()
+    return response, status
+
+
+def _debounced_event(result, frame, now: float, timer: Optional[metrics.StageTimer] = None) -> Optional[dict]:
+    """Event log untuk 1 hasil recognition, atau None jika kena debounce (server-wide)."""
     global _last_label, _last_log_ts
-    now = time.time()
+
+    if not result.detected:
+        return None
+
     min_interval = face_engine.get_env_float("MIN_LOG_INTERVAL_SECONDS", 3.0)
-    if (primary_name != _last_label) or ((now - _last_log_ts) >= min_interval):
-        snapshot_path = None
-        # Simpan snapshot hanya untuk UNKNOWN agar storage lebih hemat
-        if (str(primary_name).strip().lower() == "unknown") or (primary_status == "DITOLAK"):
+    # abs: frame /batch yang di-buffer bisa lebih tua dari event terakhir
+    if (result.name == _last_label) and (abs(now - _last_log_ts) < min_interval):
+        metrics.SKIPPED_TOTAL.inc(reason="debounce")
+        return None
+
+    snapshot_path = None
+    # Simpan snapshot hanya untuk UNKNOWN agar storage lebih hemat
+    if result.is_unknown:
+        try:
+            with metrics.stage("snapshot", timer):
+                snapshot_path = face_engine.save_snapshot(
+                    frame, "Unknown", bbox=result.primary_bbox, face_gray=result.primary_face, ts=now
+                )
+        except Exception:
+            snapshot_path = None
+
+    _last_label = result.name
+    _last_log_ts = now
+    return {
+        "name": result.name,
+        "status": result.status,
+        "confidence": float(result.confidence),
+        "snapshot_path": snapshot_path,
+    }
+
+
+def _read_length_prefixed(payload: bytes) -> Optional[List[bytes]]:
+    """Body biner: berulang [uint32 big-endian panjang][bytes gambar]."""
+    frames: List[bytes] = []
+    pos = 0
+    while pos < len(payload):
+        if pos + 4 > len(payload):
+            return None
+        (n,) = struct.unpack(">I", payload[pos : pos + 4])
+        pos += 4
+        if n <= 0 or pos + n > len(payload):
+            return None
+        frames.append(payload[pos : pos + n])
+        pos += n
+    return frames
+
+
+def _parse_frame_times(values: List[str], count: int) -> Optional[List[float]]:
+    """Waktu capture per frame (epoch detik atau ISO 8601); None jika tidak valid.
+
+    Waktu di masa depan dipotong ke sekarang (jam klien maju tidak boleh
+    mengunci debounce).
+    """
+    if len(values) != count:
+        return None
+    now = time.time()
+    out: List[float] = []
+    for raw in values:
+        raw = raw.strip()
+        try:
+            ts = float(raw)
+        except ValueError:
             try:
-                snapshot_path = face_engine.save_snapshot(frame, "Unknown")
-            except Exception:
-                snapshot_path = None
-        add_event(primary_name, primary_status, float(primary_conf), snapshot_path)
-        _last_label = primary_name
-        _last_log_ts = now
+                parsed = datetime.fromisoformat(raw.replace("Z", "+00:00"))
+            except ValueError:
+                return None
+            ts = parsed.timestamp()
+        if ts != ts or ts <= 0:  # NaN / kosong
+            return None
+        out.append(min(ts, now))
+    return out
+
+
+def _db_timestamp(ts: float) -> str:
+    # Sama dengan CURRENT_TIMESTAMP SQLite (UTC)
+    return datetime.fromtimestamp(ts, tz=timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+
+
+@recognition_bp.route("/recognition/batch", methods=["POST"])
+def recognition_batch():
+    """Recognition banyak frame dalam 1 request (mis. kiosk yang buffer frame saat offline).
+
+    Body:
+    - multipart/form-data: file `frames` (berulang, urutan dipertahankan)
+    - application/octet-stream: berulang [uint32 big-endian panjang][bytes JPEG/PNG]
+
+    Waktu capture per frame (opsional, epoch detik atau ISO 8601, jumlah sama
+    dengan frame): field `timestamps` berulang (multipart) atau header
+    `X-Frame-Timestamps` dipisah koma (biner). Dipakai untuk debounce dan
+    timestamp event; tanpa itu semua frame memakai waktu server saat diproses.
+
+    Query: `log=0` untuk tidak menulis event.
+
+    Decode + deteksi + prediksi berjalan paralel (BATCH_WORKERS thread). Hasil
+    per frame dikembalikan berurutan; event (debounce sama dengan /frame) ditulis
+    dalam 1 transaksi.
+    """
+    max_frames = face_engine.get_env_int("BATCH_MAX_FRAMES", 64)
+
+    if request.mimetype == "application/octet-stream":
+        frames = _read_length_prefixed(request.get_data(cache=False))
+        if frames is None:
+            return jsonify({"message": "Payload biner tidak valid (format: [uint32 BE panjang][bytes] berulang)."}), 400
+        header = request.headers.get("X-Frame-Timestamps", "")
+        raw_times = header.split(",") if header.strip() else []
+    else:
+        frames = [f.read() for f in request.files.getlist("frames")]
+        raw_times = request.form.getlist("timestamps")
+
+    if not frames:
+        return jsonify({"message": "Frame tidak ditemukan. Kirim file 'frames' (multipart) atau payload biner."}), 400
+    if len(frames) > max_frames:
+        return jsonify({"message": f"Terlalu banyak frame (maks {max_frames} per request)."}), 413
+
+    frame_times = None
+    if raw_times:
+        frame_times = _parse_frame_times(raw_times, len(frames))
+        if frame_times is None:
+            return jsonify({
+                "message": "Timestamp frame tidak valid: harus epoch detik / ISO 8601, satu per frame."
+            }), 400
+
+    try:
+        model, _thr = _get_or_load_model()
+    except Exception as e:
+        return jsonify({"message": f"Model belum siap: {e}"}), 500
+
+    id_to_name = face_engine.resident_display_names()
+
+    started = time.time()
+    metrics.BATCH_INFLIGHT.inc(len(frames))
+    try:
+        processed = recognition_pipeline.recognize_many(frames, model, id_to_name)
+    finally:
+        metrics.BATCH_INFLIGHT.dec(len(frames))
+    elapsed = time.time() - started
+    for result, _frame in processed:
+        metrics.record_result(result, "batch")
+
+    log_flag = request.args.get("log", "1").lower() not in {"0", "false", "no"}
+    events = []
+    logged = []
+    if log_flag:
+        now = time.time()
+        for i, (result, frame) in enumerate(processed):
+            ts = frame_times[i] if frame_times else now
+            event = _debounced_event(result, frame, ts) if result.ok else None
+            logged.append(event is not None)
+            if event is not None:
+                if frame_times:
+                    event["timestamp"] = _db_timestamp(ts)
+                events.append(event)
+    event_ids = []
+    if events:
+        with metrics.stage("add_event"):
+            event_ids = add_events(events)
+        metrics.EVENTS_TOTAL.inc(len(event_ids), source="batch")
+
+    results = []
+    for i, (result, _frame) in enumerate(processed):
+        item = result.to_dict()
+        item["index"] = i
+        item["logged"] = bool(logged[i]) if logged else False
+        results.append(item)
 
     return jsonify({
-        "detected": True,
-        "name": primary_name,
-        "status": primary_status,
-        "confidence": float(primary_conf),
-        "faces": face_results,
-        "image_size": {"w": int(frame.shape[1]), "h": int(frame.shape[0])},
+        "count": len(results),
+        "results": results,
+        "events_written": len(event_ids),
+        "elapsed_ms": round(elapsed * 1000.0, 1),
     }), 200
@@ -1,8 +1,18 @@
 # backend/app/routes/residents.py
 from flask import Blueprint, request, jsonify
-from ..database import add_resident, get_all_residents, get_resident_by_id, update_resident, delete_resident
+from ..database import (
+    add_resident,
+    delete_face_samples,
+    delete_resident,
+    get_all_residents,
+    get_face_sample_counts,
+    get_resident_by_id,
+    rename_face_samples,
+    update_resident,
+)
 import os
 import shutil 
+from pathlib import Path
 import traceback 
 from werkzeug.utils import secure_filename
 
@@ -10,8 +20,8 @@ from .. import face_engine
 
 residents_bp = Blueprint('residents', __name__)
 
-# Tentukan path ke folder 'dataset/faces/'
-FACES_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'dataset', 'faces'))
+# Tentukan path ke folder 'dataset/faces/' (sama dengan face_engine, ikut DATASET_DIR)
+FACES_DIR = str(face_engine.FACES_DIR)
 
 
 def make_safe_name(name: str) -> str:
@@ -26,25 +36,47 @@ def delete_face_dataset(name):
     if os.path.isdir(resident_dir):
         try:
             shutil.rmtree(resident_dir)
+            delete_face_samples(safe_name)
             print(f"DATASET WAJAH DIHAPUS: {resident_dir}")
             return True
         except Exception as e:
             print(f"Gagal menghapus folder dataset {resident_dir}: {e}")
             return False
+    delete_face_samples(safe_name)
     return True # Sudah tidak ada, jadi sukses
 
+
+def remove_from_model(resident_id):
+    """Keluarkan penghuni dari model (mask label, ms; compact di background); fallback retrain penuh untuk model format lama."""
+    try:
+        if resident_id is None:
+            return
+        if face_engine.remove_resident_from_model(resident_id):
+            face_engine.schedule_model_compaction()
+            return
+        max_imgs = face_engine.get_env_int("MAX_TRAIN_IMAGES_PER_PERSON", 200)
+        face_engine.train_lbph_model(max_images_per_person=max_imgs)
+    except Exception as e:
+        print(f"Gagal mengeluarkan penghuni {resident_id} dari model: {e}")
+
+
+def with_dataset_face_count(resident: dict, counts: dict) -> dict:
+    """Pakai jumlah wajah dari manifest dataset (bukan nilai dari klien) jika tersedia."""
+    item = dict(resident)
+    safe_name = make_safe_name(item.get('name') or '')
+    if safe_name in counts:
+        item['face_count'] = counts[safe_name]
+    return item
+
 # --- ENDPOINT: DELETE DATASET SAJA ---
 @residents_bp.route('/residents/dataset/<name>', methods=['DELETE'])
 def delete_resident_dataset_only(name):
     """Endpoint: DELETE /api/residents/dataset/<name> (Hapus dataset, JANGAN HAPUS metadata DB)"""
-    
+    resident_id = face_engine.resident_ids_by_folder().get(make_safe_name(name))
+
     if delete_face_dataset(name):
-        # retrain model (best-effort)
-        try:
-            max_imgs = face_engine.get_env_int("MAX_TRAIN_IMAGES_PER_PERSON", 200)
-            face_engine.train_lbph_model(max_images_per_person=max_imgs)
-        except Exception as _e:
-            pass
+        # Tanpa retrain: label penghuni di-mask di model (best-effort)
+        remove_from_model(resident_id)
         return jsonify({
             "message": f"Dataset wajah untuk '{name}' berhasil dihapus. Silakan tekan 'Simpan Perubahan' untuk memperbarui status di database.",
             "name": name,
@@ -60,9 +92,8 @@ def check_dataset(name):
     safe_name = make_safe_name(name)
     resident_dir = os.path.join(FACES_DIR, safe_name)
     
-    face_count = 0
-    if os.path.isdir(resident_dir):
-        face_count = len([f for f in os.listdir(resident_dir) if os.path.isfile(os.path.join(resident_dir, f))])
+    # Jumlah dari manifest dataset (COUNT ber-index), bukan listing folder
+    face_count = face_engine.count_faces(Path(resident_dir))
     
     return jsonify({
         "name": name,
@@ -75,7 +106,8 @@ def check_dataset(name):
 def list_residents():
     """Endpoint: GET /api/residents (Mengambil semua penghuni)"""
     try:
-        residents_list = get_all_residents()
+        counts = get_face_sample_counts()
+        residents_list = [with_dataset_face_count(r, counts) for r in get_all_residents()]
         return jsonify(residents_list), 200
     except Exception as e:
         print("------------------------------------------------------------------")
@@ -126,7 +158,7 @@ def get_resident(resident_id):
     resident = get_resident_by_id(resident_id)
     if resident is None:
         return jsonify({"message": "Penghuni tidak ditemukan."}), 404
-    return jsonify(resident), 200
+    return jsonify(with_dataset_face_count(resident, get_face_sample_counts())), 200
 
 # PUT/PATCH Update Resident
 @residents_bp.route('/residents/<int:resident_id>', methods=['PUT', 'PATCH'])
@@ -151,6 +183,16 @@ def update_resident_data(resident_id):
     old_name = existing_resident.get('name')
     name_changed = old_name != name
 
+    # Model format lama mencocokkan label lewat nama folder: migrasi ke label id
+    # penghuni selagi nama lama masih di DB, atau retrain setelah update
+    retrain = face_count != int(existing_resident.get('face_count') or 0)
+    if name_changed:
+        try:
+            retrain = not face_engine.migrate_legacy_labels() or retrain
+        except Exception as e:
+            print(f"Gagal migrasi label model format lama: {e}")
+            retrain = True
+
     if name_changed:
         try:
             old_safe = make_safe_name(old_name)
@@ -160,14 +202,17 @@ def update_resident_data(resident_id):
 
             if os.path.isdir(old_dir) and not os.path.exists(new_dir):
                 os.rename(old_dir, new_dir)
+                rename_face_samples(old_safe, new_safe)
                 print(f"DATASET DIR RENAMED: {old_dir} -> {new_dir}")
         except Exception as e:
             print(f"Gagal rename folder dataset saat update nama: {e}")
 
     if update_resident(resident_id, name, role, face_count):
-        # best-effort retrain jika dataset berubah
+        # best-effort retrain hanya jika dataset berubah (atau model lama tidak bisa
+        # dimigrasi). Rename cukup update metadata: label model = id penghuni, nama
+        # tampilan di-resolve dari DB saat prediksi.
         try:
-            if name_changed or face_count != int(existing_resident.get('face_count') or 0):
+            if retrain:
                 max_imgs = face_engine.get_env_int("MAX_TRAIN_IMAGES_PER_PERSON", 200)
                 face_engine.train_lbph_model(max_images_per_person=max_imgs)
         except Exception as _e:
@@ -194,12 +239,8 @@ def delete_resident_data(resident_id):
     
     # 2. Hapus Metadata dari DB
     if delete_resident(resident_id):
-        # retrain model (best-effort)
-        try:
-            max_imgs = face_engine.get_env_int("MAX_TRAIN_IMAGES_PER_PERSON", 200)
-            face_engine.train_lbph_model(max_images_per_person=max_imgs)
-        except Exception as _e:
-            pass
+        # Tanpa retrain: label penghuni di-mask di model (best-effort)
+        remove_from_model(resident_id)
         return jsonify({
             "message": f"Penghuni {resident['name']} dan datasetnya berhasil dihapus.",
             "id": resident_id
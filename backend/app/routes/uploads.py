@@ -2,6 +2,7 @@
 
 Endpoint utama yang dipakai UI:
 - POST /api/upload/faces
+- POST /api/upload/faces/cropped (crop 200x200 dari klien, tanpa deteksi ulang)
 
 UI akan mengirim:
 - form field: name
@@ -52,15 +53,103 @@ def upload_faces():
     except Exception as e:
         return jsonify({"message": f"Gagal memproses upload: {e}"}), 500
 
-    if int(result.get("saved", 0)) == 0:
-        # Tidak ada wajah yang terdeteksi dari semua frame
+    return _upload_response(
+        resident_name,
+        result,
+        train_flag,
+        (
+            "Tidak ada wajah yang terdeteksi pada gambar yang diunggah. "
+            "Pastikan wajah terlihat jelas dan pencahayaan cukup."
+        ),
+    )
+
+
+@upload_bp.route("/upload/faces/cropped", methods=["POST"])
+def upload_cropped_faces():
+    """Endpoint: POST /api/upload/faces/cropped
+
+    Untuk klien yang sudah meng-crop & align wajah (mis. halaman scan), tanpa
+    deteksi Haar ulang di server. Dua format:
+    - multipart: field `name` + file `faces` (PNG/JPEG grayscale 200x200)
+    - biner: `Content-Type: application/octet-stream`, `?name=...`, body =
+      N x 200 x 200 byte grayscale mentah (row-major), berurutan
+
+    Tiap crop hanya dicek murah (ukuran, tipe, tidak polos); crop yang gagal
+    dihitung sebagai `skipped`.
+    """
+    train_flag = request.args.get("train", "1").lower() not in {"0", "false", "no"}
+
+    if request.mimetype == "application/octet-stream":
+        resident_name = request.args.get("name")
+        payload = request.get_data(cache=False)
+        if not resident_name or not payload:
+            return jsonify({"message": "Error: Nama penghuni (?name=) dan payload wajah diperlukan."}), 400
+        try:
+            faces = list(face_engine.iter_packed_crops(payload))
+        except ValueError as e:
+            return jsonify({"message": f"Error: {e}"}), 400
+    else:
+        resident_name = request.form.get("name")
+        files = request.files.getlist("faces")
+        if not resident_name or not files:
+            return jsonify({"message": "Error: Nama penghuni dan file wajah diperlukan."}), 400
+
+        def iter_crops():
+            for f in files:
+                if not f or not getattr(f, "filename", None):
+                    continue
+                try:
+                    yield face_engine.decode_face_crop(f.read())
+                except Exception:
+                    yield None
+
+        faces = iter_crops()
+
+    try:
+        result = face_engine.save_face_crops(resident_name, faces)
+    except Exception as e:
+        return jsonify({"message": f"Gagal memproses upload: {e}"}), 500
+
+    return _upload_response(
+        resident_name,
+        result,
+        train_flag,
+        "Tidak ada crop wajah yang valid (harus grayscale 200x200 dan tidak polos).",
+    )
+
+
+def _upload_response(resident_name, result, train_flag, no_face_message):
+    """Bentuk response upload (dipakai upload biasa & upload crop)."""
+    filtered = {
+        "blurry": int(result.get("filtered_blurry", 0)),
+        "duplicate": int(result.get("filtered_duplicate", 0)),
+    }
+
+    if int(result.get("saved", 0)) == 0 and sum(filtered.values()) > 0:
+        # Wajah terdeteksi, tapi semuanya blur / duplikat dari dataset yang ada
         return jsonify(
             {
                 "message": (
-                    "Tidak ada wajah yang terdeteksi pada gambar yang diunggah. "
-                    "Pastikan wajah terlihat jelas dan pencahayaan cukup."
+                    f"Tidak ada wajah baru yang disimpan untuk {resident_name}: "
+                    f"{filtered['duplicate']} duplikat, {filtered['blurry']} blur."
                 ),
                 "resident_name": resident_name,
+                "safe_name": result.get("safe_name"),
+                "face_count": int(result.get("total", 0)),
+                "saved": 0,
+                "skipped": int(result.get("skipped", 0)),
+                "filtered": filtered,
+                "training": None,
+                "training_error": None,
+            }
+        ), 200
+
+    if int(result.get("saved", 0)) == 0:
+        # Tidak ada wajah yang terdeteksi dari semua frame
+        return jsonify(
+            {
+                "message": no_face_message,
+                "resident_name": resident_name,
                 "face_count": int(result.get("total", 0)),
                 "saved": int(result.get("saved", 0)),
                 "skipped": int(result.get("skipped", 0)),
@@ -81,6 +170,8 @@ def upload_faces():
     msg = (
         f"Berhasil memproses {result['saved']} wajah (skip {result['skipped']}) untuk {resident_name}."
     )
+    if sum(filtered.values()) > 0:
+        msg += f" Dibuang filter: {filtered['duplicate']} duplikat, {filtered['blurry']} blur."
     if training_error:
         msg += f" Namun training model gagal: {training_error}"
 
@@ -93,6 +184,7 @@ def upload_faces():
                 "saved": int(result.get("saved", 0)),
                 "skipped": int(result.get("skipped", 0)),
                 "face_count": int(result.get("total", 0)),
+                "filtered": filtered,
                 "training": training_summary,
                 "training_error": training_error,
             }
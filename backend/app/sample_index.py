@@ -0,0 +1,231 @@
+"""Index kualitas sampel wajah per penghuni + pemilihan sampel training.
+
+Index disimpan di SQLite (tabel `face_samples`, lihat `database.py`): 1 baris
+per crop tersimpan (resident_key = safe_name folder, file, pack_index, size,
+hash, quality, created_at). Upload & delete memperbarui manifest secara
+transaksional, sehingga jumlah wajah, alokasi nama file berikutnya, dan daftar
+file training didapat dari query ber-index, bukan listing folder.
+
+Folder yang belum ter-index (dataset lama / diubah manual) di-backfill sekali
+dari filesystem (`reindex`); sidecar `samples.json` versi lama ikut diimpor.
+
+`select_keys` memilih N sampel paling informatif: greedy berdasarkan skor
+kualitas (ketajaman) ditambah bonus keberagaman (jarak dHash ke sampel yang
+sudah terpilih), menggantikan sampling stride merata berdasarkan urutan nama.
+"""
+
+from __future__ import annotations
+
+import json
+import math
+import re
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+try:
+    import cv2
+except Exception:  # pragma: no cover
+    cv2 = None  # type: ignore
+
+from . import face_pack, image_quality
+from .database import (
+    add_face_samples,
+    count_face_samples,
+    get_face_samples,
+    is_face_dataset_indexed,
+    replace_face_samples,
+)
+
+# Sidecar versi lama (sebelum manifest SQLite), hanya dibaca saat backfill
+LEGACY_INDEX_FILENAME = "samples.json"
+
+_SEQ_RE = re.compile(r"_(\d+)\.[A-Za-z]+$")
+
+
+def score_face(face_gray: np.ndarray) -> Dict[str, object]:
+    """Hitung entri index untuk 1 crop wajah (grayscale 200x200)."""
+    sharp = image_quality.sharpness(face_gray)
+    return {
+        "sharpness": round(sharp, 3),
+        "quality": round(math.log1p(max(0.0, sharp)), 4),
+        "hash": format(image_quality.dhash(face_gray), "016x"),
+    }
+
+
+def sample_key(row: Dict[str, object]) -> str:
+    """Key sampel untuk pemilihan: nama file JPEG, atau "#<index>" untuk pack."""
+    if row.get("pack_index") is not None:
+        return f"#{int(row['pack_index'])}"
+    return str(row["file"])
+
+
+def file_seq(filename: str) -> Optional[int]:
+    m = _SEQ_RE.search(filename)
+    return int(m.group(1)) if m else None
+
+
+def make_file_row(path: Path, entry: Dict[str, object]) -> Dict[str, object]:
+    try:
+        size = path.stat().st_size
+    except OSError:
+        size = None
+    return {
+        "file": path.name,
+        "pack_index": None,
+        "seq": file_seq(path.name),
+        "size": size,
+        "hash": entry.get("hash"),
+        "quality": entry.get("quality"),
+        "sharpness": entry.get("sharpness"),
+    }
+
+
+def make_pack_row(pack_index: int, entry: Dict[str, object]) -> Dict[str, object]:
+    return {
+        "file": face_pack.PACK_DATA_FILENAME,
+        "pack_index": int(pack_index),
+        "seq": None,
+        "size": face_pack.FACE_BYTES,
+        "hash": entry.get("hash"),
+        "quality": entry.get("quality"),
+        "sharpness": entry.get("sharpness"),
+    }
+
+
+def _load_legacy_index(resident_dir: Path) -> Dict[str, Dict[str, object]]:
+    path = resident_dir / LEGACY_INDEX_FILENAME
+    if not path.exists():
+        return {}
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return dict(json.load(f).get("samples") or {})
+    except Exception as e:
+        print(f"Sample Index Error ({path}): {e}")
+        return {}
+
+
+def reindex(resident_dir: Path) -> List[Dict[str, object]]:
+    """Bangun ulang manifest 1 penghuni dari filesystem (JPEG + pack)."""
+    from .face_engine import list_face_files
+
+    legacy = _load_legacy_index(resident_dir)
+    rows: List[Dict[str, object]] = []
+
+    if resident_dir.is_dir():
+        for p in list_face_files(resident_dir):
+            entry = legacy.get(p.name)
+            if not entry:
+                img = cv2.imread(str(p), cv2.IMREAD_GRAYSCALE)
+                if img is None:
+                    continue
+                entry = score_face(img)
+            rows.append(make_file_row(p, entry))
+
+        manifest = face_pack.load_manifest(resident_dir)
+        pack_samples = list(manifest.get("samples") or [])
+        mm = None
+        for i in range(int(manifest.get("count", 0))):
+            entry = pack_samples[i] if i < len(pack_samples) else {}
+            if not entry.get("hash"):
+                if mm is None:
+                    mm = face_pack.open_pack(resident_dir)
+                if mm is None or i >= mm.shape[0]:
+                    break
+                entry = score_face(np.asarray(mm[i]))
+            rows.append(make_pack_row(i, entry))
+
+    replace_face_samples(resident_dir.name, rows)
+
+    legacy_path = resident_dir / LEGACY_INDEX_FILENAME
+    if legacy_path.exists():
+        try:
+            legacy_path.unlink()
+        except OSError:
+            pass
+
+    return rows
+
+
+def get_rows(resident_dir: Path) -> List[Dict[str, object]]:
+    """Manifest crop 1 penghuni (backfill sekali jika folder belum ter-index)."""
+    if not is_face_dataset_indexed(resident_dir.name):
+        reindex(resident_dir)
+    return get_face_samples(resident_dir.name)
+
+
+def count(resident_dir: Path) -> int:
+    """Jumlah crop penghuni dari manifest (query COUNT ber-index)."""
+    if not is_face_dataset_indexed(resident_dir.name):
+        return len(reindex(resident_dir))
+    return count_face_samples(resident_dir.name)
+
+
+def record_samples(resident_key: str, rows: List[Dict[str, object]]) -> bool:
+    """Catat crop baru ke manifest (1 transaksi)."""
+    if not rows:
+        return True
+    return add_face_samples(resident_key, rows)
+
+
+def rows_to_samples(rows: List[Dict[str, object]]) -> Dict[str, Dict[str, object]]:
+    """Manifest -> dict key sampel -> entri kualitas (untuk `select_keys`)."""
+    return {sample_key(r): r for r in rows}
+
+
+def _popcount64(values: np.ndarray) -> np.ndarray:
+    return np.unpackbits(values.astype(">u8").view(np.uint8).reshape(-1, 8), axis=1).sum(axis=1)
+
+
+def select_keys(
+    keys: List[str],
+    samples: Dict[str, Dict[str, object]],
+    max_n: Optional[int],
+    diversity_weight: float = 1.0,
+) -> List[str]:
+    """Pilih maksimal `max_n` key sampel: kualitas tinggi + saling berbeda (dHash).
+
+    Greedy: skor = kualitas_ternormalisasi + diversity_weight * (min_hamming / 64).
+    Key tanpa entri index diberi kualitas 0 (tetap bisa terpilih untuk mengisi).
+    Hasil dikembalikan dalam urutan `keys` supaya stabil.
+    """
+    if not max_n or max_n <= 0 or len(keys) <= max_n:
+        return list(keys)
+
+    quality = np.array([float((samples.get(k) or {}).get("quality") or 0.0) for k in keys], dtype=np.float64)
+    hashes = np.array(
+        [int(str((samples.get(k) or {}).get("hash") or "0"), 16) for k in keys],
+        dtype=np.uint64,
+    )
+
+    q_max = float(quality.max()) if quality.size else 0.0
+    q_norm = quality / q_max if q_max > 0 else quality
+
+    # Jarak minimum ke sampel terpilih (awal: maksimum 64 bit)
+    min_dist = np.full(len(keys), 64.0)
+    chosen = np.zeros(len(keys), dtype=bool)
+    order: List[int] = []
+
+    for _ in range(max_n):
+        score = q_norm + diversity_weight * (min_dist / 64.0)
+        score[chosen] = -np.inf
+        idx = int(np.argmax(score))
+        chosen[idx] = True
+        order.append(idx)
+        dist = _popcount64(np.bitwise_xor(hashes, hashes[idx])).astype(np.float64)
+        np.minimum(min_dist, dist, out=min_dist)
+
+    return [keys[i] for i in sorted(order)]
+
+
+def select_samples(
+    paths: List[Path],
+    samples: Dict[str, Dict[str, object]],
+    max_n: Optional[int],
+    diversity_weight: float = 1.0,
+) -> List[Path]:
+    """Versi `select_keys` untuk list path file (key = nama file)."""
+    by_name = {p.name: p for p in paths}
+    chosen = select_keys([p.name for p in paths], samples, max_n, diversity_weight)
+    return [by_name[k] for k in chosen]
@@ -0,0 +1,427 @@
+"""Penyimpanan snapshot event (JPEG) di luar request path.
+
+Sebelumnya `save_snapshot` melakukan `cv2.imwrite` full-resolution secara
+sinkron di dalam `/api/recognition/frame` dan loop worker, tepat saat latency
+paling penting (ada Unknown). Modul ini:
+- Mengalokasikan nama file snapshot di awal (path langsung bisa ditulis ke event)
+- Meng-encode JPEG di thread pool background (cv2.imencode melepas GIL)
+- Menulis ke file sementara lalu `os.replace` agar file tidak pernah setengah jadi
+
+Layout penyimpanan (shard per hari):
+    dataset/snapshots/<YYYYmmdd>/<HHMMSS>_<ms>_<pid>_<seq>_<label>.jpg
+
+`events.snapshot_path` menyimpan referensi relatif `<YYYYmmdd>/<file>.jpg`.
+Retensi cukup menghapus folder hari yang sudah kedaluwarsa dan mengosongkan
+referensi event dengan prefix yang sama (range query ber-index), sehingga
+biaya cleanup sebanding dengan data yang kedaluwarsa, bukan total file.
+Snapshot lama (flat `dataset/snapshots/*.jpg`, path absolut) tetap didukung.
+
+Near-duplicate Unknown: jika `face_gray` diberikan, dHash wajah dibandingkan
+dengan index kecil snapshot terakhir (in-memory). Snapshot yang hampir sama
+dalam jendela waktu sejak file itu ditulis, dan masih di shard hari yang sama,
+tidak ditulis ulang; event baru memakai referensi file yang sudah ada
+(snapshot_path sama). Jadi event tidak pernah menunjuk shard yang lebih tua
+dari harinya sendiri, dan retensi per hari tidak mengosongkan snapshot event baru.
+
+Thumbnail (untuk list log) dibuat sekali saat snapshot ditulis, atau lazily saat
+pertama diminta, dan disimpan di `<YYYYmmdd>/thumbs/` (ikut terhapus bersama
+shard hari-nya).
+
+Konfigurasi (environment variables):
+- SNAPSHOT_JPEG_QUALITY (default 85)
+- SNAPSHOT_MAX_SIDE (default 0 = ukuran asli)
+- SNAPSHOT_FACE_ONLY (default 0): simpan crop wajah saja (butuh bbox)
+- SNAPSHOT_FACE_MARGIN (default 0.4): margin crop relatif terhadap ukuran bbox
+- SNAPSHOT_WORKERS (default 2)
+- SNAPSHOT_MAX_PENDING (default 32): jika antrian penuh, encode sinkron
+- SNAPSHOT_THUMB_SIDE (default 240), SNAPSHOT_THUMB_QUALITY (default 75)
+- SNAPSHOT_DEDUP (default 1), SNAPSHOT_DEDUP_MAX_DISTANCE (default 6 bit dari 64)
+- SNAPSHOT_DEDUP_WINDOW_SECONDS (default 600), SNAPSHOT_DEDUP_INDEX_SIZE (default 64)
+"""
+
+from __future__ import annotations
+
+import atexit
+import itertools
+import os
+import re
+import shutil
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Deque, Dict, List, Optional, Tuple
+
+import numpy as np
+
+try:
+    import cv2
+except Exception:  # pragma: no cover
+    cv2 = None  # type: ignore
+
+from . import face_engine, metrics
+from .image_quality import dhash, hamming
+
+_EXECUTOR: Optional[ThreadPoolExecutor] = None
+_LOCK = threading.Lock()
+_PENDING: Dict[str, Future] = {}
+_SEQ = itertools.count(1)
+
+# Index rolling dHash snapshot terakhir: [written_ts, hash, ref]
+_DEDUP_INDEX: Deque[List[object]] = deque()
+DEDUP_TOTAL: metrics.Counter = metrics.REGISTRY.register(  # type: ignore[assignment]
+    metrics.Counter(
+        "hfg_snapshot_dedup_total", "Snapshot Unknown: file baru ditulis (written) atau file lama dipakai ulang (reused)."
+    )
+)
+
+DAY_DIR_RE = re.compile(r"^\d{8}$")
+THUMBS_DIRNAME = "thumbs"
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _EXECUTOR
+    with _LOCK:
+        if _EXECUTOR is None:
+            workers = max(1, face_engine.get_env_int("SNAPSHOT_WORKERS", 2))
+            _EXECUTOR = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="snapshot")
+        return _EXECUTOR
+
+
+def _face_only_enabled() -> bool:
+    return os.getenv("SNAPSHOT_FACE_ONLY", "0").strip().lower() in {"1", "true", "yes"}
+
+
+def prepare_snapshot_image(
+    frame_bgr: np.ndarray,
+    bbox: Optional[Tuple[int, int, int, int]] = None,
+) -> np.ndarray:
+    """Crop (opsional) & downscale frame sesuai konfigurasi snapshot."""
+    img = frame_bgr
+
+    if bbox is not None and _face_only_enabled():
+        x, y, w, h = (int(v) for v in bbox)
+        margin = face_engine.get_env_float("SNAPSHOT_FACE_MARGIN", 0.4)
+        mx, my = int(w * margin), int(h * margin)
+        H, W = img.shape[:2]
+        x0, y0 = max(0, x - mx), max(0, y - my)
+        x1, y1 = min(W, x + w + mx), min(H, y + h + my)
+        if x1 > x0 and y1 > y0:
+            img = img[y0:y1, x0:x1]
+
+    max_side = face_engine.get_env_int("SNAPSHOT_MAX_SIDE", 0)
+    h, w = img.shape[:2]
+    m = max(h, w)
+    if max_side > 0 and m > max_side:
+        scale = max_side / float(m)
+        img = cv2.resize(img, (max(1, int(w * scale)), max(1, int(h * scale))), interpolation=cv2.INTER_AREA)
+
+    return img
+
+
+def _write_jpeg(out_path: Path, img: np.ndarray, quality: int) -> None:
+    quality = max(10, min(100, quality))
+    ok, buf = cv2.imencode(".jpg", img, [int(cv2.IMWRITE_JPEG_QUALITY), quality])
+    if not ok:
+        raise RuntimeError(f"Gagal encode snapshot: {out_path.name}")
+
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = out_path.with_name(out_path.name + ".tmp")
+    with open(tmp_path, "wb") as f:
+        f.write(buf.tobytes())
+    os.replace(tmp_path, out_path)
+
+
+def _make_thumbnail(img: np.ndarray) -> np.ndarray:
+    side = max(32, face_engine.get_env_int("SNAPSHOT_THUMB_SIDE", 240))
+    h, w = img.shape[:2]
+    m = max(h, w)
+    if m <= side:
+        return img
+    scale = side / float(m)
+    return cv2.resize(img, (max(1, int(w * scale)), max(1, int(h * scale))), interpolation=cv2.INTER_AREA)
+
+
+def _write_snapshot(
+    out_path: Path,
+    frame_bgr: np.ndarray,
+    bbox: Optional[Tuple[int, int, int, int]],
+) -> str:
+    img = prepare_snapshot_image(frame_bgr, bbox)
+    _write_jpeg(out_path, img, face_engine.get_env_int("SNAPSHOT_JPEG_QUALITY", 85))
+
+    # Thumbnail sekalian dibuat selagi frame masih di memori (tanpa decode ulang)
+    try:
+        thumb_path = out_path.parent / THUMBS_DIRNAME / out_path.name
+        _write_jpeg(thumb_path, _make_thumbnail(img), face_engine.get_env_int("SNAPSHOT_THUMB_QUALITY", 75))
+    except Exception as e:
+        print(f"Snapshot Thumbnail Error: {e}")
+
+    return str(out_path)
+
+
+def _allocate_ref(label: str, now: Optional[float] = None) -> str:
+    """Nama snapshot unik: shard hari + timestamp ms + pid + counter."""
+    now = time.time() if now is None else now
+    lt = time.localtime(now)
+    day = time.strftime("%Y%m%d", lt)
+    ms = int((now % 1) * 1000)
+    with _LOCK:
+        seq = next(_SEQ)
+    safe_label = face_engine.make_safe_name(label) if label else "event"
+    filename = f"{time.strftime('%H%M%S', lt)}_{ms:03d}_{os.getpid()}_{seq:06d}_{safe_label}.jpg"
+    return f"{day}/{filename}"
+
+
+def resolve_snapshot(ref: str) -> Path:
+    """Referensi snapshot (relatif / path absolut lama) -> path file."""
+    p = Path(ref)
+    if p.is_absolute():
+        return p
+    return face_engine.SNAPSHOTS_DIR / p
+
+
+def snapshot_url_path(snapshot_path: str) -> str:
+    """Bagian path untuk URL /api/snapshots/<...> dari nilai `events.snapshot_path`."""
+    p = Path(snapshot_path)
+    if not p.is_absolute():
+        return p.as_posix()
+    try:
+        return p.relative_to(face_engine.SNAPSHOTS_DIR).as_posix()
+    except ValueError:
+        # Snapshot lama (flat) yang path-nya absolut
+        return p.name
+
+
+def is_immutable_ref(ref: str) -> bool:
+    """Snapshot ber-shard punya nama unik & tidak pernah ditimpa (aman di-cache lama)."""
+    parts = Path(ref).parts
+    return len(parts) >= 2 and bool(DAY_DIR_RE.match(parts[0]))
+
+
+def thumbnail_ref(ref: str) -> str:
+    """Referensi thumbnail untuk snapshot: `<dir>/thumbs/<file>`."""
+    p = Path(snapshot_url_path(ref))
+    return (p.parent / THUMBS_DIRNAME / p.name).as_posix()
+
+
+def ensure_thumbnail(ref: str) -> Optional[str]:
+    """Pastikan thumbnail ada (buat lazily dari snapshot jika belum). Return ref thumbnail."""
+    thumb_ref = thumbnail_ref(ref)
+    thumb_path = resolve_snapshot(thumb_ref)
+    if thumb_path.is_file():
+        return thumb_ref
+
+    src_path = resolve_snapshot(ref)
+    if cv2 is None or not src_path.is_file():
+        return None
+
+    # Decode langsung di resolusi 1/2 untuk snapshot besar (lebih cepat)
+    img = cv2.imread(str(src_path), cv2.IMREAD_REDUCED_COLOR_2)
+    if img is None:
+        return None
+    _write_jpeg(thumb_path, _make_thumbnail(img), face_engine.get_env_int("SNAPSHOT_THUMB_QUALITY", 75))
+    return thumb_ref
+
+
+def _forget(key: str, fut: Future) -> None:
+    with _LOCK:
+        if _PENDING.get(key) is fut:
+            _PENDING.pop(key, None)
+    exc = fut.exception()
+    if exc is not None:
+        print(f"Snapshot Error: {exc}")
+
+
+def _dedup_enabled() -> bool:
+    return os.getenv("SNAPSHOT_DEDUP", "1").strip().lower() not in {"0", "false", "no"}
+
+
+def _find_duplicate(face_hash: int, now: float) -> Optional[str]:
+    """Cari snapshot yang hampir sama di index (sekaligus buang entri kedaluwarsa)."""
+    window = face_engine.get_env_float("SNAPSHOT_DEDUP_WINDOW_SECONDS", 600.0)
+    max_dist = face_engine.get_env_int("SNAPSHOT_DEDUP_MAX_DISTANCE", 6)
+    with _LOCK:
+        while _DEDUP_INDEX and now - float(_DEDUP_INDEX[0][0]) > window:
+            _DEDUP_INDEX.popleft()
+        best = None
+        best_dist = max_dist + 1
+        day = time.strftime("%Y%m%d", time.localtime(now))
+        for entry in _DEDUP_INDEX:
+            if not str(entry[2]).startswith(day + "/"):
+                continue
+            d = hamming(face_hash, int(entry[1]))
+            if d < best_dist:
+                best, best_dist = entry, d
+        if best is None:
+            return None
+        ref = str(best[2])
+        if ref not in _PENDING and not resolve_snapshot(ref).is_file():
+            return None
+        DEDUP_TOTAL.inc(result="reused")
+        return ref
+
+
+def _remember(face_hash: int, ref: str, now: float) -> None:
+    size = max(1, face_engine.get_env_int("SNAPSHOT_DEDUP_INDEX_SIZE", 64))
+    with _LOCK:
+        _DEDUP_INDEX.append([now, face_hash, ref])
+        while len(_DEDUP_INDEX) > size:
+            _DEDUP_INDEX.popleft()
+
+
+def submit_snapshot(
+    frame_bgr: np.ndarray,
+    label: str,
+    bbox: Optional[Tuple[int, int, int, int]] = None,
+    face_gray: Optional[np.ndarray] = None,
+    ts: Optional[float] = None,
+) -> str:
+    """Alokasikan path snapshot & jadwalkan encoding di background.
+
+    Return referensi relatif `<YYYYmmdd>/<file>.jpg` (file belum tentu sudah
+    ada di disk saat fungsi kembali). Frame tidak di-copy: pemanggil tidak boleh
+    memodifikasi array setelahnya.
+
+    Jika `face_gray` diberikan dan wajahnya hampir sama dengan snapshot terakhir,
+    referensi snapshot lama dikembalikan tanpa menulis file baru.
+
+    `ts` (epoch detik) = waktu frame diambil; menentukan shard hari snapshot, supaya
+    frame /batch yang di-buffer melewati tengah malam masuk ke hari event-nya.
+    """
+    if cv2 is None:
+        raise RuntimeError("OpenCV (cv2) belum tersedia. Install opencv-contrib-python.")
+
+    now = time.time() if ts is None else ts
+    face_hash: Optional[int] = None
+    if face_gray is not None and _dedup_enabled():
+        try:
+            face_hash = dhash(face_gray)
+            existing = _find_duplicate(face_hash, now)
+            if existing is not None:
+                return existing
+        except Exception as e:
+            print(f"Snapshot Dedup Error: {e}")
+            face_hash = None
+
+    face_engine.ensure_dirs()
+    key = _allocate_ref(label, now)
+    out_path = resolve_snapshot(key)
+    if face_hash is not None:
+        _remember(face_hash, key, now)
+    DEDUP_TOTAL.inc(result="written")
+
+    max_pending = face_engine.get_env_int("SNAPSHOT_MAX_PENDING", 32)
+    with _LOCK:
+        backlog = len(_PENDING)
+    if backlog >= max_pending:
+        # Antrian penuh: lebih baik lambat daripada kehilangan bukti snapshot
+        _write_snapshot(out_path, frame_bgr, bbox)
+        return key
+
+    fut = _get_executor().submit(_write_snapshot, out_path, frame_bgr, bbox)
+    with _LOCK:
+        _PENDING[key] = fut
+    fut.add_done_callback(lambda f, k=key: _forget(k, f))
+    return key
+
+
+def wait_for_snapshot(ref: str, timeout: float = 2.0) -> bool:
+    """Tunggu snapshot yang masih di-encode. Return True jika file sudah final."""
+    with _LOCK:
+        fut = _PENDING.get(str(ref))
+    if fut is not None:
+        try:
+            fut.result(timeout=timeout)
+        except Exception:
+            return False
+    return resolve_snapshot(ref).is_file()
+
+
+def pending_count() -> int:
+    with _LOCK:
+        return len(_PENDING)
+
+
+metrics.register_gauge("hfg_snapshot_pending", "Snapshot yang masih antre/di-encode di background.", pending_count)
+
+
+def flush(timeout: float = 5.0) -> None:
+    """Tunggu semua snapshot pending selesai ditulis."""
+    with _LOCK:
+        futures = list(_PENDING.values())
+    deadline = time.time() + timeout
+    for fut in futures:
+        try:
+            fut.result(timeout=max(0.0, deadline - time.time()))
+        except Exception:
+            pass
+
+
+def list_day_dirs() -> List[str]:
+    """Daftar shard hari (YYYYmmdd) yang ada, urut naik."""
+    if not face_engine.SNAPSHOTS_DIR.exists():
+        return []
+    return sorted(
+        entry.name
+        for entry in os.scandir(face_engine.SNAPSHOTS_DIR)
+        if entry.is_dir() and DAY_DIR_RE.match(entry.name)
+    )
+
+
+def purge_expired_snapshots(days: int, batch_size: int = 500) -> Dict[str, int]:
+    """Retensi snapshot: hapus shard hari yang seluruh isinya lebih tua dari N hari.
+
+    - Shard hari dihapus utuh (rmtree), tanpa stat per file
+    - Referensi `events.snapshot_path` dengan prefix shard tsb dikosongkan per batch
+    - Snapshot flat lama (`snapshots/*.jpg`) masih dibersihkan via mtime
+    """
+    from .database import clear_snapshot_paths, clear_snapshot_refs_with_prefix
+
+    out = {"days_removed": 0, "files_deleted": 0, "events_cleared": 0}
+    snapshots_dir = face_engine.SNAPSHOTS_DIR
+    if not snapshots_dir.exists():
+        return out
+
+    cutoff = datetime.now() - timedelta(days=days)
+    cutoff_day = cutoff.strftime("%Y%m%d")
+
+    for day in list_day_dirs():
+        if day >= cutoff_day:
+            break
+        day_dir = snapshots_dir / day
+        try:
+            n_files = sum(1 for e in os.scandir(day_dir) if e.is_file())
+            shutil.rmtree(day_dir)
+        except Exception as e:
+            # Jika file sedang dipakai/permission error, coba lagi di run berikutnya
+            print(f"Gagal menghapus shard snapshot {day_dir}: {e}")
+            continue
+        out["days_removed"] += 1
+        out["files_deleted"] += n_files
+        out["events_cleared"] += clear_snapshot_refs_with_prefix(f"{day}/", batch_size=batch_size)
+
+    # Snapshot flat lama (sebelum sharding)
+    cutoff_ts = cutoff.timestamp()
+    legacy_deleted: List[str] = []
+    for p in snapshots_dir.glob("*.jpg"):
+        try:
+            if p.stat().st_mtime < cutoff_ts:
+                p.unlink()
+                legacy_deleted.append(str(p))
+                (snapshots_dir / THUMBS_DIRNAME / p.name).unlink(missing_ok=True)
+        except Exception:
+            continue
+    if legacy_deleted:
+        out["files_deleted"] += len(legacy_deleted)
+        out["events_cleared"] += clear_snapshot_paths(legacy_deleted, batch_size=batch_size)
+
+    return out
+
+
+@atexit.register
+def _shutdown() -> None:
+    if _EXECUTOR is not None:
+        _EXECUTOR.shutdown(wait=True)
@@ -0,0 +1,142 @@
+"""Deteksi wajah ber-tile untuk frame resolusi tinggi (kamera 4K di lobi lebar).
+
+Mode biasa men-downscale frame ke `max_side` (640) sebelum Haar: wajah yang
+jauh dari kamera ikut mengecil di bawah minSize dan hilang. Deteksi
+full-resolution di 1 thread terlalu lambat. Mode tile (DETECT_TILED=1):
+- frame grayscale diperkecil ke DETECT_TILED_MAX_SIDE (default 1920) jika lebih besar
+- dipotong jadi tile DETECT_TILE_SIZE (default 640) yang saling overlap
+  DETECT_TILE_OVERLAP (default 0.25); wajah yang lebih kecil dari overlap selalu
+  utuh di minimal 1 tile. minSize di tile: DETECT_TILE_MIN_SIZE (default 24)
+- 1 pass global (downscale biasa ke `max_side`) untuk wajah besar yang terpotong tile
+- semua tile + pass global dideteksi paralel di thread pool (DETECT_TILE_WORKERS,
+  default jumlah core); `detectMultiScale` melepas GIL
+- kotak dari semua pass digabung dengan NMS (IoU DETECT_TILE_NMS_IOU, default 0.3)
+
+Hanya aktif untuk frame yang sisi terpanjangnya > `max_side`; frame kecil tetap
+memakai jalur biasa.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional, Tuple
+
+import numpy as np
+
+try:
+    import cv2
+except Exception:  # pragma: no cover
+    cv2 = None  # type: ignore
+
+Box = Tuple[int, int, int, int]
+# (gambar grayscale, minSize) -> kotak (x, y, w, h) di koordinat gambar tsb
+DetectFn = Callable[[np.ndarray, Tuple[int, int]], object]
+
+# Kotak kecil yang hampir seluruhnya berada di kotak lain = wajah yang sama
+CONTAIN_THRESHOLD = 0.8
+
+_EXECUTOR: Optional[ThreadPoolExecutor] = None
+_LOCK = threading.Lock()
+
+
+def enabled() -> bool:
+    return os.getenv("DETECT_TILED", "0").strip().lower() in {"1", "true", "yes"}
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _EXECUTOR
+    from .face_engine import get_env_int  # face_engine mengimpor modul ini
+
+    with _LOCK:
+        if _EXECUTOR is None:
+            workers = get_env_int("DETECT_TILE_WORKERS", 0) or (os.cpu_count() or 1)
+            _EXECUTOR = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="detect-tile")
+        return _EXECUTOR
+
+
+def _positions(length: int, tile: int, stride: int) -> List[int]:
+    if length <= tile:
+        return [0]
+    out = list(range(0, length - tile, stride))
+    out.append(length - tile)  # tile terakhir menempel tepi
+    return out
+
+
+def tile_grid(h: int, w: int, tile: int, overlap: float) -> List[Box]:
+    """Tile (x, y, w, h) yang menutup seluruh gambar dengan overlap minimal `overlap`."""
+    stride = max(1, int(tile * (1.0 - overlap)))
+    return [
+        (x, y, min(tile, w), min(tile, h))
+        for y in _positions(h, tile, stride)
+        for x in _positions(w, tile, stride)
+    ]
+
+
+def nms(boxes: np.ndarray, iou_threshold: float) -> np.ndarray:
+    """Gabungkan kotak duplikat (N x 4, x/y/w/h). Haar tanpa skor: kotak besar diprioritaskan."""
+    if len(boxes) == 0:
+        return boxes
+    x1, y1 = boxes[:, 0].astype(np.float64), boxes[:, 1].astype(np.float64)
+    x2, y2 = x1 + boxes[:, 2], y1 + boxes[:, 3]
+    area = boxes[:, 2].astype(np.float64) * boxes[:, 3]
+    order = np.argsort(-area, kind="stable")
+
+    keep: List[int] = []
+    while order.size:
+        i = order[0]
+        keep.append(int(i))
+        rest = order[1:]
+        iw = np.clip(np.minimum(x2[i], x2[rest]) - np.maximum(x1[i], x1[rest]), 0, None)
+        ih = np.clip(np.minimum(y2[i], y2[rest]) - np.maximum(y1[i], y1[rest]), 0, None)
+        inter = iw * ih
+        iou = inter / (area[i] + area[rest] - inter)
+        contained = inter / np.maximum(area[rest], 1.0)
+        order = rest[(iou <= iou_threshold) & (contained <= CONTAIN_THRESHOLD)]
+    return boxes[keep]
+
+
+def _resize_max_side(gray: np.ndarray, max_side: int) -> Tuple[np.ndarray, float]:
+    h, w = gray.shape[:2]
+    m = max(h, w)
+    if m <= max_side:
+        return gray, 1.0
+    scale = max_side / float(m)
+    return cv2.resize(gray, (int(w * scale), int(h * scale)), interpolation=cv2.INTER_AREA), 1.0 / scale
+
+
+def _run(detect_fn: DetectFn, img: np.ndarray, min_side: int, inv: float, dx: int, dy: int) -> np.ndarray:
+    """Deteksi 1 tile / pass; kotak dikembalikan ke koordinat frame asli."""
+    faces = detect_fn(img, (min_side, min_side))
+    if faces is None or len(faces) == 0:
+        return np.empty((0, 4), dtype=np.int64)
+    a = np.asarray(faces, dtype=np.float64).reshape(-1, 4)
+    a[:, 0] += dx
+    a[:, 1] += dy
+    return (a * inv).astype(np.int64)
+
+
+def detect(gray: np.ndarray, detect_fn: DetectFn, max_side: int, min_size: Tuple[int, int]) -> List[Box]:
+    """Deteksi ber-tile; return kotak (x, y, w, h) di koordinat `gray`, kiri -> kanan."""
+    from .face_engine import get_env_float, get_env_int
+
+    tile = max(64, get_env_int("DETECT_TILE_SIZE", 640))
+    overlap = min(0.9, max(0.0, get_env_float("DETECT_TILE_OVERLAP", 0.25)))
+    tile_min = max(1, get_env_int("DETECT_TILE_MIN_SIZE", 24))
+
+    tiled, tiled_inv = _resize_max_side(gray, max(tile, get_env_int("DETECT_TILED_MAX_SIDE", 1920)))
+    small, small_inv = _resize_max_side(gray, max_side)
+
+    # Wajah selebar overlap selalu utuh di tile; pass global harus mulai menangkap dari ukuran itu
+    overlap_px = tile * overlap * tiled_inv / small_inv
+    global_min = min(min_size[0], max(tile_min, int(overlap_px)))
+
+    pool = _get_executor()
+    jobs = [pool.submit(_run, detect_fn, small, global_min, small_inv, 0, 0)]
+    for x, y, w, h in tile_grid(tiled.shape[0], tiled.shape[1], tile, overlap):
+        jobs.append(pool.submit(_run, detect_fn, tiled[y : y + h, x : x + w], tile_min, tiled_inv, x, y))
+
+    boxes = np.concatenate([j.result() for j in jobs])
+    merged = nms(boxes, get_env_float("DETECT_TILE_NMS_IOU", 0.3))
+    return sorted((tuple(int(v) for v in b) for b in merged), key=lambda b: (b[0], b[1]))  # type: ignore[misc]
@@ -0,0 +1,144 @@
+"""Evaluasi trade-off pemilihan sampel training (stride vs quality).
+
+Untuk tiap penghuni di dataset/faces, setiap gambar ke-k dijadikan data uji
+(holdout), sisanya jadi pool training. Untuk tiap strategi & tiap N
+(maks sampel per orang), model LBPH dilatih dari pool lalu diuji:
+- accuracy: prediksi benar & di bawah threshold
+- unknown_rate: wajah penghuni yang ditolak sebagai Unknown
+- train_seconds, predict_ms (rata-rata per wajah)
+
+Cara pakai (dari folder backend/):
+    python benchmarks/eval_sample_selection.py --sizes 25,50,100,200
+    python benchmarks/eval_sample_selection.py --faces-dir /data/faces --json hasil.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import cv2  # noqa: E402
+
+from app import face_engine, sample_index  # noqa: E402
+from app.database import init_db  # noqa: E402
+
+
+def _load_dataset(faces_dir: Path, holdout_every: int):
+    """Return list (label, person_dir, pool_paths, test_paths)."""
+    out = []
+    for person_dir in sorted((p for p in faces_dir.iterdir() if p.is_dir()), key=lambda p: p.name.lower()):
+        paths = sorted(
+            (p for p in person_dir.iterdir() if p.is_file() and p.suffix.lower() in face_engine.IMAGE_EXTS),
+            key=lambda p: p.name,
+        )
+        if len(paths) < 2:
+            continue
+        test = paths[::holdout_every]
+        pool = [p for p in paths if p not in set(test)]
+        sample_index.get_rows(person_dir)
+        out.append((person_dir.name, person_dir, pool, test))
+    return out
+
+
+def _read(path: Path, cache: Dict[Path, np.ndarray]) -> np.ndarray:
+    img = cache.get(path)
+    if img is None:
+        img = cv2.imread(str(path), cv2.IMREAD_GRAYSCALE)
+        img = cv2.resize(img, (200, 200))
+        cache[path] = img
+    return img
+
+
+def evaluate(dataset, strategy: str, max_n: int, threshold: float, cache) -> Dict[str, object]:
+    x: List[np.ndarray] = []
+    y: List[int] = []
+    tests: List[Tuple[int, Path]] = []
+    for label_id, (_label, person_dir, pool, test) in enumerate(dataset):
+        chosen = face_engine.select_training_paths(person_dir, pool, max_n, strategy=strategy)
+        for p in chosen:
+            x.append(_read(p, cache))
+            y.append(label_id)
+        tests.extend((label_id, p) for p in test)
+
+    recognizer = cv2.face.LBPHFaceRecognizer_create()
+    started = time.perf_counter()
+    recognizer.train(np.array(x, dtype=np.uint8), np.array(y, dtype=np.int32))
+    train_seconds = time.perf_counter() - started
+
+    correct = 0
+    unknown = 0
+    started = time.perf_counter()
+    for label_id, p in tests:
+        pred, conf = recognizer.predict(_read(p, cache))
+        if conf >= threshold:
+            unknown += 1
+        elif pred == label_id:
+            correct += 1
+    predict_seconds = time.perf_counter() - started
+
+    n_test = max(1, len(tests))
+    return {
+        "strategy": strategy,
+        "max_images_per_person": max_n,
+        "num_samples": len(x),
+        "num_test": len(tests),
+        "accuracy": round(correct / n_test, 4),
+        "unknown_rate": round(unknown / n_test, 4),
+        "train_seconds": round(train_seconds, 3),
+        "predict_ms": round(predict_seconds * 1000.0 / n_test, 3),
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--faces-dir", default=str(face_engine.FACES_DIR))
+    parser.add_argument("--sizes", default="25,50,100,200", help="daftar N (maks sampel per orang)")
+    parser.add_argument("--strategies", default="stride,quality")
+    parser.add_argument("--holdout-every", type=int, default=5)
+    parser.add_argument("--threshold", type=float, default=face_engine.get_env_float("LBPH_THRESHOLD", 60.0))
+    parser.add_argument("--json", dest="json_path", default=None, help="simpan hasil ke file JSON")
+    args = parser.parse_args()
+
+    faces_dir = Path(args.faces_dir)
+    if not faces_dir.is_dir():
+        print(f"Folder dataset tidak ditemukan: {faces_dir}")
+        return 1
+
+    init_db()
+    dataset = _load_dataset(faces_dir, max(2, args.holdout_every))
+    if len(dataset) < 2:
+        print("Butuh minimal 2 penghuni dengan >= 2 gambar untuk evaluasi.")
+        return 1
+
+    sizes = [int(v) for v in args.sizes.split(",") if v.strip()]
+    strategies = [v.strip() for v in args.strategies.split(",") if v.strip()]
+
+    cache: Dict[Path, np.ndarray] = {}
+    results = []
+    print(f"{'strategy':<9} {'N':>5} {'samples':>8} {'acc':>7} {'unknown':>8} {'train_s':>8} {'pred_ms':>8}")
+    for n in sizes:
+        for strategy in strategies:
+            r = evaluate(dataset, strategy, n, args.threshold, cache)
+            results.append(r)
+            print(
+                f"{r['strategy']:<9} {n:>5} {r['num_samples']:>8} {r['accuracy']:>7.3f} "
+                f"{r['unknown_rate']:>8.3f} {r['train_seconds']:>8.3f} {r['predict_ms']:>8.3f}"
+            )
+
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump({"threshold": args.threshold, "results": results}, f, indent=2)
+        print(f"Hasil disimpan ke {args.json_path}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,406 @@
+"""Load generator: putar ulang rekaman ke POST /api/recognition/frame.
+
+Untuk sizing hardware per lokasi: berapa kamera/klien browser yang sanggup
+dilayani 1 server. Frame diambil dari video atau folder gambar, lalu di-encode
+persis seperti `docs/assets/js/dashboard.js` (resize lebar 640, JPEG kualitas
+0.7, JSON `{"image": "data:image/jpeg;base64,..."}`). Encode dilakukan sekali
+di awal supaya CPU load generator tidak ikut terukur.
+
+N klien disimulasikan dengan N thread (masing-masing 1 koneksi keep-alive).
+Tiap klien mengirim frame dengan jadwal tetap (`--fps` total dibagi rata),
+tetapi seperti browser, menunggu response sebelum mengirim frame berikutnya;
+jika server lambat, FPS tercapai akan di bawah target.
+
+Hanya untuk localhost (dev server Flask atau gunicorn/WSGI lokal).
+
+Cara pakai (dari folder backend/):
+    python benchmarks/loadgen.py rekaman.mp4 --clients 4 --fps 8 --duration 60
+    python benchmarks/loadgen.py folder_frame/ --clients 16 --fps 32 --url http://127.0.0.1:8000
+    python benchmarks/loadgen.py rekaman.mp4 --encoding multipart --output load.json
+
+Laporan: FPS tercapai, latency p50/p90/p95/p99, rasio error & 429, CPU
+server (proses yang listen di port target + child-nya, via /proc; atau
+`--server-pid`), dan p95 per tahap dari /api/metrics jika tersedia.
+"""
+
+from __future__ import annotations
+
+import argparse
+import base64
+import http.client
+import json
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
+import numpy as np
+
+try:
+    import cv2
+except Exception:  # pragma: no cover
+    cv2 = None  # type: ignore
+
+IMAGE_EXTS = {".jpg", ".jpeg", ".png", ".bmp"}
+LOCAL_HOSTS = {"127.0.0.1", "localhost", "::1"}
+
+# Sama dengan dashboard.js
+TARGET_WIDTH = 640
+JPEG_QUALITY = 70
+
+
+# ---------------------------------------------------------------------
+# Frame
+# ---------------------------------------------------------------------
+
+
+def _encode(frame: np.ndarray, width: int, quality: int) -> bytes:
+    h, w = frame.shape[:2]
+    if w != width:
+        frame = cv2.resize(frame, (width, int(round(h * width / float(w)))), interpolation=cv2.INTER_AREA)
+    ok, buf = cv2.imencode(".jpg", frame, [int(cv2.IMWRITE_JPEG_QUALITY), int(quality)])
+    if not ok:
+        raise ValueError("Gagal encode JPEG")
+    return buf.tobytes()
+
+
+def load_frames(source: str, max_frames: int, every: int, width: int, quality: int) -> List[bytes]:
+    """Baca & encode frame sekali di awal (JPEG bytes)."""
+    out: List[bytes] = []
+    if os.path.isdir(source):
+        paths = sorted(p for p in Path(source).iterdir() if p.suffix.lower() in IMAGE_EXTS)
+        for p in paths[:: max(1, every)]:
+            img = cv2.imread(str(p), cv2.IMREAD_COLOR)
+            if img is not None:
+                out.append(_encode(img, width, quality))
+            if len(out) >= max_frames:
+                break
+        return out
+
+    cap = cv2.VideoCapture(int(source) if source.isdigit() else source)
+    if not cap.isOpened():
+        raise SystemExit(f"Gagal membuka video: {source}")
+    index = 0
+    try:
+        while len(out) < max_frames and cap.grab():
+            if index % max(1, every) == 0:
+                ok, frame = cap.retrieve()
+                if ok and frame is not None:
+                    out.append(_encode(frame, width, quality))
+            index += 1
+    finally:
+        cap.release()
+    return out
+
+
+def _json_body(jpeg: bytes) -> Tuple[bytes, str]:
+    data_url = "data:image/jpeg;base64," + base64.b64encode(jpeg).decode("ascii")
+    return json.dumps({"image": data_url}).encode("utf-8"), "application/json"
+
+
+def _multipart_body(jpeg: bytes) -> Tuple[bytes, str]:
+    boundary = "loadgen" + os.urandom(8).hex()
+    head = (
+        f"--{boundary}\r\n"
+        'Content-Disposition: form-data; name="frame"; filename="frame.jpg"\r\n'
+        "Content-Type: image/jpeg\r\n\r\n"
+    ).encode("ascii")
+    tail = f"\r\n--{boundary}--\r\n".encode("ascii")
+    return head + jpeg + tail, f"multipart/form-data; boundary={boundary}"
+
+
+# ---------------------------------------------------------------------
+# CPU server (Linux /proc)
+# ---------------------------------------------------------------------
+
+
+def _listener_pids(port: int) -> List[int]:
+    """PID proses yang listen di port TCP (baca /proc/net/tcp{,6} + /proc/*/fd)."""
+    inodes = set()
+    for table in ("/proc/net/tcp", "/proc/net/tcp6"):
+        try:
+            with open(table) as f:
+                next(f)
+                for line in f:
+                    parts = line.split()
+                    local, state, inode = parts[1], parts[3], parts[9]
+                    if state == "0A" and int(local.rsplit(":", 1)[1], 16) == port:
+                        inodes.add(f"socket:[{inode}]")
+        except OSError:
+            continue
+    if not inodes:
+        return []
+
+    pids = []
+    for pid in filter(str.isdigit, os.listdir("/proc")):
+        fd_dir = f"/proc/{pid}/fd"
+        try:
+            for fd in os.listdir(fd_dir):
+                if os.readlink(os.path.join(fd_dir, fd)) in inodes:
+                    pids.append(int(pid))
+                    break
+        except OSError:
+            continue
+    return pids
+
+
+def _with_children(pids: List[int]) -> List[int]:
+    """Tambahkan child (mis. worker gunicorn) dari daftar pid."""
+    parent_of: Dict[int, int] = {}
+    for pid in filter(str.isdigit, os.listdir("/proc")):
+        try:
+            with open(f"/proc/{pid}/stat") as f:
+                stat = f.read()
+            parent_of[int(pid)] = int(stat.rsplit(")", 1)[1].split()[1])
+        except (OSError, ValueError, IndexError):
+            continue
+    found = set(pids)
+    changed = True
+    while changed:
+        changed = False
+        for pid, ppid in parent_of.items():
+            if ppid in found and pid not in found:
+                found.add(pid)
+                changed = True
+    return sorted(found)
+
+
+def _cpu_seconds(pids: List[int]) -> float:
+    """Total utime+stime (detik) dari daftar pid."""
+    tick = os.sysconf("SC_CLK_TCK")
+    total = 0
+    for pid in pids:
+        try:
+            with open(f"/proc/{pid}/stat") as f:
+                fields = f.read().rsplit(")", 1)[1].split()
+            total += int(fields[11]) + int(fields[12])
+        except (OSError, ValueError, IndexError):
+            continue
+    return total / float(tick)
+
+
+# ---------------------------------------------------------------------
+# Klien
+# ---------------------------------------------------------------------
+
+
+class _Client(threading.Thread):
+    def __init__(self, idx: int, args, bodies: List[Tuple[bytes, str]], start_at: float, stop_at: float, warmup_until: float):
+        super().__init__(daemon=True)
+        self.idx = idx
+        self.url = urlparse(args.url)
+        self.path = self.url.path.rstrip("/") + "/api/recognition/frame"
+        self.interval = args.clients / float(args.fps)
+        self.bodies = bodies
+        self.timeout = args.timeout
+        # Klien mulai bergiliran supaya request tidak serentak
+        self.start_at = start_at + self.interval * idx / float(args.clients)
+        self.stop_at = stop_at
+        self.warmup_until = warmup_until
+
+        self.latencies_ms: List[float] = []
+        self.status: Counter = Counter()
+        self.server_timing: List[str] = []
+        self.late = 0
+
+    def _connect(self) -> http.client.HTTPConnection:
+        return http.client.HTTPConnection(self.url.hostname, self.url.port or 80, timeout=self.timeout)
+
+    def run(self) -> None:
+        conn = self._connect()
+        frame_i = self.idx * 7  # tiap klien mulai dari frame berbeda
+        next_at = self.start_at
+        while True:
+            now = time.perf_counter()
+            if now >= self.stop_at:
+                break
+            if next_at > now:
+                time.sleep(next_at - now)
+
+            body, ctype = self.bodies[frame_i % len(self.bodies)]
+            frame_i += 1
+            t0 = time.perf_counter()
+            try:
+                conn.request("POST", self.path, body=body, headers={"Content-Type": ctype})
+                resp = conn.getresponse()
+                resp.read()
+                status = str(resp.status)
+                timing = resp.getheader("Server-Timing")
+            except Exception as e:
+                status = type(e).__name__
+                timing = None
+                conn.close()
+                conn = self._connect()
+            t1 = time.perf_counter()
+
+            if t0 >= self.warmup_until:
+                self.latencies_ms.append((t1 - t0) * 1000.0)
+                self.status[status] += 1
+                if timing and len(self.server_timing) < 200:
+                    self.server_timing.append(timing)
+
+            next_at += self.interval
+            if t1 > next_at:
+                # Response melewati jadwal frame berikutnya: kirim segera, jangan mengejar
+                self.late += 1
+                next_at = t1
+        conn.close()
+
+
+# ---------------------------------------------------------------------
+# Laporan
+# ---------------------------------------------------------------------
+
+
+def _percentiles(values: List[float]) -> Dict[str, Optional[float]]:
+    if not values:
+        return {k: None for k in ("p50_ms", "p90_ms", "p95_ms", "p99_ms", "max_ms")}
+    a = np.asarray(values, dtype=np.float64)
+    return {
+        "p50_ms": round(float(np.percentile(a, 50)), 1),
+        "p90_ms": round(float(np.percentile(a, 90)), 1),
+        "p95_ms": round(float(np.percentile(a, 95)), 1),
+        "p99_ms": round(float(np.percentile(a, 99)), 1),
+        "max_ms": round(float(a.max()), 1),
+    }
+
+
+def _server_timing_p50(headers: List[str]) -> Dict[str, float]:
+    """p50 per tahap dari header Server-Timing (mis. "detect;dur=12.3, ...")."""
+    stages: Dict[str, List[float]] = {}
+    for h in headers:
+        for name, dur in re.findall(r"([\w-]+);dur=([\d.]+)", h):
+            stages.setdefault(name, []).append(float(dur))
+    return {k: round(float(np.median(v)), 1) for k, v in stages.items()}
+
+
+def _scrape_stage_p95(url) -> Optional[Dict[str, float]]:
+    """p95 per tahap dari /api/metrics (None jika endpoint tidak ada)."""
+    try:
+        conn = http.client.HTTPConnection(url.hostname, url.port or 80, timeout=5)
+        conn.request("GET", url.path.rstrip("/") + "/api/metrics")
+        resp = conn.getresponse()
+        text = resp.read().decode("utf-8", "replace")
+        conn.close()
+    except Exception:
+        return None
+    if resp.status != 200:
+        return None
+    out = {}
+    for stage, value in re.findall(r'hfg_stage_seconds\{stage="(\w+)",quantile="0.95"\} (\S+)', text):
+        if value != "NaN":
+            out[stage] = round(float(value) * 1000.0, 1)
+    return out
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("source", help="file video atau folder gambar")
+    parser.add_argument("--url", default="http://127.0.0.1:5000", help="base URL server (localhost)")
+    parser.add_argument("--clients", type=int, default=1, help="jumlah klien simultan")
+    parser.add_argument("--fps", type=float, default=1.0, help="target total frame/detik (semua klien)")
+    parser.add_argument("--duration", type=float, default=30.0, help="durasi pengukuran (detik)")
+    parser.add_argument("--warmup", type=float, default=3.0, help="detik awal yang tidak dihitung")
+    parser.add_argument("--encoding", choices=("json", "multipart"), default="json",
+                        help="json = dataURL seperti dashboard.js; multipart = file 'frame'")
+    parser.add_argument("--width", type=int, default=TARGET_WIDTH)
+    parser.add_argument("--quality", type=int, default=JPEG_QUALITY)
+    parser.add_argument("--max-frames", type=int, default=300, help="frame yang dimuat dari sumber")
+    parser.add_argument("--every", type=int, default=1, help="ambil tiap N frame sumber")
+    parser.add_argument("--timeout", type=float, default=30.0, help="timeout per request (detik)")
+    parser.add_argument("--server-pid", type=int, action="append", help="PID server untuk CPU (default: auto dari port)")
+    parser.add_argument("--output", help="tulis laporan JSON ke file ini")
+    args = parser.parse_args(argv)
+
+    if cv2 is None:
+        print("OpenCV (cv2) belum tersedia. Install opencv-contrib-python.")
+        return 1
+    url = urlparse(args.url)
+    if url.scheme != "http" or url.hostname not in LOCAL_HOSTS:
+        print("Load generator hanya untuk server lokal (http://127.0.0.1:PORT / http://localhost:PORT).")
+        return 1
+    if args.clients < 1 or args.fps <= 0:
+        print("--clients minimal 1 dan --fps harus > 0.")
+        return 1
+
+    frames = load_frames(args.source, args.max_frames, args.every, args.width, args.quality)
+    if not frames:
+        print("Tidak ada frame yang bisa dibaca dari sumber.")
+        return 1
+    make_body = _json_body if args.encoding == "json" else _multipart_body
+    bodies = [make_body(f) for f in frames]
+    print(
+        f"{len(frames)} frame dimuat (rata-rata {np.mean([len(b) for b, _ in bodies]) / 1024.0:.1f} KB/request), "
+        f"{args.clients} klien, target {args.fps:g} fps, {args.duration:g}s + warmup {args.warmup:g}s"
+    )
+
+    pids: List[int] = []
+    if args.server_pid:
+        pids = _with_children(args.server_pid) if os.path.isdir("/proc") else []
+    elif os.path.isdir("/proc"):
+        pids = _with_children(_listener_pids(url.port or 80))
+    if not pids:
+        print("  (CPU server tidak diukur: PID tidak ditemukan, gunakan --server-pid)")
+
+    start_at = time.perf_counter() + 0.2
+    warmup_until = start_at + args.warmup
+    stop_at = warmup_until + args.duration
+    clients = [_Client(i, args, bodies, start_at, stop_at, warmup_until) for i in range(args.clients)]
+    for c in clients:
+        c.start()
+
+    # CPU diukur hanya selama jendela pengukuran (setelah warmup)
+    time.sleep(max(0.0, warmup_until - time.perf_counter()))
+    cpu0, wall0 = (_cpu_seconds(pids), time.perf_counter()) if pids else (0.0, 0.0)
+    for c in clients:
+        c.join()
+    cpu1, wall1 = (_cpu_seconds(pids), time.perf_counter()) if pids else (0.0, 0.0)
+
+    latencies = [x for c in clients for x in c.latencies_ms]
+    status: Counter = Counter()
+    for c in clients:
+        status.update(c.status)
+    total = sum(status.values())
+    ok = status.get("200", 0)
+    too_many = status.get("429", 0)
+
+    report = {
+        "target_fps": args.fps,
+        "clients": args.clients,
+        "encoding": args.encoding,
+        "duration_seconds": args.duration,
+        "requests": total,
+        "achieved_fps": round(total / args.duration, 2),
+        "ok_fps": round(ok / args.duration, 2),
+        "late_frames": sum(c.late for c in clients),
+        "status": dict(status),
+        "error_rate": round((total - ok) / total, 4) if total else None,
+        "rate_429": round(too_many / total, 4) if total else None,
+        "latency": _percentiles(latencies),
+        "server_timing_p50_ms": _server_timing_p50([h for c in clients for h in c.server_timing]),
+        "server_cpu": None,
+        "server_stage_p95_ms": _scrape_stage_p95(url),
+    }
+    if pids and wall1 > wall0:
+        busy = (cpu1 - cpu0) / (wall1 - wall0)
+        report["server_cpu"] = {
+            "pids": pids,
+            "cpu_percent": round(busy * 100.0, 1),  # 100% = 1 core penuh
+            "cores": os.cpu_count(),
+            "cpu_ms_per_request": round((cpu1 - cpu0) * 1000.0 / total, 1) if total else None,
+        }
+
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
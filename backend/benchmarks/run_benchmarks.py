@@ -0,0 +1,455 @@
+"""Benchmark suite: deteksi, prediksi, training, enrollment, dan endpoint /frame.
+
+Semua data dibuat sintetis & deterministik (seed) di folder sementara
+(DATASET_DIR + RESIDENTS_DB_PATH dialihkan), jadi dataset/DB asli tidak
+tersentuh dan hasil bisa dibandingkan antar commit.
+
+Yang diukur:
+- detect:  `detect_faces_gray` per ukuran frame x scale_factor x max_side
+           (`--tiled`: ditambah mode deteksi ber-tile, mis. `--frame-sizes 3840x2160`)
+- predict: `predict_face` per ukuran galeri (penghuni x sampel)
+- train:   `train_lbph_model` per ukuran galeri x MAX_TRAIN_IMAGES_PER_PERSON
+- enroll:  `save_processed_faces` (dengan deteksi) & `save_face_crops` (tanpa)
+- frame:   POST /api/recognition/frame end-to-end via Flask test client
+
+Wajah sintetis (tekstur per identitas + noise per sampel) cukup untuk LBPH,
+tetapi umumnya tidak terdeteksi Haar. Untuk mengukur jalur "wajah terdeteksi"
+pada detect/enroll/frame, berikan foto wajah asli dengan `--face-image`.
+
+Cara pakai (dari folder backend/):
+    python benchmarks/run_benchmarks.py --output bench.json
+    python benchmarks/run_benchmarks.py --quick --only detect,predict
+    python benchmarks/run_benchmarks.py --face-image wajah.jpg --output after.json --compare before.json
+
+Output JSON: {"meta": {...}, "results": [{"bench", "params", "stats"}...]}.
+`--compare` mencetak perubahan p50 per kasus terhadap file hasil sebelumnya.
+"""
+
+from __future__ import annotations
+
+import argparse
+import io
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+# Folder kerja sementara harus di-set sebelum modul app di-import
+_WORKDIR = Path(tempfile.mkdtemp(prefix="facebench_"))
+os.environ["DATASET_DIR"] = str(_WORKDIR / "dataset")
+os.environ["RESIDENTS_DB_PATH"] = str(_WORKDIR / "bench.db")
+os.environ.setdefault("ENROLL_FILTER", "0")
+os.environ.setdefault("SNAPSHOT_DEDUP", "0")
+
+import cv2  # noqa: E402
+
+from app import face_engine  # noqa: E402
+from app.database import add_resident, init_db  # noqa: E402
+
+BENCHES = ("detect", "predict", "train", "enroll", "frame")
+
+
+# ---------------------------------------------------------------------
+# Data sintetis
+# ---------------------------------------------------------------------
+
+
+def _identity_base(rng: np.random.Generator) -> np.ndarray:
+    """Tekstur dasar 1 identitas (noise halus, kontras seperti crop wajah)."""
+    base = rng.normal(128, 40, (50, 50)).astype(np.float32)
+    base = cv2.resize(base, (200, 200), interpolation=cv2.INTER_CUBIC)
+    return cv2.GaussianBlur(base, (0, 0), 3)
+
+
+def _sample(base: np.ndarray, rng: np.random.Generator) -> np.ndarray:
+    """Variasi 1 sampel: geser kecil + noise + perubahan terang."""
+    dx, dy = rng.integers(-4, 5, 2)
+    m = np.float32([[1, 0, dx], [0, 1, dy]])
+    img = cv2.warpAffine(base, m, (200, 200), borderMode=cv2.BORDER_REFLECT)
+    img = img * rng.uniform(0.85, 1.15) + rng.normal(0, 6, img.shape)
+    return np.clip(img, 0, 255).astype(np.uint8)
+
+
+def _make_frame(
+    rng: np.random.Generator,
+    size: tuple,
+    face: Optional[np.ndarray],
+) -> np.ndarray:
+    """Frame BGR: background noise halus, dengan 1 wajah ditempel di tengah (jika ada)."""
+    w, h = size
+    bg = cv2.GaussianBlur(rng.integers(0, 255, (h, w, 3), dtype=np.uint8), (0, 0), 5)
+    if face is not None:
+        side = max(80, min(w, h) // 3)
+        f = cv2.resize(face, (side, side))
+        if f.ndim == 2:
+            f = cv2.cvtColor(f, cv2.COLOR_GRAY2BGR)
+        y0, x0 = (h - side) // 2, (w - side) // 2
+        bg[y0 : y0 + side, x0 : x0 + side] = f
+    return bg
+
+
+def build_gallery(residents: int, per_person: int, seed: int, storage: str) -> Dict[str, object]:
+    """Isi DATASET_DIR dengan galeri sintetis. Return info + sampel uji per identitas."""
+    if face_engine.FACES_DIR.exists():
+        shutil.rmtree(face_engine.FACES_DIR)
+    shutil.rmtree(face_engine.MODELS_DIR, ignore_errors=True)
+    init_db()
+    _reset_db()
+
+    os.environ["FACE_STORAGE"] = storage
+    rng = np.random.default_rng(seed)
+    probes: List[np.ndarray] = []
+    for i in range(residents):
+        name = f"Bench {i:05d}"
+        add_resident(name, "Penghuni", per_person)
+        base = _identity_base(rng)
+        face_engine.save_face_crops(name, (_sample(base, rng) for _ in range(per_person)))
+        probes.append(_sample(base, rng))
+    return {"residents": residents, "per_person": per_person, "probes": probes}
+
+
+def _reset_db() -> None:
+    from app.database import get_db_connection
+
+    conn = get_db_connection()
+    for table in ("residents", "face_samples", "face_datasets", "events"):
+        conn.execute(f"DELETE FROM {table}")
+    conn.commit()
+    conn.close()
+
+
+# ---------------------------------------------------------------------
+# Pengukuran
+# ---------------------------------------------------------------------
+
+
+def _stats(samples_ms: List[float]) -> Dict[str, float]:
+    a = np.asarray(samples_ms, dtype=np.float64)
+    return {
+        "n": int(a.size),
+        "mean_ms": round(float(a.mean()), 3),
+        "p50_ms": round(float(np.percentile(a, 50)), 3),
+        "p95_ms": round(float(np.percentile(a, 95)), 3),
+        "min_ms": round(float(a.min()), 3),
+    }
+
+
+def _time_calls(fn: Callable[[int], object], repeat: int, warmup: int = 2) -> List[float]:
+    for i in range(warmup):
+        fn(i)
+    out = []
+    for i in range(repeat):
+        t = time.perf_counter()
+        fn(i)
+        out.append((time.perf_counter() - t) * 1000.0)
+    return out
+
+
+def bench_detect(args, face_img, results) -> None:
+    rng = np.random.default_rng(args.seed)
+    modes = (False, True) if args.tiled else (False,)
+    try:
+        for size in args.frame_sizes:
+            frames = [_make_frame(rng, size, face_img) for _ in range(4)]
+            for tiled in modes:
+                os.environ["DETECT_TILED"] = "1" if tiled else "0"
+                for sf in args.scale_factors:
+                    for max_side in args.max_sides:
+                        found = []
+
+                        def run(i):
+                            found.append(len(face_engine.detect_faces_gray(frames[i % 4], scale_factor=sf, max_side=max_side)))
+
+                        ms = _time_calls(run, args.repeat)
+                        params = {"frame": f"{size[0]}x{size[1]}", "scale_factor": sf, "max_side": max_side}
+                        if tiled:
+                            params["tiled"] = True
+                        results.append({
+                            "bench": "detect",
+                            "params": params,
+                            "stats": {**_stats(ms), "faces_per_frame": round(float(np.mean(found)), 2)},
+                        })
+    finally:
+        os.environ.pop("DETECT_TILED", None)
+
+
+def bench_predict(args, face_img, results) -> None:
+    threshold = face_engine.get_env_float("LBPH_THRESHOLD", 60.0)
+    for residents in args.galleries:
+        gallery = build_gallery(residents, args.per_person, args.seed, args.storage)
+        face_engine.train_lbph_model(max_images_per_person=args.per_person)
+        model = face_engine.load_lbph_model(threshold=threshold)
+        probes = gallery["probes"]
+        hits = []
+
+        def run(i):
+            rid, _conf, unknown = face_engine.predict_face(probes[i % len(probes)], model)
+            hits.append(not unknown)
+
+        ms = _time_calls(run, args.repeat)
+        results.append({
+            "bench": "predict",
+            "params": {"residents": residents, "per_person": args.per_person, "storage": args.storage},
+            "stats": {**_stats(ms), "known_rate": round(float(np.mean(hits)), 3)},
+        })
+
+
+def bench_train(args, face_img, results) -> None:
+    for residents in args.galleries:
+        build_gallery(residents, args.per_person, args.seed, args.storage)
+        for max_n in args.max_train:
+            runs = []
+            summary = {}
+            for _ in range(max(1, args.train_repeat)):
+                t = time.perf_counter()
+                summary = face_engine.train_lbph_model(max_images_per_person=max_n)
+                runs.append((time.perf_counter() - t) * 1000.0)
+            results.append({
+                "bench": "train",
+                "params": {
+                    "residents": residents,
+                    "per_person": args.per_person,
+                    "max_images_per_person": max_n,
+                    "storage": args.storage,
+                },
+                "stats": {
+                    **_stats(runs),
+                    "num_samples": summary.get("num_samples"),
+                    "workers": summary.get("train_workers"),
+                    "peak_memory_mb": summary.get("peak_memory_mb"),
+                },
+            })
+
+
+def bench_enroll(args, face_img, results) -> None:
+    build_gallery(0, 0, args.seed, args.storage)
+    rng = np.random.default_rng(args.seed)
+    base = _identity_base(rng)
+    n = args.enroll_images
+
+    # Upload foto (deteksi Haar di server)
+    frames = [
+        cv2.imencode(".jpg", _make_frame(rng, args.frame_sizes[0], face_img if face_img is not None else _sample(base, rng)))[1].tobytes()
+        for _ in range(n)
+    ]
+    t = time.perf_counter()
+    res = face_engine.save_processed_faces("Bench Enroll Detect", frames)
+    total = (time.perf_counter() - t) * 1000.0
+    results.append({
+        "bench": "enroll",
+        "params": {"mode": "detect", "images": n, "frame": "%dx%d" % args.frame_sizes[0], "storage": args.storage},
+        "stats": {"total_ms": round(total, 3), "per_image_ms": round(total / n, 3), "saved": res["saved"]},
+    })
+
+    # Crop dari klien (tanpa deteksi)
+    crops = [_sample(base, rng) for _ in range(n)]
+    t = time.perf_counter()
+    res = face_engine.save_face_crops("Bench Enroll Cropped", crops)
+    total = (time.perf_counter() - t) * 1000.0
+    results.append({
+        "bench": "enroll",
+        "params": {"mode": "cropped", "images": n, "storage": args.storage},
+        "stats": {"total_ms": round(total, 3), "per_image_ms": round(total / n, 3), "saved": res["saved"]},
+    })
+
+
+def bench_frame(args, face_img, results) -> None:
+    from app.main import create_app
+
+    residents = args.galleries[0]
+    gallery = build_gallery(residents, args.per_person, args.seed, args.storage)
+    face_engine.train_lbph_model(max_images_per_person=args.per_person)
+
+    app = create_app()
+    client = app.test_client()
+    rng = np.random.default_rng(args.seed)
+    face = face_img if face_img is not None else gallery["probes"][0]
+
+    for size in args.frame_sizes:
+        payloads = [cv2.imencode(".jpg", _make_frame(rng, size, face))[1].tobytes() for _ in range(4)]
+        detected = []
+        errors = []
+
+        def run(i):
+            r = client.post(
+                "/api/recognition/frame",
+                data={"frame": (io.BytesIO(payloads[i % 4]), "frame.jpg")},
+                content_type="multipart/form-data",
+            )
+            errors.append(r.status_code != 200)
+            detected.append(bool((r.get_json() or {}).get("detected")))
+
+        ms = _time_calls(run, args.repeat)
+        results.append({
+            "bench": "frame",
+            "params": {"frame": f"{size[0]}x{size[1]}", "residents": residents, "storage": args.storage},
+            "stats": {
+                **_stats(ms),
+                "detected_rate": round(float(np.mean(detected)), 3),
+                "error_rate": round(float(np.mean(errors)), 3),
+            },
+        })
+
+
+# ---------------------------------------------------------------------
+# Meta & perbandingan
+# ---------------------------------------------------------------------
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=str(BACKEND_DIR), capture_output=True, text=True, timeout=5,
+        )
+        return out.stdout.strip() or None
+    except Exception:
+        return None
+
+
+def _meta(args) -> Dict[str, object]:
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "git_commit": _git_commit(),
+        "python": platform.python_version(),
+        "opencv": cv2.__version__,
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "seed": args.seed,
+        "repeat": args.repeat,
+    }
+
+
+def _case_key(r: Dict[str, object]) -> str:
+    return r["bench"] + " " + json.dumps(r["params"], sort_keys=True)
+
+
+def compare(old_path: Path, results: List[Dict[str, object]]) -> None:
+    with open(old_path, "r", encoding="utf-8") as f:
+        old = {_case_key(r): r for r in json.load(f).get("results", [])}
+
+    print(f"\nPerbandingan dengan {old_path}:")
+    for r in results:
+        prev = old.get(_case_key(r))
+        if prev is None:
+            continue
+        metric = "p50_ms" if "p50_ms" in r["stats"] else "total_ms"
+        a, b = prev["stats"].get(metric), r["stats"].get(metric)
+        if not a or b is None:
+            continue
+        delta = (b - a) / a * 100.0
+        flag = "  <-- lebih lambat" if delta > 10 else ""
+        print(f"  {_case_key(r)}: {metric} {a:.3f} -> {b:.3f} ({delta:+.1f}%){flag}")
+
+
+def _sizes(text: str) -> List[tuple]:
+    out = []
+    for part in text.split(","):
+        w, h = part.lower().split("x")
+        out.append((int(w), int(h)))
+    return out
+
+
+def _ints(text: str) -> List[int]:
+    return [int(x) for x in text.split(",") if x.strip()]
+
+
+def _floats(text: str) -> List[float]:
+    return [float(x) for x in text.split(",") if x.strip()]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--only", default=",".join(BENCHES), help="subset benchmark, mis. detect,predict")
+    parser.add_argument("--quick", action="store_true", help="ukuran kecil (smoke run)")
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--repeat", type=int, default=30, help="jumlah pengukuran per kasus (detect/predict/frame)")
+    parser.add_argument("--frame-sizes", default="640x480,1280x720,1920x1080")
+    parser.add_argument("--scale-factors", default="1.1,1.2,1.3")
+    parser.add_argument("--max-sides", default="480,640,960")
+    parser.add_argument("--tiled", action="store_true", help="detect: ukur juga mode tile (DETECT_TILED=1)")
+    parser.add_argument("--galleries", default="10,50,200", help="jumlah penghuni per galeri")
+    parser.add_argument("--per-person", type=int, default=40, help="sampel per penghuni")
+    parser.add_argument("--max-train", default="20,40", help="nilai MAX_TRAIN_IMAGES_PER_PERSON")
+    parser.add_argument("--train-repeat", type=int, default=1)
+    parser.add_argument("--enroll-images", type=int, default=50)
+    parser.add_argument("--storage", choices=("files", "packed"), default="files")
+    parser.add_argument("--face-image", help="foto wajah asli untuk ditempel di frame (jalur terdeteksi)")
+    parser.add_argument("--output", help="tulis hasil JSON ke file ini")
+    parser.add_argument("--compare", help="file JSON hasil sebelumnya untuk dibandingkan")
+    parser.add_argument("--keep", action="store_true", help="jangan hapus folder kerja sementara")
+    args = parser.parse_args()
+
+    if args.quick:
+        args.repeat = min(args.repeat, 5)
+        args.frame_sizes, args.scale_factors, args.max_sides = "640x480", "1.3", "640"
+        args.galleries, args.per_person, args.max_train, args.enroll_images = "5", 10, "10", 10
+
+    args.frame_sizes = _sizes(args.frame_sizes)
+    args.scale_factors = _floats(args.scale_factors)
+    args.max_sides = _ints(args.max_sides)
+    args.galleries = _ints(args.galleries)
+    args.max_train = _ints(args.max_train)
+
+    face_img = None
+    if args.face_image:
+        face_img = cv2.imread(args.face_image, cv2.IMREAD_COLOR)
+        if face_img is None:
+            raise SystemExit(f"Gagal membaca --face-image {args.face_image}")
+
+    selected = [b.strip() for b in args.only.split(",") if b.strip()]
+    runners = {
+        "detect": bench_detect,
+        "predict": bench_predict,
+        "train": bench_train,
+        "enroll": bench_enroll,
+        "frame": bench_frame,
+    }
+
+    results: List[Dict[str, object]] = []
+    try:
+        for name in selected:
+            if name not in runners:
+                raise SystemExit(f"Benchmark tidak dikenal: {name} (pilihan: {', '.join(BENCHES)})")
+            started = len(results)
+            t = time.perf_counter()
+            try:
+                runners[name](args, face_img, results)
+            except Exception as e:
+                results.append({"bench": name, "params": {}, "stats": {}, "error": str(e)})
+            print(f"[{name}] {len(results) - started} kasus, {time.perf_counter() - t:.1f}s")
+            for r in results[started:]:
+                print(f"  {json.dumps(r['params'], sort_keys=True)} -> {json.dumps(r.get('error') or r['stats'])}")
+    finally:
+        try:
+            from app import snapshot_store
+
+            snapshot_store.flush()
+        except Exception:
+            pass
+        if not args.keep:
+            shutil.rmtree(_WORKDIR, ignore_errors=True)
+
+    report = {"meta": _meta(args), "results": results}
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nHasil ditulis ke {args.output}")
+    if args.compare:
+        compare(Path(args.compare), results)
+
+
+if __name__ == "__main__":
+    main()
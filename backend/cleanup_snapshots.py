@@ -1,39 +1,30 @@
 from __future__ import annotations
 
 import os
-import time
-from pathlib import Path
 
 # Retensi snapshot (dalam hari). Default: 2 hari.
 # Bisa diubah tanpa edit kode lewat environment variable:
 #   SNAPSHOT_RETENTION_DAYS=1  -> hapus snapshot lebih dari 1 hari
 RETENTION_DAYS = int(os.getenv("SNAPSHOT_RETENTION_DAYS", "2"))
 
-BASE_DIR = Path(__file__).resolve().parent
-SNAPSHOTS_DIR = BASE_DIR / "dataset" / "snapshots"
+# Jumlah event yang referensi snapshot-nya dikosongkan per transaksi
+CLEAR_BATCH_SIZE = int(os.getenv("SNAPSHOT_CLEANUP_BATCH", "500"))
+
 
 def cleanup_snapshots(days: int) -> int:
-    """Hapus file snapshot .jpg yang lebih tua dari N hari.
+    """Hapus snapshot yang lebih tua dari N hari.
+
+    Snapshot disimpan per shard hari (`dataset/snapshots/<YYYYmmdd>/`), jadi
+    cleanup cukup menghapus folder hari yang sudah kedaluwarsa dan mengosongkan
+    `events.snapshot_path` yang menunjuk ke sana (lihat `app.snapshot_store`).
+    Snapshot flat lama tetap dibersihkan berdasarkan mtime.
 
-    Menggunakan mtime (modified time) file sebagai acuan.
     Return: jumlah file yang berhasil dihapus.
     """
-    if not SNAPSHOTS_DIR.exists():
-        return 0
-
-    cutoff = time.time() - (days * 86400)
-    deleted = 0
-
-    for p in SNAPSHOTS_DIR.glob("*.jpg"):
-        try:
-            if p.stat().st_mtime < cutoff:
-                p.unlink()
-                deleted += 1
-        except Exception:
-            # Jika file sedang dipakai/permission error, skip saja.
-            continue
-
-    return deleted
+    from app.snapshot_store import purge_expired_snapshots
+
+    result = purge_expired_snapshots(days, batch_size=CLEAR_BATCH_SIZE)
+    return int(result["files_deleted"])
 
 if __name__ == "__main__":
     n = cleanup_snapshots(RETENTION_DAYS)
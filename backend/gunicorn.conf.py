@@ -0,0 +1,96 @@
+"""Konfigurasi gunicorn untuk serving production (multi-proses, pre-fork).
+
+Cara pakai (dari folder backend/, Linux/macOS):
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+`run.py` / `run_with_cleanup.py` memakai dev server Flask di 1 proses, jadi
+semua recognition berebut 1 GIL. Di sini:
+- `preload_app`: app + model LBPH dimuat sekali di master sebelum fork, sehingga
+  histogram model (memori native OpenCV) dipakai bersama copy-on-write oleh
+  semua worker
+- `gc.freeze()` sebelum fork: objek Python hasil preload tidak disentuh GC di
+  worker, jadi halaman memorinya tetap shared
+- update model (retrain / hapus penghuni) sampai ke semua worker lewat
+  `model_signature()` (mtime model + labels) yang dicek tiap request; worker
+  yang reload memegang salinan sendiri, jadi restart berkala (mis. setelah
+  retrain besar) mengembalikan sharing penuh
+- recognition worker (kamera) tetap 1 instance: dijaga file lock di
+  `dataset/run/` (lihat `app.recognition_worker`)
+- cleanup snapshot terjadwal (seperti `run_with_cleanup.py`) hanya berjalan di
+  1 worker, juga lewat file lock (SNAPSHOT_CLEANUP=0 untuk mematikan)
+
+Environment:
+- HOST (default 0.0.0.0), PORT (default 5000)
+- WEB_WORKERS (default jumlah core), WEB_THREADS (default 4; thread per worker
+  untuk SSE `/events/stream` dan I/O)
+- WEB_TIMEOUT (default 120 detik; training via /api/train bisa lama)
+"""
+
+import gc
+import multiprocessing
+import os
+
+
+# Sama dengan face_engine.get_env_int, sengaja tidak di-import: file ini dibaca
+# gunicorn sebelum app (juga oleh `--check-config`), dan import face_engine di sini
+# ikut memuat cv2 & membuat folder dataset. Hook di bawah meng-import app secara lazy.
+def _env_int(name, default):
+    try:
+        return int(os.getenv(name, str(default)))
+    except ValueError:
+        return default
+
+
+bind = f"{os.getenv('HOST', '0.0.0.0')}:{_env_int('PORT', 5000)}"
+workers = _env_int("WEB_WORKERS", 0) or multiprocessing.cpu_count()
+worker_class = "gthread"
+threads = _env_int("WEB_THREADS", 4)
+timeout = _env_int("WEB_TIMEOUT", 120)
+graceful_timeout = 30
+preload_app = True
+accesslog = "-"
+
+
+def when_ready(server):
+    """Master: app sudah di-import (preload); muat model lalu bekukan GC sebelum fork."""
+    from app.routes.recognition import warm_model_cache
+
+    if warm_model_cache():
+        server.log.info("Model LBPH dimuat sebelum fork (shared copy-on-write)")
+    gc.collect()
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    try:
+        import cv2
+
+        # Paralelisme dari proses + thread gunicorn; cegah oversubscription core
+        cv2.setNumThreads(1)
+    except Exception:
+        pass
+
+
+# Lock cleanup dipegang worker pemilik sampai prosesnya berhenti
+_cleanup_lock = None
+
+
+def post_worker_init(worker):
+    """Jalankan loop cleanup snapshot di tepat 1 worker (pemegang lock)."""
+    global _cleanup_lock
+
+    if os.getenv("SNAPSHOT_CLEANUP", "1") == "0":
+        return
+
+    import threading
+
+    from app import face_engine
+    from app.process_lock import ProcessLock
+    from run_with_cleanup import _cleanup_loop
+
+    lock = ProcessLock(face_engine.DATASET_DIR / "run" / "snapshot_cleanup.lock")
+    if not lock.acquire(blocking=False):
+        return
+    _cleanup_lock = lock
+    threading.Thread(target=_cleanup_loop, daemon=True).start()
+    worker.log.info("Cleanup snapshot berjalan di worker ini (pid %s)", os.getpid())
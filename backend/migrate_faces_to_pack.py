@@ -0,0 +1,111 @@
+"""Migrasi dataset wajah dari folder JPEG ke format packed (`faces.u8` + `pack.json`).
+
+Cara pakai (dari folder backend/):
+    python migrate_faces_to_pack.py              # semua penghuni
+    python migrate_faces_to_pack.py --only Budi_Santoso
+    python migrate_faces_to_pack.py --delete     # hapus JPEG setelah berhasil di-pack
+
+Tanpa --delete, JPEG asli dipindah ke `dataset/faces_backup/<safe_name>/`
+(supaya tidak ikut terbaca dua kali saat training).
+
+Setelah migrasi, set FACE_STORAGE=packed agar upload baru juga ditulis ke pack.
+"""
+
+from __future__ import annotations
+
+import argparse
+import re
+import shutil
+
+import numpy as np
+
+from app import face_engine, face_pack, sample_index
+from app.database import init_db
+
+try:
+    import cv2
+except Exception:  # pragma: no cover
+    cv2 = None  # type: ignore
+
+BACKUP_DIR = face_engine.DATASET_DIR / "faces_backup"
+
+
+def _natural_key(name: str):
+    # Budi_2.jpeg sebelum Budi_10.jpeg (urutan upload)
+    return [int(t) if t.isdigit() else t.lower() for t in re.split(r"(\d+)", name)]
+
+
+def migrate_person(person_dir, delete: bool = False, batch_size: int = 256) -> int:
+    """Pack semua JPEG di 1 folder penghuni. Return jumlah wajah yang dipindah."""
+    paths = sorted(face_engine.list_face_files(person_dir), key=lambda p: _natural_key(p.name))
+    if not paths:
+        return 0
+
+    samples = {r["file"]: r for r in sample_index.get_rows(person_dir) if r.get("pack_index") is None}
+
+    moved = 0
+    for start in range(0, len(paths), batch_size):
+        chunk = paths[start : start + batch_size]
+        faces = []
+        entries = []
+        done = []
+        for p in chunk:
+            img = cv2.imread(str(p), cv2.IMREAD_GRAYSCALE)
+            if img is None:
+                print(f"  skip (gagal dibaca): {p.name}")
+                continue
+            if img.shape != face_pack.FACE_SHAPE:
+                img = cv2.resize(img, (face_pack.FACE_SHAPE[1], face_pack.FACE_SHAPE[0]))
+            faces.append(np.asarray(img, dtype=np.uint8))
+            row = samples.get(p.name) or sample_index.score_face(img)
+            entry = {k: row.get(k) for k in ("sharpness", "quality", "hash")}
+            entries.append(dict(entry, source=p.name))
+            done.append(p)
+
+        face_pack.append_faces(person_dir, faces, entries)
+
+        # Baru pindahkan/hapus JPEG setelah pack + manifest tersimpan
+        for p in done:
+            if delete:
+                p.unlink()
+            else:
+                backup = BACKUP_DIR / person_dir.name
+                backup.mkdir(parents=True, exist_ok=True)
+                shutil.move(str(p), str(backup / p.name))
+        moved += len(done)
+
+    # Manifest dataset (SQLite) mengikuti isi folder yang baru
+    sample_index.reindex(person_dir)
+
+    return moved
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Migrasi dataset wajah ke format packed.")
+    parser.add_argument("--only", action="append", default=[], help="safe_name folder (boleh berulang)")
+    parser.add_argument("--delete", action="store_true", help="hapus JPEG setelah di-pack (default: pindah ke backup)")
+    args = parser.parse_args()
+
+    if cv2 is None:
+        print("OpenCV (cv2) belum tersedia. Install opencv-contrib-python.")
+        return 1
+
+    init_db()
+    face_engine.ensure_dirs()
+    person_dirs = sorted(p for p in face_engine.FACES_DIR.iterdir() if p.is_dir())
+    if args.only:
+        person_dirs = [p for p in person_dirs if p.name in set(args.only)]
+
+    total = 0
+    for person_dir in person_dirs:
+        n = migrate_person(person_dir, delete=args.delete)
+        if n:
+            print(f"{person_dir.name}: {n} wajah -> {face_pack.PACK_DATA_FILENAME} (total {face_pack.pack_count(person_dir)})")
+        total += n
+
+    print(f"Selesai. {total} wajah dimigrasi dari {len(person_dirs)} folder.")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
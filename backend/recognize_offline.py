@@ -0,0 +1,305 @@
+"""Recognition offline untuk file video, rekaman RTSP, atau folder gambar.
+
+Menjalankan pipeline yang sama dengan `/api/recognition/frame`
+(`detect_faces_gray` + `predict_face`, lihat `app.recognition_pipeline`)
+tanpa server Flask. Berguna untuk memproses ulang rekaman insiden atau
+menilai ulang riwayat setelah retrain.
+
+Cara pakai (dari folder backend/):
+    python recognize_offline.py rekaman.mp4 --output hasil.csv
+    python recognize_offline.py rekaman.mp4 --every 5 --start-time "2026-10-01 08:00:00" --to-db
+    python recognize_offline.py dataset/incident_frames/ --output hasil.ndjson --all-frames
+    python recognize_offline.py rtsp://kamera/stream --max-frames 3000 --output live.ndjson
+
+Frame dibaca di proses utama lalu dikirim ke pool proses (`--workers`,
+default jumlah core). Jumlah frame yang sedang diproses dibatasi supaya
+video panjang tidak dimuat seluruhnya ke memori. Event di-debounce seperti
+di server (nama berubah atau lewat `--min-interval` detik waktu rekaman).
+
+Output: CSV / NDJSON (dari ekstensi `--output`) dan/atau tabel events (`--to-db`).
+Ringkasan throughput (frame/s) dicetak di akhir.
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import json
+import multiprocessing
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Iterator, Optional, Tuple
+
+try:
+    import cv2
+except Exception:  # pragma: no cover
+    cv2 = None  # type: ignore
+
+from app import face_engine, recognition_pipeline
+from app.database import add_events, init_db
+
+IMAGE_EXTS = {".jpg", ".jpeg", ".png", ".bmp"}
+DB_BATCH = 200
+
+# State per proses worker (diisi oleh _init_worker)
+_MODEL = None
+_NAMES: Dict[int, str] = {}
+
+
+def _init_worker(threshold: float, id_to_name: Dict[int, str]) -> None:
+    global _MODEL, _NAMES
+    try:
+        cv2.setNumThreads(1)  # paralel di level proses, bukan di dalam OpenCV
+    except Exception:
+        pass
+    _MODEL = face_engine.load_lbph_model(threshold=threshold)
+    _NAMES = dict(id_to_name)
+
+
+def _process(item: Tuple[int, float, object]) -> Tuple[int, float, Dict[str, object]]:
+    """Recognize 1 frame (array BGR) atau 1 file gambar (path)."""
+    index, media_ts, payload = item
+    if isinstance(payload, str):
+        frame = cv2.imread(payload, cv2.IMREAD_COLOR)
+        if frame is None:
+            return index, media_ts, {"detected": False, "faces": [], "error": "Gagal decode gambar"}
+    else:
+        frame = payload
+    try:
+        result = recognition_pipeline.recognize_frame(frame, _MODEL, _NAMES)
+    except Exception as e:
+        # 1 frame rusak tidak menghentikan pemrosesan rekaman panjang
+        return index, media_ts, {"detected": False, "faces": [], "error": str(e)}
+    return index, media_ts, result.to_dict()
+
+
+def _iter_images(folder: Path) -> Iterator[Tuple[int, float, object]]:
+    paths = sorted(p for p in folder.iterdir() if p.is_file() and p.suffix.lower() in IMAGE_EXTS)
+    for i, p in enumerate(paths):
+        yield i, p.stat().st_mtime, str(p)
+
+
+def _iter_video(source: str, every: int, max_frames: Optional[int], start_ts: float, live: bool):
+    cap = cv2.VideoCapture(int(source) if source.isdigit() else source)
+    if not cap.isOpened():
+        raise SystemExit(f"Gagal membuka video/stream: {source}")
+    index = 0
+    sent = 0
+    try:
+        while True:
+            ok = cap.grab()
+            if not ok:
+                break
+            if index % every == 0:
+                ok, frame = cap.retrieve()
+                if ok and frame is not None:
+                    if live:
+                        media_ts = time.time()
+                    else:
+                        media_ts = start_ts + (cap.get(cv2.CAP_PROP_POS_MSEC) or 0.0) / 1000.0
+                    yield index, media_ts, frame
+                    sent += 1
+                    if max_frames and sent >= max_frames:
+                        break
+            index += 1
+    finally:
+        cap.release()
+
+
+def _run(items, workers: int, threshold: float, id_to_name: Dict[int, str]):
+    """Hasil berurutan; paling banyak workers*4 frame dalam antrean."""
+    if workers <= 1:
+        _init_worker(threshold, id_to_name)
+        for item in items:
+            yield _process(item)
+        return
+
+    ctx = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=ctx,
+        initializer=_init_worker,
+        initargs=(threshold, id_to_name),
+    ) as pool:
+        pending = deque()
+        for item in items:
+            pending.append(pool.submit(_process, item))
+            if len(pending) >= workers * 4:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def _parse_start_time(value: Optional[str], source: str) -> float:
+    if value:
+        return datetime.fromisoformat(value).timestamp()
+    if os.path.exists(source):
+        return os.path.getmtime(source)
+    return time.time()
+
+
+def _db_timestamp(ts: float) -> str:
+    # Sama dengan CURRENT_TIMESTAMP SQLite (UTC)
+    return datetime.fromtimestamp(ts, tz=timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+
+
+class _Writer:
+    """Tulis baris hasil ke CSV atau NDJSON."""
+
+    FIELDS = ["frame", "media_time", "timestamp", "name", "status", "confidence", "faces"]
+
+    def __init__(self, path: Optional[str]):
+        self.path = path
+        self._f = None
+        self._csv = None
+        if not path:
+            return
+        self._f = open(path, "w", encoding="utf-8", newline="")
+        if path.lower().endswith(".csv"):
+            self._csv = csv.DictWriter(self._f, fieldnames=self.FIELDS)
+            self._csv.writeheader()
+
+    def write(self, row: Dict[str, object]) -> None:
+        if self._f is None:
+            return
+        if self._csv is not None:
+            self._csv.writerow({**{k: row.get(k) for k in self.FIELDS}, "faces": len(row.get("faces") or [])})
+        else:
+            self._f.write(json.dumps(row, ensure_ascii=False) + "\n")
+
+    def close(self) -> None:
+        if self._f is not None:
+            self._f.close()
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Recognition offline (video / RTSP / folder gambar).")
+    parser.add_argument("source", help="file video, URL RTSP, index kamera, atau folder gambar")
+    parser.add_argument("--output", help="file hasil (.csv atau .ndjson)")
+    parser.add_argument("--to-db", action="store_true", help="tulis event ke tabel events")
+    parser.add_argument("--all-frames", action="store_true", help="tulis semua frame, bukan hanya event")
+    parser.add_argument("--every", type=int, default=1, help="proses tiap N frame video (default 1)")
+    parser.add_argument("--max-frames", type=int, default=0, help="batas frame yang diproses (0 = semua)")
+    parser.add_argument("--start-time", help='waktu awal rekaman, mis. "2026-10-01 08:00:00" (default mtime file)')
+    parser.add_argument("--workers", type=int, default=0, help="jumlah proses (default jumlah core)")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=face_engine.get_env_float("LBPH_THRESHOLD", 60.0),
+    )
+    parser.add_argument(
+        "--min-interval",
+        type=float,
+        default=face_engine.get_env_float("MIN_LOG_INTERVAL_SECONDS", 3.0),
+        help="debounce event (detik waktu rekaman)",
+    )
+    args = parser.parse_args(argv)
+
+    if cv2 is None:
+        print("OpenCV (cv2) belum tersedia. Install opencv-contrib-python.")
+        return 1
+    if not args.output and not args.to_db:
+        print("Tentukan --output dan/atau --to-db.")
+        return 1
+
+    init_db()
+    id_to_name = face_engine.resident_display_names()
+    # Pastikan model ada sebelum worker dibuat
+    try:
+        face_engine.load_lbph_model(threshold=args.threshold)
+    except Exception as e:
+        print(f"Model belum siap: {e}")
+        return 1
+
+    source = args.source
+    max_frames = args.max_frames or None
+    if os.path.isdir(source):
+        items = _iter_images(Path(source))
+        if max_frames:
+            items = (it for it in items if it[0] < max_frames)
+    else:
+        # Stream live (RTSP/kamera): timestamp = jam saat frame dibaca
+        live = ("://" in source and not source.lower().startswith("file://")) or source.isdigit()
+        items = _iter_video(source, max(1, args.every), max_frames, _parse_start_time(args.start_time, source), live)
+
+    workers = args.workers if args.workers > 0 else (os.cpu_count() or 1)
+    writer = _Writer(args.output)
+    db_rows = []
+    last_name = None
+    last_ts = float("-inf")
+    frames = faces = events = errors = 0
+    started = time.time()
+
+    try:
+        for index, media_ts, result in _run(items, workers, args.threshold, id_to_name):
+            frames += 1
+            faces += len(result.get("faces") or [])
+            if result.get("error"):
+                errors += 1
+                if errors == 1:
+                    print(f"  frame {index} gagal: {result['error']}")
+
+            is_event = False
+            if result.get("detected"):
+                name = result.get("name")
+                if name != last_name or (media_ts - last_ts) >= args.min_interval:
+                    is_event = True
+                    last_name, last_ts = name, media_ts
+
+            if is_event or args.all_frames:
+                row = {
+                    "frame": index,
+                    "media_time": round(media_ts, 3),
+                    "timestamp": _db_timestamp(media_ts),
+                    "event": is_event,
+                    **result,
+                }
+                writer.write(row)
+
+            if is_event:
+                events += 1
+                if args.to_db:
+                    db_rows.append(
+                        {
+                            "timestamp": _db_timestamp(media_ts),
+                            "name": result["name"],
+                            "status": result["status"],
+                            "confidence": float(result["confidence"]),
+                            "snapshot_path": None,
+                        }
+                    )
+                    if len(db_rows) >= DB_BATCH:
+                        add_events(db_rows)
+                        db_rows = []
+
+            if frames % 500 == 0:
+                elapsed = time.time() - started
+                print(f"  {frames} frame, {events} event, {frames / max(elapsed, 1e-9):.1f} frame/s")
+    except KeyboardInterrupt:
+        print("Dihentikan.")
+    finally:
+        if db_rows:
+            add_events(db_rows)
+        writer.close()
+
+    elapsed = time.time() - started
+    summary = {
+        "frames": frames,
+        "faces": faces,
+        "events": events,
+        "errors": errors,
+        "workers": workers,
+        "elapsed_seconds": round(elapsed, 3),
+        "frames_per_second": round(frames / elapsed, 2) if elapsed > 0 else None,
+    }
+    print(json.dumps(summary))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -34,6 +34,9 @@ def _cleanup_loop():
     retention_days = int(os.getenv("SNAPSHOT_RETENTION_DAYS", "2"))
     schedule_hour = int(os.getenv("CLEANUP_HOUR", "3"))
     schedule_minute = int(os.getenv("CLEANUP_MINUTE", "0"))
+    # Cleanup per shard hari itu murah, jadi default jalan tiap jam.
+    # CLEANUP_INTERVAL_MINUTES=0 -> kembali ke jadwal harian (CLEANUP_HOUR:CLEANUP_MINUTE)
+    interval_minutes = int(os.getenv("CLEANUP_INTERVAL_MINUTES", "60"))
 
     # Cleanup sekali saat start (aman, cepat)
     if cleanup_snapshots is not None:
@@ -42,10 +45,13 @@ def _cleanup_loop():
         except Exception:
             pass
 
-    # Loop harian
+    # Loop periodik / harian
     while True:
         try:
-            time.sleep(max(5.0, _seconds_until(schedule_hour, schedule_minute)))
+            if interval_minutes > 0:
+                time.sleep(max(5.0, interval_minutes * 60.0))
+            else:
+                time.sleep(max(5.0, _seconds_until(schedule_hour, schedule_minute)))
             if cleanup_snapshots is not None:
                 cleanup_snapshots(retention_days)
         except Exception:
@@ -0,0 +1,36 @@
+"""Fixture bersama: dataset & database dialihkan ke folder sementara.
+
+DATASET_DIR / RESIDENTS_DB_PATH dibaca saat modul `app` di-import, jadi harus
+di-set sebelum import apa pun dari `app`.
+"""
+
+import atexit
+import os
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+_WORKDIR = Path(tempfile.mkdtemp(prefix="hfg-test-"))
+atexit.register(shutil.rmtree, _WORKDIR, ignore_errors=True)
+os.environ["DATASET_DIR"] = str(_WORKDIR / "dataset")
+os.environ["RESIDENTS_DB_PATH"] = str(_WORKDIR / "test.db")
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app import database, face_engine  # noqa: E402
+from app.main import create_app  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def app():
+    database.init_db()
+    face_engine.ensure_dirs()
+    return create_app()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
@@ -0,0 +1,47 @@
+import io
+import time
+
+import cv2
+import numpy as np
+
+from app import detection_slo, face_engine, recognition_pipeline
+
+
+def _reset(monkeypatch):
+    monkeypatch.setenv("DETECT_SLO_MS", "10")
+    monkeypatch.setenv("DETECT_SLO_EVAL_FRAMES", "8")
+    for controller in (detection_slo.FRAME, detection_slo.WORKER):
+        monkeypatch.setattr(controller, "level", 0)
+        controller._recent.clear()
+        controller._since_eval = 0
+
+
+def test_sources_have_separate_windows(monkeypatch):
+    _reset(monkeypatch)
+    for _ in range(8):
+        detection_slo.WORKER.observe(0.05)
+        detection_slo.FRAME.observe(0.001)
+
+    assert detection_slo.WORKER.level == 1
+    assert detection_slo.FRAME.level == 0
+
+
+def test_frame_slo_ignores_stages_outside_detection(client, monkeypatch):
+    _reset(monkeypatch)
+    real_decode = recognition_pipeline.decode_frame
+
+    def slow_decode(b, timer=None):
+        time.sleep(0.03)  # decode / IO lambat: bukan urusan parameter deteksi
+        return real_decode(b, timer)
+
+    monkeypatch.setattr(recognition_pipeline, "decode_frame", slow_decode)
+    monkeypatch.setattr(face_engine, "detect_faces_gray", lambda img, **k: [])
+    jpg = cv2.imencode(".jpg", np.zeros((32, 32, 3), np.uint8))[1].tobytes()
+
+    for _ in range(8):
+        resp = client.post(
+            "/api/recognition/frame", data={"frame": (io.BytesIO(jpg), "f.jpg")}, content_type="multipart/form-data"
+        )
+        assert resp.status_code == 200
+
+    assert detection_slo.FRAME.level == 0
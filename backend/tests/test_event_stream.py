@@ -0,0 +1,94 @@
+import threading
+import time
+
+from app import database
+from app.event_stream import EventBroadcaster
+
+
+def _ev(i):
+    return {"id": i, "name": "Unknown", "status": "DITOLAK"}
+
+
+def test_buffer_serves_contiguous_ids():
+    b = EventBroadcaster()
+    for i in (1, 2, 3):
+        b.publish(_ev(i))
+    assert [e["id"] for e in b.wait_since(1, timeout=0)] == [2, 3]
+    assert b.wait_since(3, timeout=0) == []
+
+
+def test_buffer_gap_falls_back_to_db():
+    b = EventBroadcaster()
+    b.publish(_ev(1))
+    b.publish(_ev(3))  # id 2 ditulis proses lain
+    assert b.wait_since(1, timeout=0) is None
+    assert b.wait_since(0, timeout=0) is None
+
+
+def test_out_of_order_publish_is_still_contiguous():
+    b = EventBroadcaster()
+    for i in (1, 3, 2):
+        b.publish(_ev(i))
+    assert [e["id"] for e in b.wait_since(0, timeout=0)] == [1, 2, 3]
+
+
+def _insert_from_other_process(name):
+    # Tanpa publish_event: sama seperti insert dari proses lain
+    conn = database.get_db_connection()
+    cur = conn.execute("INSERT INTO events (name, status) VALUES (?, 'MASUK')", (name,))
+    conn.commit()
+    conn.close()
+    return cur.lastrowid
+
+
+def _read_ids(response, n, timeout=3.0):
+    deadline = time.time() + timeout
+    ids = []
+    for chunk in response.response:
+        if time.time() > deadline:
+            break
+        text = chunk.decode() if isinstance(chunk, bytes) else chunk
+        ids.extend(int(line[4:]) for line in text.splitlines() if line.startswith("id: "))
+        if len(ids) >= n:
+            return ids
+    return ids
+
+
+def test_stream_does_not_skip_events_written_by_other_processes(client, monkeypatch):
+    monkeypatch.setenv("SSE_HEARTBEAT_SECONDS", "0.2")
+    start = database.get_latest_event_id()
+    response = client.get(f"/api/events/stream?last_id={start}", buffered=False)
+
+    first = database.add_event("Lokal 1", "MASUK", 10.0)
+    assert _read_ids(response, 1) == [first]
+
+    other = _insert_from_other_process("Lain")
+    local = database.add_event("Lokal 2", "MASUK", 10.0)
+    assert _read_ids(response, 2) == [other, local]
+    response.close()
+
+
+def test_stream_waits_when_buffered_events_were_deleted_from_db(client, monkeypatch):
+    monkeypatch.setenv("SSE_HEARTBEAT_SECONDS", "5")
+    start = database.get_latest_event_id()
+    database.add_event("Lokal 1", "MASUK", 10.0)
+    _insert_from_other_process("Lain")  # gap di buffer
+    database.add_event("Lokal 2", "MASUK", 10.0)
+    conn = database.get_db_connection()
+    conn.execute("DELETE FROM events WHERE id > ?", (start,))  # mis. dihapus retensi
+    conn.commit()
+    conn.close()
+
+    threading.Timer(0.3, database.add_event, args=("Lokal 3", "MASUK", 10.0)).start()
+    response = client.get(f"/api/events/stream?last_id={start}", buffered=False)
+    ids, pings = [], 0
+    for chunk in response.response:
+        text = chunk.decode() if isinstance(chunk, bytes) else chunk
+        pings += text.count(": ping")
+        ids.extend(int(line[4:]) for line in text.splitlines() if line.startswith("id: "))
+        if ids or pings > 10:
+            break
+    response.close()
+
+    assert pings == 0  # tidak berputar di gap yang sama
+    assert ids == [database.get_latest_event_id()]
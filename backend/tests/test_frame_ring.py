@@ -0,0 +1,67 @@
+import numpy as np
+import pytest
+
+from app import frame_ring
+from app.frame_ring import FrameRing
+
+
+@pytest.fixture
+def ring():
+    r = FrameRing.create(slots=3, slot_bytes=64 * 48 * 3)
+    yield r
+    r.close()
+
+
+def test_round_trip_latest_frame(ring):
+    assert ring.latest() is None
+    frames = [np.full((48, 64, 3), i, np.uint8) for i in range(5)]  # melewati jumlah slot
+    for f in frames:
+        seq = ring.write(f)
+
+    reader = FrameRing.attach(ring.name)
+    try:
+        got_seq, got = reader.latest()
+        assert got_seq == seq == 5
+        assert np.array_equal(got, frames[-1])
+        assert reader.latest(after=got_seq) is None
+    finally:
+        reader.close()
+
+
+def test_grayscale_round_trip(ring):
+    frame = np.arange(48 * 64, dtype=np.uint8).reshape(48, 64)
+    ring.write(frame)
+    assert np.array_equal(ring.latest()[1], frame)
+
+
+def test_oversized_frame_is_resized_to_fit(ring, capsys):
+    ring.write(np.zeros((480, 640, 3), np.uint8))
+    ring.write(np.zeros((480, 640, 3), np.uint8))
+    assert capsys.readouterr().out.count("diperkecil") == 1  # dicatat sekali
+    _seq, got = ring.latest()
+    assert got.nbytes <= ring.slot_bytes
+    h, w = got.shape[:2]
+    assert abs(w / h - 640 / 480) < 0.05
+
+
+def test_slot_being_written_is_not_returned(ring):
+    seq = ring.write(np.ones((48, 64, 3), np.uint8))
+    offset = ring._slot_offset(seq % ring.slots, ring.slot_bytes)
+    # Penulis sudah menandai slot (seq=0) tapi belum selesai menyalin data
+    frame_ring._SLOT.pack_into(ring._shm.buf, offset, 0, 48, 64, 3)
+    assert ring.latest() is None
+
+
+def test_slot_overwritten_during_copy_is_not_returned(ring, monkeypatch):
+    ring.write(np.ones((48, 64, 3), np.uint8))
+    real_frombuffer = np.frombuffer
+
+    def frombuffer_then_overwrite(*args, **kwargs):
+        out = real_frombuffer(*args, **kwargs)
+        # Penulis memutari ring dan menimpa slot ini saat pembaca sedang menyalin
+        for _ in range(ring.slots):
+            ring.write(np.full((48, 64, 3), 9, np.uint8))
+        return out
+
+    monkeypatch.setattr(frame_ring.np, "frombuffer", frombuffer_then_overwrite)
+    assert ring.latest() is None
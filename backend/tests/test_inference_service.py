@@ -0,0 +1,83 @@
+import socket
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+
+from app import inference_service
+
+
+def _silent_service():
+    """Service yang menerima request tapi tidak pernah menjawab; return (path, header yang diterima)."""
+    path = str(Path(tempfile.mkdtemp()) / "infer.sock")
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(path)
+    server.listen(1)
+    headers = []
+
+    def serve():
+        conn, _ = server.accept()
+        headers.append(inference_service._HEADER.unpack(inference_service._recv_exact(conn, 8)))
+        time.sleep(2.0)
+        conn.close()
+        server.close()
+
+    threading.Thread(target=serve, daemon=True).start()
+    return path, headers
+
+
+def test_remote_wait_leaves_room_for_inline_fallback(monkeypatch):
+    monkeypatch.setenv("INFERENCE_TIMEOUT_MS", "400")
+    monkeypatch.setattr(inference_service, "_inline_per_face", 0.0)
+    inference_service.record_inline(0.2, 2)  # 100 ms per crop
+
+    path, headers = _silent_service()
+    faces = [np.zeros((200, 200), np.uint8)] * 2
+    started = time.perf_counter()
+    assert inference_service.predict_remote(faces, 65.0, path=path) is None
+    waited = time.perf_counter() - started
+    inference_service._drop_connection()
+
+    assert headers == [(2, 200)]
+    assert 0.15 < waited < 0.35
+
+
+def test_trickled_reply_is_bounded_by_total_budget(monkeypatch):
+    monkeypatch.setenv("INFERENCE_TIMEOUT_MS", "200")
+    monkeypatch.setattr(inference_service, "_inline_per_face", 0.0)
+    path = str(Path(tempfile.mkdtemp()) / "infer.sock")
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(path)
+    server.listen(1)
+
+    def serve():
+        conn, _ = server.accept()
+        inference_service._recv_exact(conn, 8 + inference_service.CROP_BYTES)
+        reply = inference_service._COUNT.pack(1) + inference_service._RESULT.pack(1, 10.0)
+        try:
+            for i in range(len(reply)):  # tiap byte di bawah timeout per-recv, totalnya jauh di atas budget
+                conn.sendall(reply[i : i + 1])
+                time.sleep(0.05)
+        except OSError:
+            pass
+        conn.close()
+        server.close()
+
+    threading.Thread(target=serve, daemon=True).start()
+    started = time.perf_counter()
+    assert inference_service.predict_remote([np.zeros((200, 200), np.uint8)], 65.0, path=path) is None
+    waited = time.perf_counter() - started
+    inference_service._drop_connection()
+
+    assert waited < 0.35
+
+
+def test_remote_budget_keeps_minimum_share(monkeypatch):
+    monkeypatch.setenv("INFERENCE_TIMEOUT_MS", "200")
+    monkeypatch.setattr(inference_service, "_inline_per_face", 1.0)
+    assert inference_service.remote_budget_ms(4) == 200 * inference_service.REMOTE_MIN_SHARE
+
+    monkeypatch.setattr(inference_service, "_inline_per_face", 0.0)
+    assert inference_service.remote_budget_ms(4) == 200
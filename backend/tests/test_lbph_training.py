@@ -0,0 +1,38 @@
+import cv2
+import numpy as np
+
+from app import lbph_training
+
+
+def _person(root, name, n, seed):
+    d = root / name
+    d.mkdir(parents=True, exist_ok=True)
+    rng = np.random.default_rng(seed)
+    for i in range(n):
+        cv2.imwrite(str(d / f"{i}.jpg"), rng.integers(0, 255, (200, 200), dtype=np.uint8))
+    return str(d)
+
+
+def test_peak_memory_is_sampled_during_the_run(tmp_path):
+    jobs = [(_person(tmp_path, "a", 3, 0), 1), (_person(tmp_path, "b", 3, 1), 2)]
+    result = lbph_training.train_to_file(jobs, None, tmp_path / "m.yml", workers=2)
+
+    assert result["num_samples"] == 6
+    peak = result["peak_memory_mb"]
+    assert peak["process_rss"] > 0
+    assert peak["workers_rss"] > 0
+    assert peak["total_rss"] >= max(peak["process_rss"], peak["workers_rss"])
+
+
+def test_default_workers_are_capped_by_available_memory(monkeypatch):
+    monkeypatch.delenv("TRAIN_WORKERS", raising=False)
+    monkeypatch.setenv("TRAIN_WORKER_MEMORY_MB", "256")
+    monkeypatch.setattr(lbph_training.os, "cpu_count", lambda: 16)
+    monkeypatch.setattr(lbph_training, "_available_memory_mb", lambda: 600.0)
+    assert lbph_training.train_workers() == 2
+
+    monkeypatch.setattr(lbph_training, "_available_memory_mb", lambda: 100.0)
+    assert lbph_training.train_workers() == 1
+
+    monkeypatch.setenv("TRAIN_WORKERS", "8")
+    assert lbph_training.train_workers() == 8
@@ -0,0 +1,67 @@
+import cv2
+import numpy as np
+
+from app import database, face_engine
+
+
+def _write_model():
+    rng = np.random.default_rng(0)
+    faces = [rng.integers(0, 255, (200, 200), dtype=np.uint8) for _ in range(6)]
+    labels = np.array([1, 1, 2, 2, 3, 3], dtype=np.int32)
+    recognizer = cv2.face.LBPHFaceRecognizer_create()
+    recognizer.train(faces, labels)
+    face_engine.MODELS_DIR.mkdir(parents=True, exist_ok=True)
+    recognizer.write(str(face_engine.MODEL_PATH))
+    face_engine._save_labels(
+        {"format": face_engine.LABELS_FORMAT, "labels": {1: "a", 2: "b", 3: "c"}, "removed": []}
+    )
+    return faces
+
+
+def test_compact_drops_masked_rows_and_restores_native_predict():
+    faces = _write_model()
+    assert face_engine.remove_resident_from_model(2)
+    assert face_engine.load_lbph_model(threshold=1000.0).removed == {2}
+
+    assert face_engine.compact_model()
+
+    model = face_engine.load_lbph_model(threshold=1000.0)
+    assert not model.removed
+    assert face_engine.masked_label_count() == 0
+    assert sorted(model.id_to_label) == [1, 3]
+    assert sorted(np.asarray(model.recognizer.getLabels()).ravel().tolist()) == [1, 1, 3, 3]
+    # Wajah penghuni yang dihapus tidak lagi cocok ke dirinya sendiri
+    assert face_engine.predict_face(faces[2], model)[0] in (1, 3)
+    assert face_engine.predict_face(faces[4], model)[:2] == (3, 0.0)
+
+    # Tidak ada yang di-mask: tidak ada yang perlu ditulis ulang
+    assert not face_engine.compact_model()
+
+
+def test_compact_keeps_mask_when_every_resident_is_removed():
+    _write_model()
+    for resident_id in (1, 2, 3):
+        face_engine.remove_resident_from_model(resident_id)
+
+    assert not face_engine.compact_model()
+    assert face_engine.masked_label_count() == 3
+
+
+def test_rename_migrates_legacy_labels_instead_of_going_unknown(client):
+    rng = np.random.default_rng(3)
+    faces = [rng.integers(0, 255, (200, 200), dtype=np.uint8) for _ in range(2)]
+    resident_id = database.add_resident("Legacy Person", "Penghuni", 1)
+    recognizer = cv2.face.LBPHFaceRecognizer_create()
+    recognizer.train(faces, np.array([0, 1], dtype=np.int32))
+    face_engine.MODELS_DIR.mkdir(parents=True, exist_ok=True)
+    recognizer.write(str(face_engine.MODEL_PATH))
+    # Format lama: {safe_name: label}; label 1 milik folder yang tidak terdaftar
+    face_engine._save_labels({"Legacy_Person": 0, "Orphan": 1})
+
+    resp = client.put(f"/api/residents/{resident_id}", json={"name": "Renamed Person", "face_count": 1})
+    assert resp.status_code == 200
+
+    model = face_engine.load_lbph_model(threshold=1000.0)
+    assert face_engine.predict_face(faces[0], model)[:2] == (resident_id, 0.0)
+    assert face_engine._load_labels()["format"] == face_engine.LABELS_FORMAT
+    assert sorted(np.asarray(model.recognizer.getLabels()).ravel().tolist()) == [resident_id]
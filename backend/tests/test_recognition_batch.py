@@ -0,0 +1,103 @@
+import io
+import struct
+import time
+
+import cv2
+import numpy as np
+
+from app import database, face_engine, recognition_pipeline, snapshot_store
+from app.routes import recognition
+
+
+def _setup(monkeypatch):
+    rng = np.random.default_rng(1)
+    recognizer = cv2.face.LBPHFaceRecognizer_create()
+    recognizer.train([rng.integers(0, 255, (200, 200), dtype=np.uint8)], np.array([7], dtype=np.int32))
+    face_engine.MODELS_DIR.mkdir(parents=True, exist_ok=True)
+    recognizer.write(str(face_engine.MODEL_PATH))
+    face_engine._save_labels({"format": face_engine.LABELS_FORMAT, "labels": {7: "x"}, "removed": []})
+
+    # Semua frame berisi 1 wajah yang tidak dikenal
+    face = np.zeros((200, 200), np.uint8)
+    monkeypatch.setattr(face_engine, "detect_faces_gray", lambda img, **k: [(face, (0, 0, 50, 50))])
+    monkeypatch.setenv("LBPH_THRESHOLD", "0.001")
+    monkeypatch.setenv("MIN_LOG_INTERVAL_SECONDS", "3")
+    monkeypatch.setenv("SNAPSHOT_DEDUP", "0")
+    monkeypatch.setattr(recognition, "_last_label", None)
+    monkeypatch.setattr(recognition, "_last_log_ts", 0.0)
+    return cv2.imencode(".jpg", np.zeros((64, 64, 3), np.uint8))[1].tobytes()
+
+
+def _event_timestamps(ids):
+    return [database.get_event_by_id(i)["timestamp"] for i in ids]
+
+
+def test_batch_debounces_and_stamps_by_frame_time(client, monkeypatch):
+    jpg = _setup(monkeypatch)
+    before = database.get_latest_event_id()
+    times = ["1700000000", "1700000001.5", "2023-11-14T22:13:30Z"]  # +0 s, +1.5 s, +10 s
+
+    resp = client.post(
+        "/api/recognition/batch",
+        data={"frames": [(io.BytesIO(jpg), f"{i}.jpg") for i in range(3)], "timestamps": times},
+        content_type="multipart/form-data",
+    )
+
+    body = resp.get_json()
+    assert resp.status_code == 200, body
+    assert [r["logged"] for r in body["results"]] == [True, False, True]
+    ids = list(range(before + 1, database.get_latest_event_id() + 1))
+    assert _event_timestamps(ids) == ["2023-11-14 22:13:20", "2023-11-14 22:13:30"]
+
+
+def test_batch_binary_timestamps_header(client, monkeypatch):
+    jpg = _setup(monkeypatch)
+    payload = b"".join(struct.pack(">I", len(jpg)) + jpg for _ in range(2))
+    before = database.get_latest_event_id()
+
+    resp = client.post(
+        "/api/recognition/batch",
+        data=payload,
+        content_type="application/octet-stream",
+        headers={"X-Frame-Timestamps": "1700000000,1700000005"},
+    )
+
+    assert resp.status_code == 200
+    assert [r["logged"] for r in resp.get_json()["results"]] == [True, True]
+    ids = list(range(before + 1, database.get_latest_event_id() + 1))
+    assert _event_timestamps(ids) == ["2023-11-14 22:13:20", "2023-11-14 22:13:25"]
+
+
+def test_batch_rejects_mismatched_timestamps(client, monkeypatch):
+    jpg = _setup(monkeypatch)
+    resp = client.post(
+        "/api/recognition/batch",
+        data={"frames": [(io.BytesIO(jpg), "a.jpg"), (io.BytesIO(jpg), "b.jpg")], "timestamps": ["1700000000"]},
+        content_type="multipart/form-data",
+    )
+    assert resp.status_code == 400
+
+
+def test_batch_snapshots_use_frame_day_and_shared_pool(client, monkeypatch):
+    jpg = _setup(monkeypatch)
+    monkeypatch.setenv("BATCH_WORKERS", "2")
+    payload = b"".join(struct.pack(">I", len(jpg)) + jpg for _ in range(2))
+    before = database.get_latest_event_id()
+
+    pools = []
+    for stamps in ("1700000000,1700000005", "1700000010,1700000015"):
+        resp = client.post(
+            "/api/recognition/batch",
+            data=payload,
+            content_type="application/octet-stream",
+            headers={"X-Frame-Timestamps": stamps},
+        )
+        assert resp.status_code == 200
+        pools.append(recognition_pipeline._EXECUTOR)
+    snapshot_store.flush()
+
+    assert pools[0] is not None and pools[0] is pools[1]  # tidak dibuat per request
+    day = time.strftime("%Y%m%d", time.localtime(1700000000))
+    ids = range(before + 1, database.get_latest_event_id() + 1)
+    refs = [database.get_event_by_id(i)["snapshot_path"] for i in ids]
+    assert len(refs) == 4 and all(ref.startswith(day + "/") for ref in refs)
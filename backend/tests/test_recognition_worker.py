@@ -0,0 +1,111 @@
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+from app import database, metrics, recognition_worker
+from app.event_stream import broadcaster
+
+_HOLD_LOCK = """
+import sys, time
+from app.process_lock import ProcessLock
+lock = ProcessLock(sys.argv[1])
+lock.acquire()
+print("held", flush=True)
+time.sleep(float(sys.argv[2]))
+"""
+
+
+def _hold_worker_lock(seconds):
+    """Proses lain 'memiliki' worker dan tidak menanggapi permintaan stop."""
+    proc = subprocess.Popen(
+        [sys.executable, "-c", _HOLD_LOCK, str(recognition_worker.RUN_DIR / "recognition_worker.lock"), str(seconds)],
+        cwd=str(Path(__file__).resolve().parent.parent),
+        stdout=subprocess.PIPE,
+        text=True,
+    )
+    assert proc.stdout.readline().strip() == "held"
+    return proc
+
+
+def test_cross_process_stop_reports_stopping_when_owner_keeps_running(client, monkeypatch):
+    monkeypatch.setattr(recognition_worker, "STOP_TIMEOUT_SECONDS", 0.3)
+    proc = _hold_worker_lock(30)
+    try:
+        worker = recognition_worker.RecognitionWorker()
+        assert worker.stop() == recognition_worker.STOPPING
+
+        r = client.post("/api/recognition/stop")
+        assert r.status_code == 202
+        assert r.json["running"] is True
+    finally:
+        proc.kill()
+        proc.wait()
+
+
+def test_cross_process_stop_reports_stopped_once_owner_releases(monkeypatch):
+    monkeypatch.setattr(recognition_worker, "STOP_TIMEOUT_SECONDS", 3.0)
+    proc = _hold_worker_lock(0.3)
+    try:
+        worker = recognition_worker.RecognitionWorker()
+        started = time.time()
+        assert worker.stop() == recognition_worker.STOPPED
+        assert time.time() - started < 3.0
+    finally:
+        proc.wait()
+
+
+def test_stop_without_worker_is_not_running(client):
+    assert recognition_worker.RecognitionWorker().stop() == recognition_worker.NOT_RUNNING
+    assert client.post("/api/recognition/stop").status_code == 409
+
+
+def test_restart_is_refused_until_slow_teardown_finishes(monkeypatch):
+    monkeypatch.setattr(recognition_worker, "STOP_JOIN_SECONDS", 0.1)
+    release = threading.Event()
+
+    def slow_loop(self):
+        # Teardown lebih lama dari batas join stop() (mis. child mode proses)
+        self._stop_event.wait()
+        release.wait(5)
+
+    monkeypatch.setattr(recognition_worker.RecognitionWorker, "_capture_loop", slow_loop)
+    worker = recognition_worker.RecognitionWorker()
+    assert worker.start(0)
+
+    assert worker.stop() == recognition_worker.STOPPING
+    assert worker.running
+    assert not worker.start(0)  # thread lama masih memegang lock
+
+    release.set()
+    worker._thread.join(5)
+    assert not worker.running
+    assert not worker._lock.held
+
+    release.clear()
+    assert worker.start(0)
+    release.set()
+    worker._stop_event.set()
+    worker._thread.join(5)
+    assert not worker._lock.held
+
+
+def test_child_counters_and_events_reach_api_process():
+    # Event ditulis child (tanpa publish di proses ini)
+    conn = database.get_db_connection()
+    event_id = conn.execute("INSERT INTO events (name, status) VALUES ('Unknown', 'DITOLAK')").lastrowid
+    conn.commit()
+    conn.close()
+
+    n = len(recognition_worker.RELAYED_COUNTERS)
+    counts, relayed = [0.0] * n, [0.0] * n
+    before = metrics.FRAMES_TOTAL.value(source="worker")
+    counts[0] = 5.0
+    published = recognition_worker._relay_child(counts, relayed, event_id, 0)
+    counts[0] = 7.0
+    published = recognition_worker._relay_child(counts, relayed, event_id, published)
+
+    assert metrics.FRAMES_TOTAL.value(source="worker") - before == 7.0
+    assert published == event_id
+    assert broadcaster.latest_id() == event_id
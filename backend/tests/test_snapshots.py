@@ -0,0 +1,74 @@
+import time
+
+import cv2
+import numpy as np
+
+from app import face_engine, snapshot_store
+
+
+def test_snapshot_ref_outside_root_is_rejected_before_filesystem_access(client):
+    victim = face_engine.FACES_DIR / "alice"
+    victim.mkdir(parents=True, exist_ok=True)
+    cv2.imwrite(str(victim / "1.jpg"), np.zeros((64, 64, 3), np.uint8))
+
+    assert client.get("/api/snapshots/..%2Ffaces%2Falice%2F1.jpg?size=thumb").status_code == 404
+
+    assert not (victim / "thumbs").exists()
+
+
+def test_missing_snapshot_is_404(client):
+    assert client.get("/api/snapshots/20240101/nope.jpg").status_code == 404
+
+
+def _indexed_snapshot(ts):
+    day = time.strftime("%Y%m%d", time.localtime(ts))
+    ref = f"{day}/dedup_{int(ts)}.jpg"
+    path = snapshot_store.resolve_snapshot(ref)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(b"jpg")
+    snapshot_store._DEDUP_INDEX.clear()
+    snapshot_store._remember(0b1011, ref, ts)
+    return ref
+
+
+def test_dedup_window_counts_from_original_write(monkeypatch):
+    monkeypatch.setenv("SNAPSHOT_DEDUP_WINDOW_SECONDS", "60")
+    start = time.mktime(time.strptime("20240105 10:00:00", "%Y%m%d %H:%M:%S"))
+    ref = _indexed_snapshot(start)
+
+    assert snapshot_store._find_duplicate(0b1011, start + 50) == ref
+    # Dipakai ulang di detik 50 tidak memperpanjang umur referensinya
+    assert snapshot_store._find_duplicate(0b1011, start + 70) is None
+
+
+def test_dedup_does_not_reuse_previous_day_shard(monkeypatch):
+    monkeypatch.setenv("SNAPSHOT_DEDUP_WINDOW_SECONDS", "600")
+    before_midnight = time.mktime(time.strptime("20240105 23:59:00", "%Y%m%d %H:%M:%S"))
+    _indexed_snapshot(before_midnight)
+
+    assert snapshot_store._find_duplicate(0b1011, before_midnight + 120) is None
+
+
+def test_pending_snapshots_are_exported_as_gauge(client):
+    snapshot_store._PENDING["20240105/slow.jpg"] = None  # type: ignore[assignment]
+    try:
+        body = client.get("/api/metrics").get_data(as_text=True)
+    finally:
+        snapshot_store._PENDING.pop("20240105/slow.jpg")
+    assert "hfg_snapshot_pending 1" in body
+
+
+def test_dedup_hits_and_misses_are_counted():
+    snapshot_store._DEDUP_INDEX.clear()
+    written = snapshot_store.DEDUP_TOTAL.value(result="written")
+    reused = snapshot_store.DEDUP_TOTAL.value(result="reused")
+    frame = np.zeros((64, 64, 3), np.uint8)
+    face = np.tile(np.arange(64, dtype=np.uint8), (64, 1))
+
+    first = snapshot_store.submit_snapshot(frame, "Unknown", face_gray=face)
+    second = snapshot_store.submit_snapshot(frame, "Unknown", face_gray=face)
+    snapshot_store.flush()
+
+    assert second == first
+    assert snapshot_store.DEDUP_TOTAL.value(result="written") == written + 1
+    assert snapshot_store.DEDUP_TOTAL.value(result="reused") == reused + 1
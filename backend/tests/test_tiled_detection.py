@@ -0,0 +1,59 @@
+import numpy as np
+
+from app import tiled_detection
+
+
+def test_tile_grid_covers_image_with_overlap():
+    h, w, tile, overlap = 1080, 1920, 640, 0.25
+    tiles = tiled_detection.tile_grid(h, w, tile, overlap)
+
+    covered = np.zeros((h, w), bool)
+    for x, y, tw, th in tiles:
+        assert 0 <= x and 0 <= y and x + tw <= w and y + th <= h
+        covered[y : y + th, x : x + tw] = True
+    assert covered.all()
+
+    # Tile bertetangga (baris/kolom sama) overlap minimal `overlap` x tile
+    xs = sorted({t[0] for t in tiles})
+    ys = sorted({t[1] for t in tiles})
+    for starts in (xs, ys):
+        for a, b in zip(starts, starts[1:]):
+            assert tile - (b - a) >= int(tile * overlap)
+
+
+def test_tile_grid_small_image_is_one_tile():
+    assert tiled_detection.tile_grid(300, 500, 640, 0.25) == [(0, 0, 500, 300)]
+
+
+def test_nms_merges_overlapping_and_contained_boxes():
+    boxes = np.array(
+        [
+            [100, 100, 80, 80],  # wajah utuh
+            [104, 102, 78, 78],  # duplikat dari tile tetangga (IoU tinggi)
+            [110, 110, 40, 40],  # potongan wajah di dalam kotak besar
+            [400, 100, 60, 60],  # wajah lain
+        ]
+    )
+    kept = tiled_detection.nms(boxes, 0.3)
+    assert sorted(map(tuple, kept.tolist())) == [(100, 100, 80, 80), (400, 100, 60, 60)]
+
+
+def test_nms_keeps_boxes_that_only_touch():
+    boxes = np.array([[0, 0, 50, 50], [40, 0, 50, 50]])  # IoU ~0.11, tidak saling memuat
+    assert len(tiled_detection.nms(boxes, 0.3)) == 2
+
+
+def test_detect_maps_tile_boxes_back_to_frame(monkeypatch):
+    monkeypatch.setenv("DETECT_TILE_SIZE", "640")
+    monkeypatch.setenv("DETECT_TILED_MAX_SIDE", "1920")
+    gray = np.zeros((1080, 1920), np.uint8)
+    gray[700:740, 1500:1540] = 255  # wajah kecil 40 px di pojok kanan bawah
+
+    def detect_fn(img, min_size):
+        ys, xs = np.nonzero(img == 255)
+        if not len(xs):
+            return ()
+        box = (xs.min(), ys.min(), xs.max() - xs.min() + 1, ys.max() - ys.min() + 1)
+        return [box] if box[2] >= min_size[0] else ()
+
+    assert tiled_detection.detect(gray, detect_fn, 640, (60, 60)) == [(1500, 700, 40, 40)]
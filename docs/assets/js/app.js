@@ -80,23 +80,7 @@ async function fetchLogs() {
     const data = await apiFetch('/logs?limit=200');
 
     // Normalisasi timestamp agar konsisten dipakai di UI (Date object)
-    const parsed = (data || []).map(item => {
-      let ts = item.timestamp;
-      let dateObj = null;
-
-      if (typeof ts === 'string' && ts.includes(' ')) {
-        // Format SQLite default: "YYYY-MM-DD HH:MM:SS"
-        const [dPart, tPart] = ts.split(' ');
-        const [y, m, d] = dPart.split('-').map(Number);
-        const [hh, mm, ss] = tPart.split(':').map(Number);
-        dateObj = new Date(y, (m - 1), d, hh, mm, ss || 0);
-      } else {
-        const tmp = new Date(ts);
-        dateObj = isNaN(tmp.getTime()) ? new Date() : tmp;
-      }
-
-      return { ...item, timestamp: dateObj };
-    });
+    const parsed = (data || []).map(normalizeLogItem);
 
     return parsed;
 
@@ -106,6 +90,47 @@ async function fetchLogs() {
   }
 }
 
+/**
+ * Normalisasi 1 item log: timestamp -> Date object
+ */
+function normalizeLogItem(item) {
+  let ts = item.timestamp;
+  let dateObj = null;
+
+  if (typeof ts === 'string' && ts.includes(' ')) {
+    // Format SQLite default: "YYYY-MM-DD HH:MM:SS"
+    const [dPart, tPart] = ts.split(' ');
+    const [y, m, d] = dPart.split('-').map(Number);
+    const [hh, mm, ss] = tPart.split(':').map(Number);
+    dateObj = new Date(y, (m - 1), d, hh, mm, ss || 0);
+  } else {
+    const tmp = new Date(ts);
+    dateObj = isNaN(tmp.getTime()) ? new Date() : tmp;
+  }
+
+  return { ...item, timestamp: dateObj };
+}
+
+/**
+ * Berlangganan event log baru via Server-Sent Events
+ * Endpoint: GET /api/events/stream
+ * Return EventSource (atau null jika browser tidak mendukung).
+ */
+function subscribeLogStream(onEvent) {
+  if (typeof EventSource === 'undefined') return null;
+
+  // EventSource otomatis reconnect + mengirim Last-Event-ID
+  const source = new EventSource(`${API_BASE}/events/stream`);
+  source.onmessage = (msg) => {
+    try {
+      onEvent(normalizeLogItem(JSON.parse(msg.data)));
+    } catch (error) {
+      console.error("Error parsing log stream:", error);
+    }
+  };
+  return source;
+}
+
 /**
  * Menambahkan Penghuni Baru ke database
  * Endpoint: POST /api/residents
@@ -7,6 +7,7 @@ if (typeof fetchLogs === 'undefined') {
 } else {
     document.addEventListener('DOMContentLoaded', () => {
         renderLatestLogs();
+        startLatestLogsStream();
         startDashboardCamera();
     });
 }
@@ -20,6 +21,8 @@ let dashboardStream = null;
 let recognitionTimer = null;
 let overlayCanvas = null;
 let overlayCtx = null;
+let latestLogs = [];
+let logStream = null;
 
 async function startDashboardCamera() {
     // Ambil container feed video pada kartu "Live Camera Feed"
@@ -80,10 +83,15 @@ window.addEventListener('beforeunload', () => {
     }
 
     if (recognitionTimer) {
-        clearInterval(recognitionTimer);
+        clearTimeout(recognitionTimer);
         recognitionTimer = null;
     }
 
+    if (logStream) {
+        logStream.close();
+        logStream = null;
+    }
+
     if (overlayCtx && overlayCanvas) {
         overlayCtx.clearRect(0, 0, overlayCanvas.width, overlayCanvas.height);
     }
@@ -115,18 +123,32 @@ function startRealtimeRecognitionFromDashboard(videoEl) {
     const captureCanvas = document.createElement('canvas');
     const captureCtx = captureCanvas.getContext('2d', { willReadFrequently: true });
 
-    // Kirim 1 frame / detik (cukup untuk demo + hemat CPU)
-    const FPS = 1;
+    // Default 1 frame / detik; selanjutnya ikuti saran server (out.pacing):
+    // interval & lebar frame menyesuaikan beban backend (banyak dashboard sekaligus)
+    let intervalMs = 1000;
+    let targetWidth = 640;
+    const MAX_BACKOFF_MS = 10000;
+    const clientId = (window.crypto && crypto.randomUUID)
+        ? crypto.randomUUID()
+        : String(Date.now()) + '-' + Math.random().toString(16).slice(2);
+
+    function applyPacing(out) {
+        const p = out && out.pacing;
+        if (!p) return;
+        if (p.next_interval_ms > 0) intervalMs = p.next_interval_ms;
+        if (p.target_width > 0) targetWidth = p.target_width;
+    }
 
-    recognitionTimer = setInterval(async () => {
+    async function tick() {
+        const startedAt = Date.now();
         try {
             if (!videoEl || videoEl.readyState < 2) return; // belum ada frame
 
             const vw = videoEl.videoWidth || 640;
             const vh = videoEl.videoHeight || 360;
 
-            // Resize supaya payload kecil
-            const targetW = 640;
+            // Resize supaya payload kecil (lebar mengikuti saran server)
+            const targetW = Math.min(targetWidth, vw);
             const targetH = Math.round((vh / vw) * targetW);
             captureCanvas.width = targetW;
             captureCanvas.height = targetH;
@@ -136,12 +158,13 @@ function startRealtimeRecognitionFromDashboard(videoEl) {
 
             const res = await fetch(MOCK_API_BASE + '/recognition/frame', {
                 method: 'POST',
-                headers: { 'Content-Type': 'application/json' },
+                headers: { 'Content-Type': 'application/json', 'X-Client-Id': clientId },
                 body: JSON.stringify({ image: dataUrl })
             });
 
             // Backend selalu JSON untuk /api/*
             const out = await res.json();
+            applyPacing(out);
 
             if (!res.ok) {
                 console.warn('Recognition error:', out);
@@ -164,8 +187,8 @@ function startRealtimeRecognitionFromDashboard(videoEl) {
                     });
                 }
 
-                // Refresh log terbaru agar langsung tampil
-                renderLatestLogs();
+                // Refresh log terbaru (fallback jika SSE tidak tersedia)
+                if (!logStream) renderLatestLogs();
             } else {
                 setDashboardStatus('Aktif (Tidak ada wajah)', true);
                 if (overlayCanvas && overlayCtx) {
@@ -178,8 +201,18 @@ function startRealtimeRecognitionFromDashboard(videoEl) {
             if (overlayCanvas && overlayCtx) {
                 clearOverlay(overlayCanvas, overlayCtx);
             }
+            // Backend tidak menjawab: mundur bertahap supaya tidak membanjiri saat pulih
+            intervalMs = Math.min(MAX_BACKOFF_MS, intervalMs * 2);
+        } finally {
+            // Frame berikutnya baru dijadwalkan setelah response (tidak ada request menumpuk)
+            if (recognitionTimer) {
+                const wait = Math.max(0, intervalMs - (Date.now() - startedAt));
+                recognitionTimer = setTimeout(tick, wait);
+            }
         }
-    }, Math.round(1000 / FPS));
+    }
+
+    recognitionTimer = setTimeout(tick, intervalMs);
 }
 
 function clearOverlay(cnv, ctx) {
@@ -241,6 +274,18 @@ function drawFaceOverlay(cnv, ctx, out, { srcW, srcH }) {
     ctx.restore();
 }
 
+/**
+ * Live update log terbaru via SSE (/api/events/stream)
+ */
+function startLatestLogsStream() {
+    if (logStream || typeof subscribeLogStream === 'undefined') return;
+    logStream = subscribeLogStream((log) => {
+        if (latestLogs.some(item => item.id === log.id)) return;
+        latestLogs = [log, ...latestLogs].slice(0, 5);
+        paintLatestLogs();
+    });
+}
+
 /**
  * Render 5 log terbaru (untuk Dashboard)
  */
@@ -252,38 +297,45 @@ async function renderLatestLogs() {
 
     try {
         const fetchedLogs = await fetchLogs();
-        const latest = (fetchedLogs || []).slice(0, 5);
-
-        listElement.innerHTML = '';
-
-        if (latest.length === 0) {
-            listElement.innerHTML = `<li class="text-gray-500 text-sm">Belum ada aktivitas terdeteksi.</li>`;
-            return;
-        }
-
-        latest.forEach(log => {
-            const category = (log.category || ((log.name && log.name.toLowerCase() !== 'unknown' && log.status === 'MASUK') ? 'PENGHUNI' : 'UNKNOWN'));
-            const statusClass = category === 'PENGHUNI'
-                ? 'bg-green-900/50 text-green-400'
-                : 'bg-yellow-900/50 text-yellow-400';
+        latestLogs = (fetchedLogs || []).slice(0, 5);
+        paintLatestLogs();
+    } catch (error) {
+        console.error('Error rendering latest logs:', error);
+        listElement.innerHTML = `<li class="text-red-400 text-sm">Gagal memuat log. Pastikan backend berjalan.</li>`;
+    }
+}
 
-            const timeString = log.timestamp.toLocaleTimeString('id-ID');
+function paintLatestLogs() {
+    const listElement = document.getElementById('latest-logs-list');
+    if (!listElement) return;
 
-            const item = `
-                <li class="flex items-center justify-between bg-[#1f2430] p-3 rounded-lg border border-gray-700/50">
-                    <div>
-                        <p class="font-semibold text-white">${log.name}</p>
-                        <span class="text-xs font-medium px-2 py-1 rounded-full ${statusClass}">${category}</span>
-                    </div>
-                    <p class="text-xs text-gray-400">${timeString}</p>
-                </li>
-            `;
+    const latest = latestLogs;
 
-            listElement.innerHTML += item;
-        });
+    listElement.innerHTML = '';
 
-    } catch (error) {
-        console.error('Error rendering latest logs:', error);
-        listElement.innerHTML = `<li class="text-red-400 text-sm">Gagal memuat log. Pastikan backend berjalan.</li>`;
+    if (latest.length === 0) {
+        listElement.innerHTML = `<li class="text-gray-500 text-sm">Belum ada aktivitas terdeteksi.</li>`;
+        return;
     }
+
+    latest.forEach(log => {
+        const category = (log.category || ((log.name && log.name.toLowerCase() !== 'unknown' && log.status === 'MASUK') ? 'PENGHUNI' : 'UNKNOWN'));
+        const statusClass = category === 'PENGHUNI'
+            ? 'bg-green-900/50 text-green-400'
+            : 'bg-yellow-900/50 text-yellow-400';
+
+        const timeString = log.timestamp.toLocaleTimeString('id-ID');
+
+        const item = `
+            <li class="flex items-center justify-between bg-[#1f2430] p-3 rounded-lg border border-gray-700/50">
+                <div>
+                    <p class="font-semibold text-white">${log.name}</p>
+                    <span class="text-xs font-medium px-2 py-1 rounded-full ${statusClass}">${category}</span>
+                </div>
+                <p class="text-xs text-gray-400">${timeString}</p>
+            </li>
+        `;
+
+        listElement.innerHTML += item;
+    });
 }
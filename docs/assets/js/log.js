@@ -61,13 +61,17 @@ function renderLogList(items){
     const name = item.name || 'Unknown';
     const cat = (String(name).trim().toLowerCase() === 'unknown') ? 'UNKNOWN' : 'PENGHUNI';
     const badgeClass = cat === 'UNKNOWN' ? 'bg-amber-700 text-amber-100' : 'bg-green-700 text-green-100';
+    // Thumbnail kecil (?size=thumb) supaya list log tidak mengunduh snapshot full-size
+    const avatar = item.thumbnail_url
+      ? `<img src="${escapeHtml(item.thumbnail_url)}" alt="Snapshot" loading="lazy" class="w-14 h-14 rounded-full object-cover bg-gray-800" />`
+      : `<div class="w-14 h-14 rounded-full bg-gray-800 flex items-center justify-center">
+            <i class="fa-regular fa-user text-blue-300 text-xl"></i>
+          </div>`;
 
     return `
       <div class="flex items-center justify-between p-6 bg-[#252a34] rounded-2xl shadow-lg border border-blue-900/50 mb-4">
         <div class="flex items-center gap-4">
-          <div class="w-14 h-14 rounded-full bg-gray-800 flex items-center justify-center">
-            <i class="fa-regular fa-user text-blue-300 text-xl"></i>
-          </div>
+          ${avatar}
           <div>
             <div class="text-lg font-semibold text-white">${escapeHtml(name)}</div>
             <span class="inline-block mt-1 px-3 py-1 rounded-full text-xs font-bold ${badgeClass}">${cat}</span>